@@ -0,0 +1,23 @@
+from utils.lazy import lazy_exports
+
+# The analyses are numpy/pandas heavy; each loads on first use
+__getattr__, __dir__, __all__ = lazy_exports(__name__, globals(), {
+    '.anomaly': [
+        'ALERT_COLUMNS', 'ALERT_KINDS', 'DEFAULT_BURST_WINDOW', 'DEFAULT_LEARNING_PERIOD', 'DEFAULT_MIN_TRAVEL_TIME',
+        'detect_anomalies', 'format_anomaly_breakdown',
+    ],
+    '.device_join': [
+        'DEVICE_JOIN_COLUMNS', 'MATCH_LEVELS', 'UNMATCHED', 'DeviceJoin', 'device_join_table',
+        'format_device_join_breakdown', 'join_devices', 'normalize_join_field',
+    ],
+    '.filtering': ['FILTER_COLUMNS', 'FilteredView', 'FrameIndex'],
+    '.ip': [
+        'FAMILY_INVALID', 'FAMILY_V4', 'FAMILY_V6', 'IPArrays', 'RangeTable', 'build_range_table',
+        'format_ip_breakdown', 'load_range_table', 'lookup_networks', 'network_counts', 'parse_ips',
+        'prefix_counts', 'prefix_keys',
+    ],
+    '.linkage': [
+        'DEFAULT_LINK_WINDOW', 'DEFAULT_SESSION_GAP', 'build_sessions', 'device_columns',
+        'format_linkage_breakdown', 'link_devices',
+    ],
+})
\ No newline at end of file
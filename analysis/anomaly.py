@@ -0,0 +1,181 @@
+import ipaddress
+import numpy as np
+import pandas as pd
+from utils.timebins import NS_PER_DAY, NS_PER_HOUR, epoch_ns
+from .common import int64_to_timestamps, label_codes, to_timedelta_ns
+from .ip import FAMILY_V4, format_ip, parse_ips, prefix_keys
+
+# Values first seen within this long of the start of the log are its baseline, not news
+DEFAULT_LEARNING_PERIOD = '7D'
+# An hour is a burst when it is this many standard deviations above the trailing window
+DEFAULT_BURST_WINDOW = '7D'
+DEFAULT_BURST_SIGMA = 4.0
+DEFAULT_BURST_MIN_EVENTS = 50
+# Country-level locations only: switching country faster than this is not travel
+DEFAULT_MIN_TRAVEL_TIME = '2h'
+
+ALERT_COLUMNS = ['Time', 'Kind', 'Detail', 'Events']
+ALERT_KINDS = ['New IP', 'New prefix', 'New country', 'Burst', 'Impossible travel']
+
+def _missing_location(labels):
+    return np.array([pd.isna(label) or label in ('', 'N/A') for label in labels] + [True], dtype=bool)
+
+def _new_value_alerts(kind, codes, labels, times, after, detail=None):
+    """One alert per code first seen at or after `after` (codes and times in time order).
+
+    Events is how often the value occurs in the whole log.
+    """
+    _, first, events = np.unique(codes, return_index=True, return_counts=True)
+    new = times[first] >= after
+    first, events = first[new], events[new]
+    order = np.argsort(first)
+    first, events = first[order], events[order]
+    details = [detail(i) if detail else str(labels[codes[i]]) for i in first]
+    return pd.DataFrame({'Time': times[first], 'Kind': kind, 'Detail': details, 'Events': events})
+
+def _routable(values):
+    """Whether each distinct IP string is a public address (private, loopback and bad ones are not)."""
+    def public(text):
+        try:
+            return ipaddress.ip_address(str(text).strip()).is_global
+        except ValueError:
+            return False
+    return np.array([public(text) for text in values] + [False], dtype=bool)
+
+def _burst_alerts(times, window, sigma, min_events):
+    """Runs of hours whose event count is sigma standard deviations above the trailing window.
+
+    Hourly counts come from one bincount; the trailing mean and variance of
+    every hour are differences of cumulative sums, so the whole rolling
+    baseline is a handful of array operations.
+    """
+    hours = times // NS_PER_HOUR
+    hour0 = hours[0]
+    counts = np.bincount(hours - hour0).astype(float)
+    width = max(int(to_timedelta_ns(window) // NS_PER_HOUR), 1)
+    sums = np.concatenate([[0.0], np.cumsum(counts)])
+    squares = np.concatenate([[0.0], np.cumsum(counts ** 2)])
+    index = np.arange(len(counts))
+    lo = np.maximum(index - width, 0)
+    n = index - lo
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (sums[index] - sums[lo]) / n
+        variance = (squares[index] - squares[lo]) / n - mean ** 2
+    # Counts are roughly Poisson, so the spread is at least the square root of the mean
+    spread = np.sqrt(np.maximum(variance, mean))
+    # Hours without a full day of history have no baseline yet
+    burst = (n >= min(width, 24)) & (counts >= min_events) & (counts > mean + sigma * spread)
+    flags = np.concatenate([[False], burst, [False]])
+    starts = np.flatnonzero(flags[1:] & ~flags[:-1])
+    ends = np.flatnonzero(flags[:-1] & ~flags[1:])
+    events = np.array([counts[start:end].sum() for start, end in zip(starts, ends)], dtype='int64')
+    return pd.DataFrame({
+        'Time': (starts + hour0) * NS_PER_HOUR,
+        'Kind': 'Burst',
+        'Detail': [
+            f"{int(total):,} events in {end - start}h (baseline {mean[start]:,.0f}/h)"
+            for start, end, total in zip(starts, ends, events)
+        ],
+        'Events': events,
+    })
+
+def _travel_alerts(location_codes, labels, times, min_travel_time):
+    """Country changes between consecutive located events less than min_travel_time apart.
+
+    One alert per (from, to) pair per UTC day, counting its hops.
+    """
+    missing = _missing_location(labels)
+    located = np.flatnonzero(~missing[location_codes])
+    codes, located_times = location_codes[located], times[located]
+    hops = np.flatnonzero(
+        (codes[1:] != codes[:-1]) & (np.diff(located_times) < to_timedelta_ns(min_travel_time))
+    ) + 1
+    if not len(hops):
+        return pd.DataFrame(columns=ALERT_COLUMNS)
+    width = len(labels) + 1
+    keys = (located_times[hops] // NS_PER_DAY) * width * width + codes[hops - 1] * width + codes[hops]
+    _, first, events = np.unique(keys, return_index=True, return_counts=True)
+    hops, gaps = hops[first], np.diff(located_times)[hops[first] - 1]
+    return pd.DataFrame({
+        'Time': located_times[hops],
+        'Kind': 'Impossible travel',
+        'Detail': [
+            f"{labels[codes[hop - 1]]} → {labels[codes[hop]]} in {pd.Timedelta(int(gap), 'ns')}"
+            for hop, gap in zip(hops, gaps)
+        ],
+        'Events': events,
+    })
+
+def detect_anomalies(df, learning_period=DEFAULT_LEARNING_PERIOD, burst_window=DEFAULT_BURST_WINDOW,
+                     burst_sigma=DEFAULT_BURST_SIGMA, burst_min_events=DEFAULT_BURST_MIN_EVENTS,
+                     min_travel_time=DEFAULT_MIN_TRAVEL_TIME, v4_prefix=24, v6_prefix=64):
+    """Alerts for unusual activity in an activity table frame, oldest first.
+
+    The frame is sorted by time once; every detector then works on integer
+    codes in that order:
+    - New IP / New prefix / New country: public addresses, /v4_prefix and
+      /v6_prefix networks and countries first seen after the learning period;
+    - Burst: runs of hours far above the trailing burst_window (see _burst_alerts);
+    - Impossible travel: the country changing within min_travel_time.
+    Returns a frame of ALERT_COLUMNS.
+    """
+    df = df[df['Timestamp'].notna()]
+    if not len(df):
+        return pd.DataFrame(columns=ALERT_COLUMNS)
+    times = epoch_ns(df['Timestamp'])
+    order = np.argsort(times, kind='stable')
+    times = times[order]
+    after = times[0] + to_timedelta_ns(learning_period)
+
+    ip_codes, ip_uniques = label_codes(df, ['IP Address'])
+    ip_codes = ip_codes[order]
+    # Missing locations keep the -1 sentinel, which _missing_location maps to True
+    location_codes, location_uniques = pd.factorize(df['Location'])
+    location_codes, location_labels = location_codes[order], [str(value) for value in location_uniques]
+    located = ~_missing_location(location_labels)[location_codes]
+
+    def where(i):
+        return f" ({location_labels[location_codes[i]]})" if located[i] else ""
+
+    # Private and unparseable addresses say nothing about where the account was used from
+    public = np.flatnonzero(_routable(ip_uniques)[ip_codes])
+    alerts = [_new_value_alerts(
+        'New IP', ip_codes[public], ip_uniques, times[public], after,
+        lambda i: f"{ip_uniques[ip_codes[public[i]]]}{where(public[i])}"
+    )]
+
+    # Prefixes are worked out once per distinct address, then spread over its rows
+    networks = prefix_keys(parse_ips(ip_uniques), v4_prefix, v6_prefix)
+    network_codes, _ = pd.factorize(pd.MultiIndex.from_arrays(list(networks)))
+    prefix_codes = network_codes[ip_codes[public]]
+
+    def prefix_detail(i):
+        address = ip_codes[public[i]]
+        bits = v4_prefix if networks.family[address] == FAMILY_V4 else v6_prefix
+        return f"{format_ip(*(array[address] for array in networks))}/{bits}{where(public[i])}"
+    alerts.append(_new_value_alerts('New prefix', prefix_codes, None, times[public], after, prefix_detail))
+
+    kept = np.flatnonzero(located)
+    alerts.append(_new_value_alerts('New country', location_codes[kept], location_labels, times[kept], after))
+    alerts.append(_burst_alerts(times, burst_window, burst_sigma, burst_min_events))
+    alerts.append(_travel_alerts(location_codes, location_labels, times, min_travel_time))
+
+    alerts = pd.concat([alert for alert in alerts if len(alert)] or [pd.DataFrame(columns=ALERT_COLUMNS)])
+    alerts = alerts.sort_values('Time', kind='stable').reset_index(drop=True)
+    alerts['Time'] = int64_to_timestamps(alerts['Time'].to_numpy(dtype='int64'),
+                                         getattr(df['Timestamp'].dtype, 'tz', None))
+    alerts['Events'] = alerts['Events'].astype('int64')
+    return alerts[ALERT_COLUMNS]
+
+def format_anomaly_breakdown(alerts, top=10):
+    """Summary section: alert counts per kind and the most recent alerts."""
+    if alerts is None or not len(alerts):
+        return "• Alerts: none"
+    counts = alerts['Kind'].value_counts()
+    lines = [
+        f"• Alerts: {len(alerts)} ("
+        + ", ".join(f"{counts[kind]} {kind.lower()}" for kind in ALERT_KINDS if kind in counts) + ")"
+    ]
+    for alert in alerts.tail(top).iloc[::-1].itertuples(index=False):
+        lines.append(f"  - {alert[0]:%Y-%m-%d %H:%M} {alert[1]}: {alert[2]}")
+    return "\n".join(lines)
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+NS_PER_SECOND = 1_000_000_000
+
+def int64_to_timestamps(values, tz=None):
+    """Inverse of utils.timebins.epoch_ns, as a DatetimeIndex in tz (None keeps it naive)."""
+    index = pd.DatetimeIndex(np.asarray(values, dtype='int64').view('datetime64[ns]'))
+    return index.tz_localize('UTC').tz_convert(tz) if tz is not None else index
+
+def to_timedelta_ns(value):
+    """Window/gap parameters may be given as '30min', a Timedelta or seconds."""
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value * NS_PER_SECOND)
+    return int(pd.Timedelta(value).value)
+
+def label_codes(df, columns):
+    """Factorize the row-wise combination of columns into (codes, labels).
+
+    labels are 'A / B' strings joining the column values, one per code.
+    """
+    if len(columns) == 1:
+        codes, uniques = pd.factorize(df[columns[0]], use_na_sentinel=False)
+        return codes, [str(value) for value in uniques]
+    keys = pd.MultiIndex.from_arrays([df[column] for column in columns])
+    codes, uniques = pd.factorize(keys)
+    return codes, [' / '.join(str(part) for part in values) for values in uniques]
@@ -0,0 +1,192 @@
+import re
+from collections import Counter, namedtuple
+import numpy as np
+import pandas as pd
+from utils.timebins import epoch_ns, value_codes
+from .common import int64_to_timestamps
+
+JOIN_FIELDS = ['Device Type', 'OS', 'OS Version']
+# Join keys tried in order; an activity takes the first level whose key is fully known
+# and held by at least one device
+MATCH_LEVELS = [
+    ('OS version', ['Device Type', 'OS', 'OS Version']),
+    ('OS', ['Device Type', 'OS']),
+    ('OS only', ['OS']),
+]
+UNMATCHED = 'Unmatched'
+# matches: row-aligned categorical of device group names (UNMATCHED last); levels: index
+# into MATCH_LEVELS of each row's match, -1 when unmatched; members: the device list rows
+# of each group, in category order
+DeviceJoin = namedtuple('DeviceJoin', ['matches', 'levels', 'members'])
+DEVICE_JOIN_COLUMNS = [
+    'Device', 'Devices', 'Activities', 'First Activity', 'Last Activity', 'Device Last Seen', 'Difference'
+]
+
+# User agents say IOS_OS / MAC_OS / WINDOWS_OS, the device list iOS / Mac / Windows
+_OS_ALIASES = {
+    'mac': 'macos', 'macosx': 'macos', 'osx': 'macos', 'iphoneos': 'ios', 'ipados': 'ios',
+    'chrome': 'chromeos', 'cros': 'chromeos',
+}
+_UNKNOWN = {'', 'unknown', 'n/a', 'nan', 'none', 'other'}
+
+def normalize_join_field(field, value):
+    """Join key of one Device Type / OS / OS Version value; '' when unknown."""
+    text = str(value).strip().lower()
+    if field == 'OS':
+        text = re.sub(r'[^a-z0-9]', '', re.sub(r'_os$', '', text))
+        text = _OS_ALIASES.get(text, text)
+    elif field == 'OS Version':
+        # Devices report their current version, activities whatever ran at the time
+        match = re.match(r'\d+', text)
+        text = match.group(0) if match else ''
+    return '' if text in _UNKNOWN else text
+
+def _join_keys(frame):
+    """Normalized JOIN_FIELDS of every row of frame (missing fields are unknown)."""
+    return [
+        tuple(normalize_join_field(field, row[field]) if field in row else '' for field in JOIN_FIELDS)
+        for row in frame.to_dict('records')
+    ]
+
+def _device_label(device):
+    known = lambda value: normalize_join_field('', value) != ''
+    name = next(
+        (str(device.get(field)) for field in ('Marketing Name', 'Device Model', 'Device Type')
+         if known(device.get(field))),
+        'Unknown device'
+    )
+    system = " ".join(str(device.get(field)) for field in ('OS', 'OS Version') if known(device.get(field)))
+    return f"{name} ({system})" if system else name
+
+def _group_label(labels):
+    counts = Counter(labels)
+    return " / ".join(label if count == 1 else f"{label} ×{count}" for label, count in counts.items())
+
+def join_devices(activities, devices):
+    """Hash join activities (with decoded UA fields) to the rows of the device list.
+
+    Keys are the normalized Device Type, OS and OS major version, tried at
+    each of MATCH_LEVELS. The device list is built into one hash table per
+    level; only the distinct activity key combinations probe it, and the
+    result is spread back to the rows through their combination codes.
+    Devices sharing a key can't be told apart by an activity, so they form
+    one device group. Devices no activity matched form groups of their own.
+
+    Returns a DeviceJoin.
+    """
+    labels = [_device_label(device) for device in devices.to_dict('records')]
+    device_keys = _join_keys(devices)
+    tables = []
+    for _, fields in MATCH_LEVELS:
+        table = {}
+        for row, key in enumerate(device_keys):
+            level_key = tuple(key[JOIN_FIELDS.index(field)] for field in fields)
+            if all(level_key):
+                table.setdefault(level_key, []).append(row)
+        tables.append(table)
+
+    # Each column's distinct values are normalized once; a row's combination
+    # code is its key codes in mixed radix
+    combo = np.zeros(len(activities), dtype='int64')
+    column_keys = []
+    for field in JOIN_FIELDS:
+        if field in activities.columns:
+            codes, values = value_codes(activities[field])
+            keys, key_codes = np.unique(
+                [normalize_join_field(field, value) for value in values] + [''], return_inverse=True
+            )
+            combo = combo * len(keys) + key_codes[codes]
+        else:
+            keys = np.array([''])
+        column_keys.append(keys)
+    combos, combo_codes = np.unique(combo, return_inverse=True)
+    combo_group = np.full(len(combos), -1)
+    combo_level = np.full(len(combos), -1)
+    groups = {}
+    for code, value in enumerate(combos):
+        key = []
+        for keys in reversed(column_keys):
+            value, digit = divmod(int(value), len(keys))
+            key.append(str(keys[digit]))
+        key = key[::-1]
+        for level, ((_, level_fields), table) in enumerate(zip(MATCH_LEVELS, tables)):
+            level_key = tuple(key[JOIN_FIELDS.index(field)] for field in level_fields)
+            if all(level_key) and level_key in table:
+                combo_group[code] = groups.setdefault(tuple(table[level_key]), len(groups))
+                combo_level[code] = level
+                break
+
+    # Devices no activity matched get groups too (a full key still makes one group), so
+    # device_join_table lists them with when the device list last saw them
+    matched = {row for rows in groups for row in rows}
+    idle = {}
+    for row, key in enumerate(device_keys):
+        if row not in matched:
+            idle.setdefault(key if all(key) else row, []).append(row)
+    for rows in idle.values():
+        groups[tuple(rows)] = len(groups)
+
+    names, repeats = [], Counter()
+    for rows in groups:
+        name = _group_label([labels[row] for row in rows])
+        # Different device sets can read the same; number the repeats
+        repeats[name] += 1
+        names.append(name if repeats[name] == 1 else f"{name} #{repeats[name]}")
+    group = combo_group[combo_codes]
+    matches = pd.Categorical.from_codes(np.where(group >= 0, group, len(names)), categories=names + [UNMATCHED])
+    return DeviceJoin(
+        pd.Series(matches, index=activities.index, name='Device'), combo_level[combo_codes], list(groups) + [()]
+    )
+
+def device_join_table(activities, devices, join):
+    """Per device group: activity count and span, and when the device list last saw it.
+
+    Difference is Last Activity minus Device Last Seen (the latest of the
+    group's devices); a large gap means the two logs disagree about when the
+    device was last used.
+    """
+    times = epoch_ns(activities['Timestamp'])
+    codes = join.matches.cat.codes.to_numpy()
+    groups = len(join.members)
+    counts = np.bincount(codes, minlength=groups)
+    first = np.full(groups, np.iinfo('int64').max)
+    last = np.full(groups, np.iinfo('int64').min)
+    np.minimum.at(first, codes, times)
+    np.maximum.at(last, codes, times)
+    first[counts == 0] = np.iinfo('int64').min  # iNaT
+
+    device_times = epoch_ns(devices['Timestamp'])
+    seen = np.array([device_times[list(rows)].max() if rows else np.iinfo('int64').min for rows in join.members],
+                    dtype='int64')
+    tz = getattr(activities['Timestamp'].dtype, 'tz', None)
+    table = pd.DataFrame({
+        'Device': list(join.matches.cat.categories),
+        'Devices': [len(rows) for rows in join.members],
+        'Activities': counts,
+        'First Activity': int64_to_timestamps(first, tz),
+        'Last Activity': int64_to_timestamps(last, tz),
+        'Device Last Seen': int64_to_timestamps(seen, tz),
+    })
+    table['Difference'] = table['Last Activity'] - table['Device Last Seen']
+    table = table[(table['Activities'] > 0) | (table['Devices'] > 0)]
+    return table.sort_values('Activities', ascending=False, kind='stable').reset_index(drop=True)
+
+def format_device_join_breakdown(join, table, top=10):
+    """Summary section: how the activities matched the device list, busiest device groups first."""
+    if join is None:
+        return "• Device List: not loaded"
+    levels = np.bincount(join.levels + 1, minlength=len(MATCH_LEVELS) + 1)
+    total = max(len(join.levels), 1)
+    lines = [
+        f"• Activities Matched to the Device List: {len(join.levels) - levels[0]} of {len(join.levels)} "
+        f"({(len(join.levels) - levels[0]) / total:.1%})",
+        "  - " + ", ".join(f"by {name}: {count}" for (name, _), count in zip(MATCH_LEVELS, levels[1:])),
+    ]
+    for row in table.head(top).itertuples(index=False):
+        line = f"  - {row.Device}: {row.Activities} activities"
+        if pd.notna(row[4]):
+            line += f", last {row[4]:%Y-%m-%d %H:%M}"
+        if pd.notna(row[5]):
+            line += f" (device list: {row[5]:%Y-%m-%d %H:%M})"
+        lines.append(line)
+    return "\n".join(lines)
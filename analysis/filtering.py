@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+from utils.timebins import bound_ns, epoch_ns, value_codes
+
+FILTER_COLUMNS = ['App Used', 'Device Type', 'Location']
+
+def _codes(series):
+    """(codes, labels) of a column; categoricals keep their category order, like value_counts.
+
+    Codes use the smallest unsigned dtype, with missing values as the extra code
+    len(labels) so they can go straight into bincount.
+    """
+    codes, labels = value_codes(series)
+    return codes.astype(np.min_scalar_type(len(labels))), labels
+
+def _counts(codes, labels, positions):
+    """value_counts of the rows at positions, from precomputed codes."""
+    selected = codes if positions is None else codes[positions]
+    counts = np.bincount(selected, minlength=len(labels) + 1)[:len(labels)]
+    series = pd.Series(counts, index=pd.Index(labels, dtype=object), dtype='int64')
+    return series[series > 0].sort_values(ascending=False, kind='stable')
+
+def _set_bits(bitmap, lo, hi):
+    """Sorted positions in [lo, hi) whose bits are set; only that slice of bytes is unpacked."""
+    first = lo // 8
+    bits = np.unpackbits(bitmap[first:(hi + 7) // 8]).view(bool)
+    positions = np.flatnonzero(bits[lo - first * 8:hi - first * 8])
+    return positions + lo
+
+class FrameIndex:
+    """Precomputed indexes over a table frame for fast filtering.
+
+    Timestamps are kept as a sorted int64 array (sliced with searchsorted) and
+    every value of the filter columns gets a packed bitmap of the rows holding
+    it. Filtering works from integer positions, so it never copies df; the
+    summary and charts of a filter come from the activity cube.
+    """
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.df = df
+        self.size = len(df)
+        times = epoch_ns(df['Timestamp'])
+        self.tz = getattr(df['Timestamp'].dtype, 'tz', None)
+        self.time_order = np.argsort(times, kind='stable')
+        self.sorted_times = times[self.time_order]
+        # Takeout exports are newest first, so a time range is usually a plain slice
+        diffs = np.diff(times)
+        self.monotonic = 'asc' if (diffs >= 0).all() else 'desc' if (diffs <= 0).all() else None
+
+        self.codes, self.labels, self.bitmaps = {}, {}, {}
+        for column in columns:
+            codes, labels = _codes(df[column])
+            self.codes[column], self.labels[column] = codes, labels
+            self.bitmaps[column] = {
+                label: np.packbits(codes == code) for code, label in enumerate(labels)
+            }
+
+    def values(self, column):
+        """Filterable values of column, most frequent first."""
+        return list(_counts(self.codes[column], self.labels[column], None).index)
+
+    def _time_range(self, start, end):
+        """Rows with start <= Timestamp < end: (lo, hi) row bounds when they are contiguous
+        (time-ordered frames), else a boolean mask."""
+        lo = 0 if start is None else int(np.searchsorted(self.sorted_times, bound_ns(start, self.tz)))
+        hi = self.size if end is None else int(np.searchsorted(self.sorted_times, bound_ns(end, self.tz)))
+        hi = max(lo, hi)
+        if self.monotonic == 'asc':
+            return lo, hi
+        if self.monotonic == 'desc':
+            return self.size - hi, self.size - lo
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.time_order[lo:hi]] = True
+        return mask
+
+    def filter(self, start=None, end=None, selections=None):
+        """The rows with start <= Timestamp < end whose filter columns hold selected values.
+
+        selections maps filter columns to the values to keep (any of them);
+        columns left out or given no values are not filtered. Returns a
+        FilteredView.
+        """
+        combined = None
+        for column, values in (selections or {}).items():
+            if not values:
+                continue
+            bitmaps = self.bitmaps[column]
+            column_bitmap = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+            for value in values:
+                if value in bitmaps:
+                    column_bitmap |= bitmaps[value]
+            combined = column_bitmap if combined is None else combined & column_bitmap
+
+        if start is None and end is None:
+            if combined is None:
+                return FilteredView(self, None)
+            return FilteredView(self, _set_bits(combined, 0, self.size))
+        time_range = self._time_range(start, end)
+        if isinstance(time_range, tuple):
+            lo, hi = time_range
+            if combined is None:
+                return FilteredView(self, np.arange(lo, hi))
+            # Only the bitmap bytes covering the time slice are unpacked
+            return FilteredView(self, _set_bits(combined, lo, hi))
+        if combined is not None:
+            time_range &= np.unpackbits(combined, count=self.size).view(bool)
+        return FilteredView(self, np.flatnonzero(time_range))
+
+class FilteredView:
+    """A filtered set of rows of an indexed frame; positions is None for all rows."""
+
+    def __init__(self, index, positions):
+        self.index = index
+        self.positions = positions
+
+    def __len__(self):
+        return self.index.size if self.positions is None else len(self.positions)
+
+    def is_filtered(self):
+        return self.positions is not None
+
+    def frame(self):
+        """The filtered rows as a frame (a copy; the table and charts don't need it)."""
+        return self.index.df if self.positions is None else self.index.df.take(self.positions)
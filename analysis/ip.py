@@ -0,0 +1,216 @@
+import ipaddress
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# Family flags
+FAMILY_INVALID = 0
+FAMILY_V4 = 4
+FAMILY_V6 = 6
+
+# Row-aligned integer form of an IP column: family flag per row, the IPv4 address as
+# uint32 and the IPv6 address as (high, low) uint64 halves; unused slots are 0
+IPArrays = namedtuple('IPArrays', ['family', 'v4', 'v6_high', 'v6_low'])
+
+# Offline network table sorted by range start within each family; *_row index asn/country/name
+RangeTable = namedtuple(
+    'RangeTable', ['v4_start', 'v4_end', 'v4_row', 'v6_start', 'v6_end', 'v6_row', 'asn', 'country', 'name']
+)
+RANGE_COLUMNS = ['start', 'end', 'asn', 'country', 'name']
+
+# IPv6 halves as one lexicographically ordered key for searchsorted/sorting
+_V6_KEY = np.dtype([('high', '<u8'), ('low', '<u8')])
+
+_MASK64 = (1 << 64) - 1
+
+def _parse_one(text):
+    """(family, v4, high, low) of one address; IPv4-mapped IPv6 counts as IPv4."""
+    try:
+        address = ipaddress.ip_address(str(text).strip())
+    except ValueError:
+        return FAMILY_INVALID, 0, 0, 0
+    if address.version == 6 and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped
+    if address.version == 4:
+        return FAMILY_V4, int(address), 0, 0
+    value = int(address)
+    return FAMILY_V6, 0, value >> 64, value & _MASK64
+
+def parse_ips(values):
+    """Parse an IP Series (or array) into IPArrays.
+
+    Each distinct string is parsed once and scattered back by its factorized
+    code, so the cost scales with the number of distinct addresses.
+    """
+    codes, uniques = pd.factorize(pd.Series(values, copy=False))
+    parsed = [_parse_one(text) for text in uniques]
+    family = np.array([p[0] for p in parsed] + [FAMILY_INVALID], dtype=np.uint8)
+    v4 = np.array([p[1] for p in parsed] + [0], dtype=np.uint32)
+    high = np.array([p[2] for p in parsed] + [0], dtype=np.uint64)
+    low = np.array([p[3] for p in parsed] + [0], dtype=np.uint64)
+    # The NaN sentinel (-1) picks the trailing invalid entry
+    return IPArrays(family[codes], v4[codes], high[codes], low[codes])
+
+def _v6_keys(high, low):
+    keys = np.empty(len(high), dtype=_V6_KEY)
+    keys['high'], keys['low'] = high, low
+    return keys
+
+def _mask_v6(high, low, prefix):
+    if prefix <= 64:
+        shift = np.uint64(64 - prefix)
+        return (high >> shift) << shift if prefix else np.zeros_like(high), np.zeros_like(low)
+    shift = np.uint64(128 - prefix)
+    return high, (low >> shift) << shift
+
+def prefix_keys(ips, v4_prefix=24, v6_prefix=64):
+    """Mask every address to its network prefix; returns IPArrays of network addresses."""
+    shift = np.uint32(32 - v4_prefix)
+    v4 = (ips.v4 >> shift) << shift if v4_prefix else np.zeros_like(ips.v4)
+    high, low = _mask_v6(ips.v6_high, ips.v6_low, v6_prefix)
+    return IPArrays(ips.family, v4, high, low)
+
+def format_ip(family, v4, high, low):
+    if family == FAMILY_V4:
+        return str(ipaddress.IPv4Address(int(v4)))
+    if family == FAMILY_V6:
+        return str(ipaddress.IPv6Address((int(high) << 64) | int(low)))
+    return 'Invalid'
+
+def _changes(arrays):
+    """True where any of the (sorted, equal-length) arrays differs from the previous row."""
+    changed = np.zeros(len(arrays[0]), dtype=bool)
+    if len(changed):
+        changed[0] = True
+    for array in arrays:
+        changed[1:] |= array[1:] != array[:-1]
+    return changed
+
+def prefix_counts(ips, v4_prefix=24, v6_prefix=64):
+    """Events and distinct addresses per /v4_prefix and /v6_prefix network, busiest first."""
+    valid = ips.family != FAMILY_INVALID
+    ips = IPArrays(*(array[valid] for array in ips))
+    networks = prefix_keys(ips, v4_prefix, v6_prefix)
+    order = np.lexsort((ips.v6_low, ips.v6_high, ips.v4,
+                        networks.v6_low, networks.v6_high, networks.v4, networks.family))
+    sorted_networks = IPArrays(*(array[order] for array in networks))
+    sorted_ips = IPArrays(*(array[order] for array in ips))
+
+    new_network = _changes(sorted_networks)
+    new_address = _changes(sorted_networks + sorted_ips)
+    starts = np.flatnonzero(new_network)
+    group = np.cumsum(new_network) - 1
+    counts = pd.DataFrame({
+        'Prefix': [
+            f"{format_ip(*(array[i] for array in sorted_networks))}/"
+            f"{v4_prefix if sorted_networks.family[i] == FAMILY_V4 else v6_prefix}"
+            for i in starts
+        ],
+        'Family': np.where(sorted_networks.family[starts] == FAMILY_V4, 'IPv4', 'IPv6'),
+        'Events': np.diff(np.append(starts, len(order))),
+        'Addresses': np.bincount(group[new_address], minlength=len(starts)),
+    })
+    return counts.sort_values('Events', ascending=False, kind='stable').reset_index(drop=True)
+
+def _parse_range_bounds(values):
+    parsed = [_parse_one(text) for text in values]
+    return (np.array([p[0] for p in parsed], dtype=np.uint8),
+            np.array([p[1] for p in parsed], dtype=np.uint32),
+            np.array([p[2] for p in parsed], dtype=np.uint64),
+            np.array([p[3] for p in parsed], dtype=np.uint64))
+
+def build_range_table(ranges):
+    """Build a RangeTable from a frame with start, end, asn, country and name columns.
+
+    Ranges must not overlap within a family (as in the iptoasn.com dumps).
+    """
+    ranges = ranges.reset_index(drop=True)
+    start_family, start_v4, start_high, start_low = _parse_range_bounds(ranges['start'])
+    end_family, end_v4, end_high, end_low = _parse_range_bounds(ranges['end'])
+
+    v4_rows = np.flatnonzero((start_family == FAMILY_V4) & (end_family == FAMILY_V4))
+    v4_rows = v4_rows[np.argsort(start_v4[v4_rows], kind='stable')]
+    v6_rows = np.flatnonzero((start_family == FAMILY_V6) & (end_family == FAMILY_V6))
+    v6_start = _v6_keys(start_high[v6_rows], start_low[v6_rows])
+    v6_order = np.argsort(v6_start, kind='stable')
+    v6_rows = v6_rows[v6_order]
+    return RangeTable(
+        start_v4[v4_rows], end_v4[v4_rows], v4_rows,
+        v6_start[v6_order], _v6_keys(end_high[v6_rows], end_low[v6_rows]), v6_rows,
+        ranges['asn'].to_numpy(), ranges['country'].to_numpy(), ranges['name'].to_numpy()
+    )
+
+def load_range_table(path):
+    """Load an offline IP range -> network table.
+
+    Accepts the iptoasn.com ip2asn-combined/-v4/-v6 TSV layout (range_start,
+    range_end, AS_number, country_code, AS_description; no header) or a CSV
+    with those five columns, with or without a header row.
+    """
+    try:
+        sep = '\t' if '.tsv' in path.lower() else ','
+        ranges = pd.read_csv(path, sep=sep, header=None, names=RANGE_COLUMNS, usecols=range(5),
+                             dtype=str, keep_default_na=False, quoting=3 if sep == '\t' else 0)
+        if len(ranges) and _parse_one(ranges['start'].iloc[0])[0] == FAMILY_INVALID:
+            ranges = ranges.iloc[1:]  # Header row
+        return build_range_table(ranges)
+    except Exception as e:
+        raise ValueError(f"Error reading IP range table: {str(e)}")
+
+def lookup_networks(ips, table):
+    """Row of table whose range contains each address (binary search), or -1."""
+    rows = np.full(len(ips.family), -1, dtype=np.int64)
+
+    v4 = np.flatnonzero(ips.family == FAMILY_V4)
+    if len(v4) and len(table.v4_start):
+        candidate = np.searchsorted(table.v4_start, ips.v4[v4], side='right') - 1
+        hit = (candidate >= 0) & (ips.v4[v4] <= table.v4_end[np.maximum(candidate, 0)])
+        rows[v4[hit]] = table.v4_row[candidate[hit]]
+
+    v6 = np.flatnonzero(ips.family == FAMILY_V6)
+    if len(v6) and len(table.v6_start):
+        keys = _v6_keys(ips.v6_high[v6], ips.v6_low[v6])
+        candidate = np.searchsorted(table.v6_start, keys, side='right') - 1
+        ends = table.v6_end[np.maximum(candidate, 0)]
+        inside = (keys['high'] < ends['high']) | ((keys['high'] == ends['high']) & (keys['low'] <= ends['low']))
+        hit = (candidate >= 0) & inside
+        rows[v6[hit]] = table.v6_row[candidate[hit]]
+    return rows
+
+def network_counts(ips, table):
+    """Events and distinct addresses per network (ASN) of the range table, busiest first."""
+    rows = lookup_networks(ips, table)
+    found = np.flatnonzero(rows >= 0)
+    rows = rows[found]
+    order = np.lexsort((ips.v6_low[found], ips.v6_high[found], ips.v4[found], rows))
+    rows = rows[order]
+    new_address = _changes([rows, ips.v4[found][order], ips.v6_high[found][order], ips.v6_low[found][order]])
+    networks, events = np.unique(rows, return_counts=True)
+    addresses = np.unique(rows[new_address], return_counts=True)[1]
+    # Several ranges can belong to one ASN; fold them together
+    counts = pd.DataFrame({
+        'ASN': table.asn[networks],
+        'Country': table.country[networks],
+        'Network': table.name[networks],
+        'Events': events,
+        'Addresses': addresses,
+    })
+    counts = counts.groupby(['ASN', 'Country', 'Network'], sort=False, as_index=False)[['Events', 'Addresses']].sum()
+    return counts.sort_values('Events', ascending=False, kind='stable').reset_index(drop=True)
+
+def format_ip_breakdown(ips, table=None, top=5):
+    """Summary section for the /24 and /64 prefixes and, given a range table, the networks."""
+    prefixes = prefix_counts(ips)
+    v4 = int((prefixes['Family'] == 'IPv4').sum())
+    lines = [
+        f"• IP Prefixes: {v4} IPv4 /24 and {len(prefixes) - v4} IPv6 /64 "
+        f"({int(prefixes['Addresses'].sum())} addresses)"
+    ]
+    lines += [f"  - {row.Prefix}: {row.Events} events from {row.Addresses} addresses"
+              for row in prefixes.head(top).itertuples(index=False)]
+    if table is not None:
+        networks = network_counts(ips, table)
+        lines.append(f"• Networks (ASN): {len(networks)}")
+        lines += [f"  - AS{row.ASN} {row.Network} ({row.Country}): {row.Events} events"
+                  for row in networks.head(top).itertuples(index=False)]
+    return "\n".join(lines)
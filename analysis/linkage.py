@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+from utils.timebins import epoch_ns
+from .common import int64_to_timestamps, label_codes, to_timedelta_ns
+
+DEFAULT_SESSION_GAP = '30min'
+DEFAULT_LINK_WINDOW = '10min'
+# Candidate session pairs expanded at once; bounds memory on IPs shared by many sessions
+MAX_PAIRS_PER_BLOCK = 5_000_000
+
+SESSION_COLUMNS = ['IP Address', 'Device', 'Start', 'End', 'Events']
+EDGE_COLUMNS = ['Device A', 'Device B', 'Weight', 'Shared IPs', 'First Seen', 'Last Seen']
+
+def device_columns(df):
+    """The columns that identify a device: Device Type plus the decoded UA fields when present."""
+    return [column for column in ('Device Type', 'OS', 'Client App') if column in df.columns]
+
+def _sessionize(df, session_gap, columns):
+    """Sessionize df into parallel arrays sorted by (IP, device, start).
+
+    Events are sorted once by (IP, device, time); a session ends where the key
+    changes or the gap to the next event exceeds session_gap.
+    """
+    df = df[df['Timestamp'].notna()]
+    times = epoch_ns(df['Timestamp'])
+    ip_codes, ip_labels = label_codes(df, ['IP Address'])
+    device_codes, device_labels = label_codes(df, columns or device_columns(df))
+    order = np.lexsort((times, device_codes, ip_codes))
+    times, ip_codes, device_codes = times[order], ip_codes[order], device_codes[order]
+
+    breaks = np.ones(len(times), dtype=bool)
+    breaks[1:] = (
+        (ip_codes[1:] != ip_codes[:-1])
+        | (device_codes[1:] != device_codes[:-1])
+        | (np.diff(times) > to_timedelta_ns(session_gap))
+    )
+    first = np.flatnonzero(breaks)
+    last = np.append(first[1:], len(times)) - 1
+    return {
+        'ip': ip_codes[first], 'ip_labels': np.asarray(ip_labels, dtype=object),
+        'device': device_codes[first], 'device_labels': np.asarray(device_labels, dtype=object),
+        'start': times[first], 'end': times[last], 'events': last - first + 1,
+    }
+
+def build_sessions(df, session_gap=DEFAULT_SESSION_GAP, columns=None):
+    """One row per session of consecutive events from the same (IP, device)."""
+    sessions = _sessionize(df, session_gap, columns)
+    tz = getattr(df['Timestamp'].dtype, 'tz', None)
+    return pd.DataFrame({
+        'IP Address': sessions['ip_labels'][sessions['ip']],
+        'Device': sessions['device_labels'][sessions['device']],
+        'Start': int64_to_timestamps(sessions['start'], tz),
+        'End': int64_to_timestamps(sessions['end'], tz),
+        'Events': sessions['events'],
+    }, columns=SESSION_COLUMNS)
+
+def _window_partners(ip, start, end, window_ns):
+    """For sessions sorted by (IP, start), the exclusive end of each one's partner range.
+
+    Session j > i is a partner of i when it is on the same IP and starts no
+    later than window_ns after i ends. Times are replaced by dense ranks so
+    the (IP, time) key packs into one int64 for a single searchsorted.
+    """
+    ranks = np.unique(np.concatenate([start, end + window_ns]), return_inverse=True)[1]
+    stride = len(ranks) + 1
+    start_keys = ip * stride + ranks[:len(start)]
+    query_keys = ip * stride + ranks[len(start):]
+    return np.searchsorted(start_keys, query_keys, side='right')
+
+def _aggregate_pairs(keys, ips, counts, first, last):
+    """Collapse pairs to one row per (edge key, IP): summed counts, first and last seen."""
+    order = np.lexsort((ips, keys))
+    keys, ips, counts, first, last = keys[order], ips[order], counts[order], first[order], last[order]
+    boundaries = np.ones(len(keys), dtype=bool)
+    boundaries[1:] = (keys[1:] != keys[:-1]) | (ips[1:] != ips[:-1])
+    starts = np.flatnonzero(boundaries)
+    return (keys[starts], ips[starts], np.add.reduceat(counts, starts),
+            np.minimum.reduceat(first, starts), np.maximum.reduceat(last, starts))
+
+def link_devices(df, window=DEFAULT_LINK_WINDOW, session_gap=DEFAULT_SESSION_GAP, columns=None,
+                 max_pairs=MAX_PAIRS_PER_BLOCK):
+    """Build the device-linkage graph of df as an edge list.
+
+    Two devices are linked each time sessions of theirs on the same IP start
+    within window of each other's activity. Weight counts those session pairs,
+    Shared IPs the distinct IPs they were seen on together, and First/Last Seen
+    span the times the links were observed.
+    """
+    sessions = _sessionize(df, session_gap, columns)
+    order = np.lexsort((sessions['start'], sessions['ip']))
+    ip, device = sessions['ip'][order], sessions['device'][order]
+    start, end = sessions['start'][order], sessions['end'][order]
+    n_devices = len(sessions['device_labels'])
+
+    positions = np.arange(len(start))
+    partners = np.maximum(_window_partners(ip, start, end, to_timedelta_ns(window)) - positions - 1, 0)
+    totals = np.cumsum(partners)
+
+    blocks = []
+    block_start = 0
+    while block_start < len(start):
+        # Expand [block_start, block_end) so about max_pairs candidate pairs are materialized
+        offset = totals[block_start - 1] if block_start else 0
+        block_end = max(int(np.searchsorted(totals, offset + max_pairs, side='right')), block_start + 1)
+        counts = partners[block_start:block_end]
+        left = np.repeat(positions[block_start:block_end], counts)
+        right = left + 1 + np.arange(len(left)) - np.repeat(np.cumsum(counts) - counts, counts)
+        block_start = block_end
+
+        cross = device[left] != device[right]
+        left, right = left[cross], right[cross]
+        if not len(left):
+            continue
+        low = np.minimum(device[left], device[right])
+        high = np.maximum(device[left], device[right])
+        # right starts no earlier than left: the link is seen from its start until the
+        # earlier of the two sessions ends (just the start when they only fall within window)
+        seen_first = start[right]
+        seen_last = np.maximum(seen_first, np.minimum(end[left], end[right]))
+        blocks.append(_aggregate_pairs(
+            low * n_devices + high, ip[left], np.ones(len(left), dtype='int64'), seen_first, seen_last
+        ))
+
+    tz = getattr(df['Timestamp'].dtype, 'tz', None)
+    if not blocks:
+        edges = pd.DataFrame(columns=EDGE_COLUMNS)
+        edges['First Seen'] = int64_to_timestamps([], tz)
+        edges['Last Seen'] = int64_to_timestamps([], tz)
+        return edges.astype({'Weight': 'int64', 'Shared IPs': 'int64'})
+
+    keys, ips, counts, seen_first, seen_last = _aggregate_pairs(
+        *(np.concatenate(parts) for parts in zip(*blocks))
+    )
+    edge_starts = np.flatnonzero(np.append(True, keys[1:] != keys[:-1]))
+    edge_keys = keys[edge_starts]
+    labels = sessions['device_labels']
+    edges = pd.DataFrame({
+        'Device A': labels[edge_keys // n_devices],
+        'Device B': labels[edge_keys % n_devices],
+        'Weight': np.add.reduceat(counts, edge_starts),
+        'Shared IPs': np.diff(np.append(edge_starts, len(keys))),
+        'First Seen': int64_to_timestamps(np.minimum.reduceat(seen_first, edge_starts), tz),
+        'Last Seen': int64_to_timestamps(np.maximum.reduceat(seen_last, edge_starts), tz),
+    }, columns=EDGE_COLUMNS)
+    return edges.sort_values(['Weight', 'Shared IPs'], ascending=False, kind='stable').reset_index(drop=True)
+
+def format_linkage_breakdown(edges, top=10):
+    """Summary section listing the most strongly linked device pairs."""
+    if edges is None or not len(edges):
+        return "• Cross-Device Links: none found"
+    devices = pd.unique(pd.concat([edges['Device A'], edges['Device B']]))
+    lines = [f"• Cross-Device Links: {len(edges)} between {len(devices)} devices"]
+    for edge in edges.head(top).itertuples(index=False):
+        lines.append(
+            f"  - {edge[0]} ↔ {edge[1]}: {edge[2]} links over {edge[3]} IPs "
+            f"({edge[4]:%Y-%m-%d} to {edge[5]:%Y-%m-%d})"
+        )
+    return "\n".join(lines)
@@ -0,0 +1 @@
+from .batch import analyze_account, discover_accounts, run_batch
\ No newline at end of file
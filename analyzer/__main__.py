@@ -0,0 +1,46 @@
+import argparse
+import sys
+from .batch import run_batch
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m analyzer",
+        description="Headless Google Takeout tracking analysis."
+    )
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    batch = subcommands.add_parser(
+        "batch",
+        help="Analyze many Takeout exports in parallel",
+        description="Analyze every Takeout export found in the given zips, directories or CSVs."
+    )
+    batch.add_argument("inputs", nargs="+", help="Takeout zips, directories of exports, or CSVs")
+    batch.add_argument("-o", "--output", default="analysis_output", help="Output directory")
+    batch.add_argument("-j", "--workers", type=int, default=None,
+                       help="Worker processes (default: all cores)")
+    batch.add_argument("--no-charts", action="store_true", help="Skip rendering PNG charts")
+    batch.add_argument("--cache-dir", default=None,
+                       help="Reuse parsed results from this on-disk cache directory")
+    batch.add_argument("--ip-ranges", default=None,
+                       help="Offline IP range -> ASN table (iptoasn.com TSV or CSV) for per-network counts")
+    batch.add_argument("--diagnostics", action="store_true",
+                       help="Write per-stage timings and memory to diagnostics.json for each export")
+
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        summaries = run_batch(
+            args.inputs,
+            args.output,
+            workers=args.workers,
+            charts=not args.no_charts,
+            cache_dir=args.cache_dir,
+            ip_ranges=args.ip_ranges,
+            diagnostics=args.diagnostics
+        )
+        failed = [summary for summary in summaries if summary['status'] != 'ok']
+        print(f"Analyzed {len(summaries)} export(s), {len(failed)} failed. Results in {args.output}")
+        return 1 if failed or not summaries else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+import csv
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use('Agg')  # Headless rendering; never pull in a GUI toolkit
+import pandas as pd
+
+from analysis import (
+    detect_anomalies, device_join_table, join_devices, link_devices, load_range_table, network_counts, parse_ips,
+    prefix_counts
+)
+from parsers import (
+    ActivityCube, ParseCache, cached_parse, detect_parser, find_takeout_members, parse_activity_csv,
+    parse_device_csv, takeout_export_name, takeout_parts
+)
+from parsers.archive import ACCESS_LOG_DIR, MEMBER_PREFIXES
+from utils import (
+    INSTRUMENTATION, STACK_COLUMNS, TIMEFRAMES, WEEKDAYS, compute_time_series, create_bar_chart,
+    create_heatmap_chart, create_line_chart, create_pie_chart, create_stacked_chart, span
+)
+
+SUMMARY_FIELDS = [
+    'account', 'status', 'activities', 'unique_devices', 'unique_ips', 'ip_prefixes', 'networks',
+    'device_links', 'alerts', 'earliest', 'latest', 'devices', 'matched_activities', 'error'
+]
+
+def _account_name(path):
+    return takeout_export_name(os.path.normpath(path))
+
+def _zip_account(zip_path):
+    parts = takeout_parts(zip_path)
+    account = {'name': _account_name(parts[0]), 'activities': None, 'devices': None}
+    for kind in MEMBER_PREFIXES:
+        if find_takeout_members(parts, kind):
+            account[kind] = parts
+    return account
+
+def _csv_kind(file_name):
+    for kind, prefix in MEMBER_PREFIXES.items():
+        if file_name.startswith(prefix) and file_name.lower().endswith('.csv'):
+            return kind
+    return None
+
+def discover_accounts(inputs):
+    """Group input zips, directories and CSVs into one job per Takeout export."""
+    accounts = []
+    seen_parts = set()
+
+    def add_zip(zip_path):
+        key = tuple(os.path.abspath(part) for part in takeout_parts(zip_path))
+        if key not in seen_parts:
+            seen_parts.add(key)
+            accounts.append(_zip_account(zip_path))
+
+    for path in inputs:
+        if os.path.isdir(path):
+            for directory, _, files in sorted(os.walk(path)):
+                for file_name in sorted(files):
+                    if file_name.lower().endswith('.zip'):
+                        add_zip(os.path.join(directory, file_name))
+                if os.path.basename(directory) == ACCESS_LOG_DIR:
+                    # An extracted export: .../<account>/Takeout/Access Log Activity/*.csv
+                    account_dir = os.path.dirname(os.path.dirname(directory)) or directory
+                    account = {'name': _account_name(account_dir), 'activities': None, 'devices': None}
+                    for file_name in sorted(files):
+                        kind = _csv_kind(file_name)
+                        if kind and account[kind] is None:
+                            account[kind] = os.path.join(directory, file_name)
+                    if account['activities'] or account['devices']:
+                        accounts.append(account)
+        elif path.lower().endswith('.zip'):
+            add_zip(path)
+        else:
+            # Fall back to the header when the file name doesn't say what it is
+            kind = _csv_kind(os.path.basename(path)) or detect_parser(path)[0].name
+            account = {'name': _account_name(path), 'activities': None, 'devices': None}
+            account[kind] = path
+            accounts.append(account)
+
+    # Accounts with the same name get a numeric suffix so their outputs don't collide
+    counts = {}
+    for account in accounts:
+        base = re.sub(r'[^\w.-]+', '_', account['name']) or 'account'
+        counts[base] = counts.get(base, 0) + 1
+        account['name'] = base if counts[base] == 1 else f"{base}_{counts[base]}"
+    return accounts
+
+def _file_stem(column):
+    # 'Device Type' -> 'device_type', 'Sub-Product Name' -> 'sub_product_name'
+    return re.sub(r'\W+', '_', column.lower())
+
+def _write_counts_csv(path, counts, key_header):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow([key_header, 'count'])
+        for key, count in counts.items():
+            writer.writerow([key, int(count)])
+
+def analyze_account(account, output_dir, charts=True, cache_dir=None, ip_ranges=None, diagnostics=False):
+    """Parse one account's exports and write its JSON/CSV summaries and PNG charts.
+
+    ip_ranges is an optional IP range table path for the per-network counts;
+    diagnostics also writes the per-stage timings to diagnostics.json.
+    """
+    account_dir = os.path.join(output_dir, account['name'])
+    os.makedirs(account_dir, exist_ok=True)
+    INSTRUMENTATION.enabled = diagnostics
+    INSTRUMENTATION.reset()
+    cache = ParseCache(cache_dir) if cache_dir else None
+
+    def parse(parser, source, **parser_kwargs):
+        if cache is not None:
+            return cached_parse(parser, source, cache=cache, **parser_kwargs)
+        return parser(source, **parser_kwargs)
+
+    summary = {'account': account['name'], 'status': 'ok'}
+    try:
+        device_df = None
+        if account['devices']:
+            # The descriptive fields name the physical devices the activities are joined to
+            device_df, device_breakdown = parse(parse_device_csv, account['devices'], include_device_fields=True)
+            summary['devices'] = int(len(device_df))
+            summary['device_breakdown'] = device_breakdown
+        if account['activities']:
+            df, breakdown = parse(parse_activity_csv, account['activities'], include_ua_fields=True)
+            stack_columns = STACK_COLUMNS
+            if device_df is not None:
+                with span('device list join', rows=len(df)):
+                    join = join_devices(df, device_df)
+                    device_join = device_join_table(df, device_df, join)
+                df = df.assign(Device=join.matches)
+                stack_columns += ('Device',)
+                summary['matched_activities'] = int((join.levels >= 0).sum())
+                device_join.to_csv(os.path.join(account_dir, 'device_join.csv'), index=False)
+            # Every count below is a query on the cube instead of another pass over the rows
+            with span('activity cube', rows=len(df)):
+                cube = ActivityCube(df)
+            app_counts = cube.app_counts_series()
+            device_counts = cube.device_counts_series()
+            time_series = compute_time_series(cube.daily_counts())
+            hour_of_week = cube.hour_of_week_counts()
+            day_labels = {column: cube.day_label_counts(column) for column in stack_columns}
+            with span('device linkage', rows=len(df)):
+                device_links = link_devices(df)
+            with span('IP prefixes', rows=len(df)):
+                ips = parse_ips(df['IP Address'])
+                prefixes = prefix_counts(ips)
+            with span('anomaly detection', rows=len(df)):
+                alerts = detect_anomalies(df)
+            earliest, latest = cube.time_bounds()
+            summary.update({
+                'activities': int(len(cube)),
+                'unique_devices': int(len(device_counts)),
+                'unique_ips': cube.unique_ips(),
+                'earliest': str(earliest) if pd.notna(earliest) else None,
+                'latest': str(latest) if pd.notna(latest) else None,
+                'apps': {str(k): int(v) for k, v in app_counts.items()},
+                'device_types': {str(k): int(v) for k, v in device_counts.items()},
+                'activity_breakdown': breakdown,
+                'ip_prefixes': int(len(prefixes)),
+                'device_links': int(len(device_links)),
+                'alerts': int(len(alerts)),
+                'alert_kinds': {str(k): int(v) for k, v in alerts['Kind'].value_counts().items()},
+            })
+            device_links.to_csv(os.path.join(account_dir, 'device_links.csv'), index=False)
+            prefixes.to_csv(os.path.join(account_dir, 'ip_prefixes.csv'), index=False)
+            alerts.to_csv(os.path.join(account_dir, 'alerts.csv'), index=False)
+            if ip_ranges:
+                networks = network_counts(ips, load_range_table(ip_ranges))
+                summary['networks'] = int(len(networks))
+                networks.to_csv(os.path.join(account_dir, 'ip_networks.csv'), index=False)
+            _write_counts_csv(os.path.join(account_dir, 'activities_by_app.csv'), app_counts, 'App Used')
+            _write_counts_csv(
+                os.path.join(account_dir, 'activities_by_device_type.csv'), device_counts, 'Device Type'
+            )
+            # The other dimensions the export fills in (OS, client app, sub-product, region, ...)
+            for column in cube.dimensions:
+                counts = cube.counts(column)
+                if column not in ('App Used', 'Device Type') and len(counts):
+                    _write_counts_csv(
+                        os.path.join(account_dir, f'activities_by_{_file_stem(column)}.csv'), counts, column
+                    )
+            for timeframe in TIMEFRAMES:
+                _write_counts_csv(
+                    os.path.join(account_dir, f'activities_{timeframe.lower()}.csv'),
+                    time_series[timeframe], 'Date'
+                )
+            pd.DataFrame(hour_of_week, index=pd.Index(WEEKDAYS, name='weekday')).to_csv(
+                os.path.join(account_dir, 'activities_by_hour_of_week.csv'))
+            for column, counts in day_labels.items():
+                counts.rename_axis('Date').to_csv(
+                    os.path.join(account_dir, f'daily_activities_by_{_file_stem(column)}.csv'))
+            if charts:
+                create_bar_chart(app_counts=app_counts).savefig(
+                    os.path.join(account_dir, 'activities_by_app.png'))
+                create_pie_chart(device_counts=device_counts).savefig(
+                    os.path.join(account_dir, 'activities_by_device_type.png'))
+                for timeframe in TIMEFRAMES:
+                    create_line_chart(timeframe=timeframe, counts=time_series[timeframe], alerts=alerts).savefig(
+                        os.path.join(account_dir, f'activities_{timeframe.lower()}.png'))
+                create_heatmap_chart(counts=hour_of_week).savefig(
+                    os.path.join(account_dir, 'activities_by_hour_of_week.png'))
+                for column, counts in day_labels.items():
+                    create_stacked_chart(column=column, timeframe='Weekly', day_counts=counts).savefig(
+                        os.path.join(account_dir, f'weekly_activities_by_{_file_stem(column)}.png'))
+    except Exception as e:
+        summary['status'] = 'error'
+        summary['error'] = str(e)
+
+    with open(os.path.join(account_dir, 'summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+    if diagnostics:
+        INSTRUMENTATION.write_json(os.path.join(account_dir, 'diagnostics.json'))
+    return summary
+
+def run_batch(inputs, output_dir, workers=None, charts=True, cache_dir=None, ip_ranges=None,
+              diagnostics=False, log=print):
+    """Analyze every discovered account across a process pool; returns the summaries."""
+    accounts = discover_accounts(inputs)
+    os.makedirs(output_dir, exist_ok=True)
+    if not accounts:
+        log("No Takeout exports found.")
+        return []
+
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(
+                analyze_account, account, output_dir, charts, cache_dir, ip_ranges, diagnostics
+            ): account
+            for account in accounts
+        }
+        for future in as_completed(futures):
+            account = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = {'account': account['name'], 'status': 'error', 'error': str(e)}
+            summaries.append(summary)
+            log(f"{summary['account']}: {summary['status']}"
+                + (f" ({summary['error']})" if summary.get('error') else ""))
+
+    summaries.sort(key=lambda summary: summary['account'])
+    with open(os.path.join(output_dir, 'batch_summary.json'), 'w', encoding='utf-8') as f:
+        json.dump(summaries, f, indent=2)
+    with open(os.path.join(output_dir, 'batch_summary.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(summaries)
+    return summaries
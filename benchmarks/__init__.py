@@ -0,0 +1,2 @@
+from .generate import generate_takeout, iter_activity_frames, iter_device_frames
+from .suite import BENCHMARKS, compare_to_baseline, load_results, run_suite, save_results
\ No newline at end of file
@@ -0,0 +1,89 @@
+import argparse
+import os
+import sys
+from .generate import generate_takeout
+from .startup import STARTUP_BUDGET, measure_startup
+from .suite import (
+    BENCHMARKS, DEFAULT_BASELINE, DEFAULT_REPEAT, DEFAULT_SCALES, DEFAULT_TOLERANCE, compare_to_baseline,
+    load_results, run_suite, save_results
+)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Synthetic Takeout data and performance benchmarks."
+    )
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    generate = subcommands.add_parser(
+        "generate",
+        help="Write a synthetic Takeout export",
+        description="Write realistic Activities and Devices CSVs (or a Takeout zip) of any size."
+    )
+    generate.add_argument("output", help="Directory to write the export to")
+    generate.add_argument("-n", "--rows", type=int, default=100_000, help="Activity rows")
+    generate.add_argument("--device-rows", type=int, default=None,
+                          help="Device rows (default: one per thousand activities)")
+    generate.add_argument("--seed", type=int, default=0, help="Random seed")
+    generate.add_argument("--zip", action="store_true", help="Write a takeout-*-001.zip instead of CSVs")
+
+    run = subcommands.add_parser(
+        "run",
+        help="Time and memory-profile the parsers, charts and table",
+        description="Run the benchmarks on synthetic exports and compare them with a baseline."
+    )
+    run.add_argument("-n", "--rows", type=int, nargs="+", default=DEFAULT_SCALES,
+                     help="Row counts to benchmark at (default: %(default)s)")
+    run.add_argument("-r", "--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per benchmark")
+    run.add_argument("-b", "--benchmark", nargs="+", choices=BENCHMARKS, default=None,
+                     help="Only run these benchmarks")
+    run.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline results to compare with")
+    run.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    run.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                     help="Allowed slowdown/growth before a regression is reported (default: %(default)s)")
+    run.add_argument("-o", "--output", default=None, help="Also write the results JSON here")
+    run.add_argument("--data-dir", default=None, help="Keep the generated exports in this directory")
+
+    startup = subcommands.add_parser(
+        "startup",
+        help="Measure how long the GUI module takes to import",
+        description="Import main.py in fresh interpreters and check it stays within the startup budget "
+                    "without loading numpy, pandas or matplotlib."
+    )
+    startup.add_argument("--budget", type=float, default=STARTUP_BUDGET,
+                         help="Allowed import time in seconds (default: %(default)s)")
+    startup.add_argument("-r", "--repeat", type=int, default=DEFAULT_REPEAT, help="Runs; the fastest counts")
+
+    args = parser.parse_args(argv)
+    if args.command == "startup":
+        report = measure_startup(repeat=args.repeat)
+        print(f"import {report['module']}: {report['seconds']:.3f}s (budget {args.budget:.3f}s)")
+        for name, seconds in report['slowest']:
+            print(f"  {seconds * 1000:8.1f} ms  {name}")
+        if report['heavy']:
+            print(f"Loaded at startup: {', '.join(report['heavy'])}")
+        return 1 if report['heavy'] or report['seconds'] > args.budget else 0
+    if args.command == "generate":
+        paths = generate_takeout(args.output, args.rows, args.device_rows, args.seed, as_zip=args.zip)
+        for kind, path in paths.items():
+            print(f"{kind}: {path}")
+        return 0
+
+    results = run_suite(args.rows, args.repeat, args.data_dir, args.benchmark)
+    if args.output:
+        save_results(results, args.output)
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+    regressions = compare_to_baseline(results, load_results(args.baseline), args.tolerance)
+    for key, metric, previous, current, ratio in regressions:
+        print(f"REGRESSION {key} {metric}: {previous} -> {current} ({ratio:.2f}x)")
+    print(f"{len(regressions)} regression(s) against {args.baseline}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+import io
+import os
+import zipfile
+import numpy as np
+import pandas as pd
+
+from parsers.archive import ACCESS_LOG_DIR
+
+ACTIVITIES_NAME = "Activities - A list of Google services accessed by.csv"
+DEVICES_NAME = "Devices - A list of devices (i.e. Nest, Pixel, iPh.csv"
+
+ACTIVITY_HEADER = [
+    'Gaia ID', 'Activity Timestamp', 'IP Address', 'Proxiedhost IP Address', 'Is Non-routable IP Address',
+    'Activity Country', 'Activity Region', 'Activity City', 'User Agent String', 'Product Name',
+    'Sub-Product Name', 'Activity Type', 'Gmail Access Channel'
+]
+DEVICE_HEADER = [
+    'Device Type', 'Brand Name', 'Marketing Name', 'OS', 'OS Version', 'Device Model', 'User Given Name',
+    'Device Last Location', 'Gaia ID'
+]
+
+GENERATOR_CHUNKSIZE = 500_000
+GAIA_ID = '95787835645'
+
+# (device type, UA OS, OS versions, apps) profiles resembling a real export
+UA_PROFILES = [
+    ('MOBILE', 'IOS_OS', ['18.3.1', '18.3.2', '18.2'],
+     ['GMM_APP', 'GMAIL_APP', 'CHROME', 'YOUTUBE_APP', 'DRIVE_APP', 'CALENDAR_APP', 'GSA_APP', 'DOCS_APP']),
+    ('MOBILE', 'ANDROID_OS', ['14', '15'], ['GMM_APP', 'GMAIL_APP', 'CHROME', 'YOUTUBE_APP', 'PHOTOS_APP']),
+    ('PC', 'WINDOWS_OS', [], ['CHROME']),
+    ('PC', 'MAC_OS', ['10.15.7'], ['CHROME', 'OTHER_APP']),
+    ('TABLET', 'IOS_OS', ['18.3.2'], ['YOUTUBE_APP', 'CHROME']),
+    ('UNKNOWN', 'IOS_OS', [], ['GMM_APP', 'CALENDAR_APP', 'OTHER_APP']),
+]
+APP_VERSIONS = ['25.08.0', '25.10.2', '6.0.250224', '134.0.6998.99', '134.0.6998.118', '20.10.3', '4.2508.11800']
+
+PRODUCTS = ['Other', 'Maps', 'Drive', 'Gmail', 'Chrome Sync', 'YouTube', 'Search', 'Calendar', 'Voice', 'News']
+PRODUCT_WEIGHTS = [0.52, 0.24, 0.14, 0.055, 0.02, 0.009, 0.006, 0.0035, 0.0004, 0.0001]
+SUB_PRODUCTS = ['Other', 'Docs', 'Sheets', 'Forms', 'Drawings']
+SUB_PRODUCT_WEIGHTS = [0.86, 0.13, 0.0087, 0.0004, 0.0009]
+
+DEVICE_MODELS = [
+    ('MOBILE', 'Apple', 'iPhone 14 Pro Max', 'iOS', '18.3.2', 'iPhone15,3'),
+    ('MOBILE', 'Apple', 'iPhone 16 Pro Max', 'iOS', '18.3.2', 'iPhone17,2'),
+    ('MOBILE', 'Google', 'Pixel 8', 'Android', '15', 'shiba'),
+    ('PC', '', '', 'Windows', '10.0', ''),
+    ('PC', '', '', 'Mac', '10.15.7', ''),
+    ('TABLET', 'Apple', 'iPad Air', 'iOS', '18.3.2', 'iPad13,16'),
+    ('UNKNOWN', '', '', '', '', ''),
+]
+COUNTRIES = ['US', 'US', 'US', 'CA', 'GB', 'DE']
+
+# (country, region, city) of the IPs the account is used from at home, and on a short trip
+HOME_LOCATIONS = [
+    ('US', 'Maryland', 'Baltimore'), ('US', 'Maryland', 'College Park'), ('US', 'Virginia', 'Arlington'),
+    ('US', 'New York', 'New York'), ('US', 'District of Columbia', 'Washington'),
+]
+HOME_LOCATION_WEIGHTS = [0.45, 0.3, 0.15, 0.07, 0.03]
+TRIP_LOCATIONS = [('FR', 'Ile-de-France', 'Paris'), ('JP', 'Tokyo', 'Tokyo')]
+# Takeout only records locations lately: rows older than this fraction of the log have none
+LOCATED_FRACTION = 2 / 3
+# The trip: this stretch of the log (as fractions from the newest row) goes through trip IPs
+TRIP_ROWS = (0.2, 0.24)
+TRIP_SHARE = 0.3
+ACTIVITY_TYPES = np.array(['User Initiated', 'Non User Initiated'], dtype=object)
+GMAIL_CHANNELS = np.array(['gw', 'sdpi'], dtype=object)
+
+def _user_agents(rng, count):
+    """A pool of UA strings following the Takeout grammar, with fields randomly left out."""
+    agents = []
+    for _ in range(count):
+        device_type, os_name, os_versions, apps = UA_PROFILES[rng.integers(len(UA_PROFILES))]
+        parts = [f"App : {apps[rng.integers(len(apps))]}."]
+        if rng.random() < 0.8:
+            parts.append(f"App Version : {APP_VERSIONS[rng.integers(len(APP_VERSIONS))]}.")
+        parts.append(f"Os : {os_name}.")
+        if os_versions and rng.random() < 0.6:
+            parts.append(f"Os Version : {os_versions[rng.integers(len(os_versions))]}.")
+        parts.append(f"Device Type : {device_type}.")
+        agents.append(' '.join(parts))
+    return np.array(agents + [''], dtype=object)
+
+def _ip_addresses(rng, count):
+    """A pool of IPs: about two thirds IPv6 spread over a few /64s, the rest IPv4."""
+    v6_prefixes = [f"2600:{rng.integers(0x1000, 0xffff):x}:{rng.integers(0xffff):x}:{rng.integers(0xffff):x}"
+                   for _ in range(max(1, count // 20))]
+    addresses = []
+    for _ in range(count):
+        if rng.random() < 0.66:
+            prefix = v6_prefixes[rng.integers(len(v6_prefixes))]
+            addresses.append(prefix + ':' + ':'.join(f"{x:x}" for x in rng.integers(0, 0xffff, 4)))
+        else:
+            addresses.append('.'.join(str(x) for x in rng.integers(1, 255, 4)))
+    return np.array(addresses, dtype=object)
+
+def _locations(rng, count):
+    """(country, region, city) columns of an IP pool; about a third of the IPs have no city."""
+    picked = np.array(HOME_LOCATIONS, dtype=object)[rng.choice(len(HOME_LOCATIONS), count, p=HOME_LOCATION_WEIGHTS)]
+    picked[rng.random(count) < 0.3, 2] = ''
+    return picked
+
+def _timestamps(rng, count, newest, span_seconds, chunk_start, total):
+    """Descending 'YYYY-MM-DD HH:MM:SS UTC' strings for rows [chunk_start, chunk_start + count).
+
+    Each chunk covers its own slice of the span so the file is newest-first overall.
+    """
+    high = span_seconds * (1 - chunk_start / total)
+    low = span_seconds * (1 - (chunk_start + count) / total)
+    offsets = np.sort(rng.uniform(low, high, count))[::-1].astype('int64')
+    times = np.datetime64(newest, 's') - (span_seconds - offsets).astype('timedelta64[s]')
+    return np.char.add(np.char.replace(np.datetime_as_string(times, unit='s'), 'T', ' '), ' UTC')
+
+def iter_activity_frames(rows, seed=0, newest='2025-03-25T06:18:42', days=30, chunksize=GENERATOR_CHUNKSIZE):
+    """Yield synthetic Activities rows as DataFrames of at most chunksize rows."""
+    rng = np.random.default_rng(seed)
+    agents = _user_agents(rng, 120)
+    agent_weights = rng.pareto(1.2, len(agents)) + 0.01
+    agent_weights[-1] = agent_weights[:-1].sum() * 0.003  # Blank UA on ~0.3% of rows
+    agent_weights /= agent_weights.sum()
+    ips = _ip_addresses(rng, max(50, min(rows // 400, 100_000)))
+    ip_weights = rng.pareto(1.0, len(ips)) + 0.01
+    ip_weights /= ip_weights.sum()
+    ip_locations = _locations(rng, len(ips))
+    trip_ips = _ip_addresses(rng, 4)
+    trip_locations = np.array(TRIP_LOCATIONS, dtype=object)[np.arange(len(trip_ips)) % len(TRIP_LOCATIONS)]
+    product_weights = np.array(PRODUCT_WEIGHTS) / sum(PRODUCT_WEIGHTS)
+    sub_product_weights = np.array(SUB_PRODUCT_WEIGHTS) / sum(SUB_PRODUCT_WEIGHTS)
+
+    for start in range(0, rows, chunksize):
+        count = min(chunksize, rows - start)
+        position = (start + np.arange(count)) / rows  # 0 is the newest row
+        ip_codes = rng.choice(len(ips), count, p=ip_weights)
+        addresses, locations = ips[ip_codes], ip_locations[ip_codes]
+        trip = (position >= TRIP_ROWS[0]) & (position < TRIP_ROWS[1]) & (rng.random(count) < TRIP_SHARE)
+        trip_codes = rng.integers(len(trip_ips), size=int(trip.sum()))
+        addresses[trip], locations[trip] = trip_ips[trip_codes], trip_locations[trip_codes]
+        locations[position >= LOCATED_FRACTION] = ''
+        products = np.array(PRODUCTS, dtype=object)[rng.choice(len(PRODUCTS), count, p=product_weights)]
+        gmail = products == 'Gmail'
+        # Like real exports, only a few (mostly Gmail) rows say how they were made
+        activity_types = np.where(rng.random(count) < np.where(gmail, 0.04, 0.001),
+                                  ACTIVITY_TYPES[(rng.random(count) < 0.3).astype(int)], '')
+        channels = np.where(gmail & (rng.random(count) < 0.02), GMAIL_CHANNELS[rng.integers(2, size=count)], '')
+        yield pd.DataFrame({
+            'Gaia ID': GAIA_ID,
+            'Activity Timestamp': _timestamps(rng, count, newest, days * 86400, start, rows),
+            'IP Address': addresses,
+            'Proxiedhost IP Address': '',
+            'Is Non-routable IP Address': 'No',
+            'Activity Country': locations[:, 0],
+            'Activity Region': locations[:, 1],
+            'Activity City': locations[:, 2],
+            'User Agent String': agents[rng.choice(len(agents), count, p=agent_weights)],
+            'Product Name': products,
+            'Sub-Product Name': np.array(SUB_PRODUCTS, dtype=object)[
+                rng.choice(len(SUB_PRODUCTS), count, p=sub_product_weights)],
+            'Activity Type': activity_types,
+            'Gmail Access Channel': channels,
+        }, columns=ACTIVITY_HEADER)
+
+def iter_device_frames(rows, seed=0, newest='2025-03-25T06:18:42', days=30, chunksize=GENERATOR_CHUNKSIZE):
+    """Yield synthetic Devices rows, including the multiline Device Last Location cells."""
+    rng = np.random.default_rng(seed + 1)
+    models = np.array(DEVICE_MODELS, dtype=object)
+    for start in range(0, rows, chunksize):
+        count = min(chunksize, rows - start)
+        picked = models[rng.integers(len(models), size=count)]
+        countries = np.array(COUNTRIES, dtype=object)[rng.integers(len(COUNTRIES), size=count)]
+        times = _timestamps(rng, count, newest, days * 86400, start, rows).astype(object)
+        location = ('Country ISO: ' + countries + '\nLast Activity Time: ' + times).astype(object)
+        location[rng.random(count) < 0.1] = ''  # Devices with no known location
+        yield pd.DataFrame({
+            'Device Type': picked[:, 0],
+            'Brand Name': picked[:, 1],
+            'Marketing Name': picked[:, 2],
+            'OS': picked[:, 3],
+            'OS Version': picked[:, 4],
+            'Device Model': picked[:, 5],
+            'User Given Name': picked[:, 2],
+            'Device Last Location': location,
+            'Gaia ID': GAIA_ID,
+        }, columns=DEVICE_HEADER)
+
+def _write_frames(f, frames, header):
+    wrote_header = False
+    for frame in frames:
+        frame.to_csv(f, index=False, header=not wrote_header)
+        wrote_header = True
+    if not wrote_header:
+        f.write(','.join(header) + '\n')
+
+def generate_takeout(output_dir, activity_rows, device_rows=None, seed=0, as_zip=False,
+                     chunksize=GENERATOR_CHUNKSIZE):
+    """Write a synthetic Takeout export under output_dir.
+
+    device_rows defaults to one device per thousand activities (at least 10).
+    Returns {'activities': path, 'devices': path}; with as_zip both are the
+    path of a single takeout-*-001.zip holding the two CSVs.
+    """
+    if device_rows is None:
+        device_rows = max(10, activity_rows // 1000)
+    members = [
+        (ACTIVITIES_NAME, iter_activity_frames(activity_rows, seed, chunksize=chunksize), ACTIVITY_HEADER),
+        (DEVICES_NAME, iter_device_frames(device_rows, seed, chunksize=chunksize), DEVICE_HEADER),
+    ]
+    os.makedirs(output_dir, exist_ok=True)
+    if as_zip:
+        zip_path = os.path.join(output_dir, f"takeout-synthetic-{activity_rows}-001.zip")
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name, frames, header in members:
+                with zf.open(f"Takeout/{ACCESS_LOG_DIR}/{name}", 'w', force_zip64=True) as raw:
+                    with io.TextIOWrapper(raw, encoding='utf-8', newline='') as f:
+                        _write_frames(f, frames, header)
+        return {'activities': zip_path, 'devices': zip_path}
+
+    csv_dir = os.path.join(output_dir, 'Takeout', ACCESS_LOG_DIR)
+    os.makedirs(csv_dir, exist_ok=True)
+    paths = {}
+    for (name, frames, header), kind in zip(members, ('activities', 'devices')):
+        paths[kind] = os.path.join(csv_dir, name)
+        with open(paths[kind], 'w', newline='', encoding='utf-8') as f:
+            _write_frames(f, frames, header)
+    return paths
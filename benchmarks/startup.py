@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+from utils.startup import HEAVY_MODULES
+
+# Seconds `import main` may take in a fresh interpreter, i.e. before the window can appear
+STARTUP_BUDGET = 0.25
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _import_times(module, python):
+    """{module name: (self seconds, cumulative seconds)} from `python -X importtime -c 'import module'`."""
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, cwd=REPO_ROOT
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        fields = line.removeprefix('import time:').split('|')
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            times[fields[2].strip()] = (int(fields[0]) / 1e6, int(fields[1]) / 1e6)
+    return times
+
+def measure_startup(module='main', repeat=3, python=sys.executable, top=10):
+    """Import module in fresh interpreters and report the fastest run.
+
+    Returns {'module', 'seconds' (cumulative import time of module), 'heavy'
+    (the HEAVY_MODULES it loaded), 'slowest' ([(name, self seconds)] of the
+    top slowest imports)}.
+    """
+    best = None
+    for _ in range(repeat):
+        times = _import_times(module, python)
+        if best is None or times[module][1] < best[module][1]:
+            best = times
+    loaded = {name.split('.')[0] for name in best}
+    slowest = sorted(((name, own) for name, (own, _) in best.items()), key=lambda item: -item[1])[:top]
+    return {
+        'module': module,
+        'seconds': best[module][1],
+        'heavy': [name for name in HEAVY_MODULES if name in loaded],
+        'slowest': slowest,
+    }
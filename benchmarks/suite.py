@@ -0,0 +1,151 @@
+import gc
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')  # Charts are rendered off screen
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import pandas as pd
+
+from parsers import ActivityCube, parse_activity_csv, parse_activity_csv_parallel, parse_device_csv
+from utils import create_bar_chart, create_heatmap_chart, create_line_chart, create_pie_chart, create_stacked_chart
+from .generate import generate_takeout
+
+BENCHMARKS = [
+    'parse_activity_csv', 'parse_activity_csv_parallel', 'parse_device_csv', 'create_bar_chart',
+    'create_pie_chart', 'create_line_chart', 'create_heatmap_chart', 'create_stacked_chart', 'activity_cube',
+    'table_population',
+]
+DEFAULT_SCALES = [10_000, 100_000]
+DEFAULT_REPEAT = 3
+# A benchmark regresses when it is this much slower (or hungrier) than its baseline
+DEFAULT_TOLERANCE = 0.25
+# Differences smaller than these are timer/allocator noise, whatever the ratio
+NOISE_FLOOR = {'seconds': 0.005, 'peak_mb': 1.0}
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+def _measure(func, repeat):
+    """Best wall time over repeat runs, then the tracemalloc peak of one more run.
+
+    An untimed warm-up run first fills one-off caches (regexes, fonts, lru_caches).
+    Memory is traced separately so tracing overhead never inflates the timings.
+    """
+    func()
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+def _render(fig):
+    FigureCanvasAgg(fig).draw()
+
+def _table_population(df):
+    """Fill the virtual table and sort it, as the GUI does after a parse; None without a display."""
+    try:
+        import tkinter as tk
+        from gui import VirtualTable
+        root = tk.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+    table = VirtualTable(root, columns=['Timestamp', 'IP Address', 'Device Type', 'Location', 'App Used'])
+
+    def populate():
+        table.set_frame(df)
+        table.sort_by('Timestamp')
+        table.sort_by('App Used')
+        root.update_idletasks()
+    return root, populate
+
+def run_suite(scales=DEFAULT_SCALES, repeat=DEFAULT_REPEAT, data_dir=None, benchmarks=None, log=print):
+    """Generate synthetic exports at each scale and time every benchmark on them.
+
+    Returns a results dict ready for save_results/compare_to_baseline.
+    """
+    benchmarks = benchmarks or BENCHMARKS
+    results = {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'results': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in scales:
+            paths = generate_takeout(os.path.join(data_dir or tmp, f'rows_{rows}'), rows, device_rows=rows)
+            df = parse_activity_csv(paths['activities'])[0]
+            cases = {
+                'parse_activity_csv': lambda: parse_activity_csv(paths['activities']),
+                # min_bytes=0 sends every size through the pool (on machines with more than one core)
+                'parse_activity_csv_parallel': lambda: parse_activity_csv_parallel(paths['activities'], min_bytes=0),
+                'parse_device_csv': lambda: parse_device_csv(paths['devices']),
+                'create_bar_chart': lambda: _render(create_bar_chart(df)),
+                'create_pie_chart': lambda: _render(create_pie_chart(df)),
+                'create_line_chart': lambda: _render(create_line_chart(df, "Daily")),
+                'create_heatmap_chart': lambda: _render(create_heatmap_chart(df)),
+                'create_stacked_chart': lambda: _render(create_stacked_chart(df, 'App Used', "Daily")),
+                'activity_cube': lambda: ActivityCube(df),
+            }
+            table = _table_population(df) if 'table_population' in benchmarks else None
+            if table is not None:
+                cases['table_population'] = table[1]
+
+            for name in benchmarks:
+                if name not in cases:
+                    log(f"{name} @ {rows:,} rows: skipped (no display)")
+                    continue
+                seconds, peak = _measure(cases[name], repeat)
+                results['results'][f'{name}@{rows}'] = {
+                    'benchmark': name,
+                    'rows': rows,
+                    'seconds': round(seconds, 6),
+                    'rows_per_sec': round(rows / seconds) if seconds else None,
+                    'peak_mb': round(peak / 2**20, 3),
+                }
+                log(f"{name} @ {rows:,} rows: {seconds:.4f}s, {rows / seconds:,.0f} rows/s, "
+                    f"peak {peak / 2**20:.1f} MB")
+            if table is not None:
+                table[0].destroy()
+    return results
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Compare results with a baseline; returns a list of (key, metric, baseline, current, ratio).
+
+    Only benchmarks present in both are compared. An entry is a regression
+    when its time or peak memory exceeds the baseline by more than tolerance
+    (and by more than the noise floor).
+    """
+    regressions = []
+    for key, current in results['results'].items():
+        previous = baseline.get('results', {}).get(key)
+        if previous is None:
+            continue
+        for metric in ('seconds', 'peak_mb'):
+            limit = max(previous[metric] * (1 + tolerance), previous[metric] + NOISE_FLOOR[metric])
+            if previous[metric] and current[metric] > limit:
+                regressions.append((key, metric, previous[metric], current[metric],
+                                    current[metric] / previous[metric]))
+    return regressions
@@ -0,0 +1,2 @@
+from .background import BackgroundTask
+from .virtual_table import VirtualTable
@@ -0,0 +1,71 @@
+import queue
+import threading
+from parsers import ParseCancelled
+
+class BackgroundTask:
+    """Run work(progress) on a worker thread and report back on the Tk main thread.
+
+    The worker never touches widgets: progress and the outcome are queued and
+    picked up by a root.after poll, which calls on_progress(fraction),
+    on_done(result) or on_error(exception). cancel() makes the next progress
+    report raise ParseCancelled inside the worker.
+    """
+
+    def __init__(self, root, work, on_done, on_error, on_progress=None, poll_ms=100):
+        self.root = root
+        self.work = work
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.poll_ms = poll_ms
+        self._cancel_event = threading.Event()
+        self._messages = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self.root.after(self.poll_ms, self._poll)
+        return self
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def is_running(self):
+        return self._thread.is_alive()
+
+    def progress(self, done, total):
+        """Progress callback handed to the work; runs on the worker thread."""
+        if self._cancel_event.is_set():
+            raise ParseCancelled("Parsing cancelled.")
+        if total:
+            self._messages.put(('progress', min(done / total, 1.0)))
+
+    def _run(self):
+        try:
+            result = self.work(self.progress)
+            if self._cancel_event.is_set():
+                raise ParseCancelled("Parsing cancelled.")
+            self._messages.put(('done', result))
+        except Exception as e:
+            self._messages.put(('error', e))
+
+    def _poll(self):
+        latest_progress = None
+        while True:
+            try:
+                kind, payload = self._messages.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'progress':
+                latest_progress = payload
+                continue
+            if latest_progress is not None and self.on_progress:
+                self.on_progress(latest_progress)
+            if kind == 'done':
+                self.on_done(payload)
+            else:
+                self.on_error(payload)
+            return
+        if latest_progress is not None and self.on_progress:
+            self.on_progress(latest_progress)
+        self.root.after(self.poll_ms, self._poll)
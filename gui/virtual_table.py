@@ -0,0 +1,169 @@
+import tkinter as tk
+from tkinter import ttk
+
+# numpy and pandas are imported in the functions that use them: the empty table is
+# built at startup, before the app has loaded them
+
+def sort_order(series, descending=False):
+    """Row positions ordering series, missing values last either way.
+
+    The sort is stable, so equal values keep their row order in both
+    directions (reversing the ascending order would flip them, and put the
+    missing values first).
+    """
+    import numpy as np
+    import pandas as pd
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Rank categories by value so the order is lexical, not by category code
+        ranks = np.argsort(np.argsort(series.cat.categories.astype(str), kind="stable"))
+        codes = series.cat.codes.to_numpy()
+        missing = codes < 0
+        keys = ranks[np.where(missing, 0, codes)]
+    else:
+        keys, _ = pd.factorize(series, sort=True)
+        missing = keys < 0
+    # lexsort is stable and sorts by its last key first: present values, then by value
+    return np.lexsort((-keys if descending else keys, missing))
+
+class VirtualTable(tk.Frame):
+    """Treeview that only ever holds the visible window of a DataFrame's rows.
+
+    Scrolling re-fills the same `height` items from the frame, and sorting
+    goes through argsort indexes computed once per column, so the cost of
+    showing a frame does not depend on its length.
+    """
+
+    def __init__(self, master, columns, height=15, column_width=120, **kwargs):
+        super().__init__(master, **kwargs)
+        self.columns = list(columns)
+        self.height = height
+        self.df = None
+        self.rows = None
+        self.offset = 0
+        self.order = None
+        self.sort_column = None
+        self.sort_descending = False
+        self._sort_indexes = {}
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings", height=height)
+        for col in self.columns:
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            self.tree.column(col, width=column_width)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+
+        # Scroll the table rather than the page while the pointer is over it
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_rows(3))
+
+    def set_frame(self, df):
+        """Show df; nothing is copied and no rows are inserted beyond the visible window."""
+        self.df = df
+        self.rows = None
+        self.offset = 0
+        self.order = None
+        self.sort_column = None
+        self.sort_descending = False
+        self._sort_indexes = {}
+        self._update_headings()
+        self._render()
+
+    def set_rows(self, rows):
+        """Show only the frame rows at the sorted positions rows (None for all of them).
+
+        The current sort is kept and re-applied from the cached sort indexes.
+        """
+        self.rows = rows
+        self.offset = 0
+        self._apply_sort()
+        self._render()
+
+    def clear(self):
+        self.set_frame(None)
+
+    def row_count(self):
+        if self.df is None:
+            return 0
+        return len(self.df) if self.rows is None else len(self.rows)
+
+    def _on_mousewheel(self, event):
+        self._scroll_rows(int(-1 * (event.delta / 120)) * 3)
+        return "break"
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * self.row_count()))
+        elif unit == "pages":
+            self._scroll_rows(int(amount) * self.height)
+        else:
+            self._scroll_rows(int(amount))
+
+    def _scroll_rows(self, rows):
+        self._scroll_to(self.offset + rows)
+
+    def _scroll_to(self, offset):
+        offset = max(0, min(offset, self.row_count() - self.height))
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+
+    def _sort_index(self, column, descending=False):
+        """Row positions ordering column (missing values last), cached per column and direction."""
+        key = (column, descending)
+        if key not in self._sort_indexes:
+            self._sort_indexes[key] = sort_order(self.df[column], descending)
+        return self._sort_indexes[key]
+
+    def sort_by(self, column):
+        if self.df is None:
+            return
+        if self.sort_column == column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = False
+        self.offset = 0
+        self._apply_sort()
+        self._update_headings()
+        self._render()
+
+    def _apply_sort(self):
+        """Set order to the shown rows' positions in the current sort order, if sorted."""
+        if self.sort_column is None:
+            self.order = None
+            return
+        order = self._sort_index(self.sort_column, self.sort_descending)
+        if self.rows is not None:
+            import numpy as np
+            shown = np.zeros(len(self.df), dtype=bool)
+            shown[self.rows] = True
+            order = order[shown[order]]
+        self.order = order
+
+    def _update_headings(self):
+        for col in self.columns:
+            marker = ""
+            if col == self.sort_column:
+                marker = " ▼" if self.sort_descending else " ▲"
+            self.tree.heading(col, text=col + marker)
+
+    def _render(self):
+        self.tree.delete(*self.tree.get_children())
+        total = self.row_count()
+        if total == 0:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        import numpy as np
+        stop = min(self.offset + self.height, total)
+        positions = np.arange(self.offset, stop)
+        if self.order is not None:
+            positions = self.order[positions]
+        elif self.rows is not None:
+            positions = self.rows[positions]
+        window = self.df.iloc[positions]
+        for row in window[self.columns].itertuples(index=False, name=None):
+            self.tree.insert("", "end", values=row)
+        self.scrollbar.set(self.offset / total, stop / total)
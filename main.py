@@ -1,12 +1,15 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
-import pandas as pd
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import webbrowser
 import os
 from datetime import datetime
-from parsers import parse_activity_csv, parse_device_csv
-from utils import create_bar_chart, create_pie_chart, create_line_chart
+import analysis
+import parsers
+import utils
+from gui import BackgroundTask, VirtualTable
+from parsers import ParseCancelled
+from utils.instrumentation import INSTRUMENTATION, diagnostics_path, frame_memory_bytes, span
+from utils.startup import warm_up_imports
 
 # Color scheme
 BACKGROUND_COLOR = '#F5F7FA'
@@ -16,6 +19,147 @@ FRAME_COLOR = '#FFFFFF'
 TABLE_HEADER_COLOR = '#4A90E2'
 TABLE_ALTERNATE_COLOR = '#F8F9FA'
 
+# CSV type choice that picks the parser from the file's header
+AUTO_DETECT = "Auto-detect"
+
+# Filter panel lists: column -> label (the columns of analysis.FILTER_COLUMNS)
+FILTER_LABELS = {'App Used': "App", 'Device Type': "Device Type", 'Location': "Country"}
+
+# Stacked timeline figures: column -> figure name
+STACKED_FIGURES = {
+    'Device Type': 'devices_over_time',
+    'App Used': 'apps_over_time',
+    'Device': 'physical_devices_over_time',
+}
+
+def day_range(start, end):
+    """(start, end) Timestamps of 'YYYY-MM-DD' entry texts; blanks are None and the end day is inclusive."""
+    import pandas as pd
+    start = pd.Timestamp(start) if start else None
+    end = pd.Timestamp(end) + pd.Timedelta(days=1) if end else None
+    return start, end
+
+def index_activity_frame(df):
+    """Build the filter index (off the Tk main thread); it picks the table rows of a filter."""
+    with span("filter index", rows=len(df)):
+        return analysis.FrameIndex(df)
+
+def build_activity_cube(df):
+    """Count cube of a table frame; the summary and every chart are queries on it."""
+    with span("activity cube", rows=len(df)):
+        return parsers.ActivityCube(df)
+
+def device_source(source, device_file=None):
+    """Device list to join the activities to: the chosen file, else the Devices CSV of a Takeout zip."""
+    if device_file:
+        return device_file
+    if parsers.is_zip_source(source) and parsers.find_takeout_members(parsers.takeout_parts(source), 'devices'):
+        return source
+    return None
+
+def join_device_list(df, source, cache=None):
+    """Join an activity frame (with UA fields) to the device list at source.
+
+    Returns (df with a 'Device' column, summary section); without a readable
+    device list the frame is returned as is.
+    """
+    if source is None:
+        return df, analysis.format_device_join_breakdown(None, None)
+    try:
+        devices, _ = parsers.cached_parse(parsers.parse_device_csv, source, cache=cache, include_device_fields=True)
+    except ValueError as e:
+        return df, f"• Device List: {str(e)}"
+    join = analysis.join_devices(df, devices)
+    table = analysis.device_join_table(df, devices, join)
+    return df.assign(Device=join.matches), analysis.format_device_join_breakdown(join, table)
+
+def analyze_activities(df, device_list, ip_ranges, cache=None, parse_key=None, ip_ranges_file=None):
+    """Everything computed from an activity frame (with UA fields) after it is parsed or loaded.
+
+    IP prefixes, device linkage, alerts, the device list join and the count
+    cube. Given the parse_key of a cached parse, the results are cached next
+    to the frame (keyed on it, the device list and the IP range file), so a
+    cache hit skips the whole chain. Safe to call off the Tk main thread.
+    Returns (df with the joined 'Device' column when there is a device list,
+    summary sections, alerts, cube).
+    """
+    def compute():
+        sections = []
+        with span("IP prefixes", rows=len(df)):
+            sections.append(analysis.format_ip_breakdown(analysis.parse_ips(df['IP Address']), ip_ranges))
+        with span("device linkage", rows=len(df)):
+            sections.append(analysis.format_linkage_breakdown(analysis.link_devices(df)))
+        with span("anomaly detection", rows=len(df)):
+            alerts = analysis.detect_anomalies(df)
+            sections.append(analysis.format_anomaly_breakdown(alerts))
+        with span("device list join", rows=len(df)):
+            joined, device_breakdown = join_device_list(df, device_list, cache)
+            sections.append(device_breakdown)
+        cube_frames, cube_meta = build_activity_cube(joined).to_frames()
+        frames = {'alerts': alerts, **{f'cube {name}': frame for name, frame in cube_frames.items()}}
+        if 'Device' in joined.columns:
+            frames['device'] = joined[['Device']]
+        return frames, {'sections': sections, 'cube': cube_meta}
+
+    if parse_key is None:
+        frames, meta = compute()
+    else:
+        frames, meta = parsers.cached_derive(compute, parse_key, 'activity analysis',
+                                             [device_list, ip_ranges_file], cache)
+    if 'device' in frames:
+        df = df.assign(Device=frames['device']['Device'])
+    cube = parsers.ActivityCube.from_frames(
+        {name[len('cube '):]: frame for name, frame in frames.items() if name.startswith('cube ')}, meta['cube']
+    )
+    return df, meta['sections'], frames['alerts'], cube
+
+def stack_columns(df):
+    """Columns drawn as stacked timelines; the joined physical device when df has one."""
+    if df is not None and 'Device' in df.columns:
+        return utils.STACK_COLUMNS + ('Device',)
+    return utils.STACK_COLUMNS
+
+def build_activity_figures(df, aggregator, timeframe, alerts=None, stacked=None, bar_column='App Used'):
+    """Build the timeframe series and the bar, pie, line, heatmap and stacked figures.
+
+    alerts are marked on the line chart; stacked lists the columns that get a
+    stacked timeline (see STACKED_FIGURES; utils.STACK_COLUMNS by default).
+    The bar chart counts bar_column, which an aggregator other than a cube
+    (or its slices) only has for 'App Used'. Safe to call off the Tk main
+    thread. Returns (figures, time_series).
+    """
+    stacked = stacked or utils.STACK_COLUMNS
+    if aggregator is not None:
+        app_counts = aggregator.app_counts_series() if bar_column == 'App Used' else aggregator.counts(bar_column)
+        device_counts = aggregator.device_counts_series()
+        daily_counts = aggregator.daily_counts()
+        hour_of_week = aggregator.hour_of_week_counts()
+        # The joined Device column lives on the frame (and the cube), not in the stores
+        day_labels = {
+            column: aggregator.day_label_counts(column)
+            if df is None or column in getattr(aggregator, 'dimensions', utils.STACK_COLUMNS)
+            else utils.activity_day_label_counts(df, column)
+            for column in stacked
+        }
+    else:
+        app_counts = df[bar_column].value_counts()
+        device_counts = df['Device Type'].value_counts()
+        daily_counts = utils.daily_activity_counts(df)
+        hour_of_week = utils.activity_hour_of_week(df)
+        day_labels = {column: utils.activity_day_label_counts(df, column) for column in stacked}
+    # One floor('D') pass; every timeframe is rolled up from the daily counts
+    time_series = utils.compute_time_series(daily_counts)
+    figures = {
+        'bar': utils.create_bar_chart(app_counts=app_counts, column=bar_column),
+        'pie': utils.create_pie_chart(device_counts=device_counts),
+        'line': utils.create_line_chart(timeframe=timeframe, counts=time_series[timeframe], alerts=alerts),
+        'heatmap': utils.create_heatmap_chart(counts=hour_of_week),
+    }
+    for column in stacked:
+        figures[STACKED_FIGURES[column]] = utils.create_stacked_chart(
+            column=column, timeframe=timeframe, day_counts=day_labels[column])
+    return figures, time_series
+
 class TrackingAnalyzerApp:
     def __init__(self, root):
         self.root = root
@@ -24,8 +168,23 @@ class TrackingAnalyzerApp:
         
         # Initialize variables
         self.df = None
+        self.aggregator = None
+        self.time_series = None
         self.selected_file = None
+        self.detected_spec = None
         self.parser = None
+        self.parse_cache = None
+        self.ip_ranges = None
+        self.ip_ranges_file = None
+        self.device_file = None
+        self.history = None
+        self.frame_index = None
+        self.filter_view = None
+        self.filter_slice = None
+        self.alerts = None
+        self.breakdown = ""
+        self.chart_refresh = None
+        self.task = None
         
         # Setup scrollable main frame
         self.canvas = tk.Canvas(root, bg=BACKGROUND_COLOR, highlightthickness=0)
@@ -49,6 +208,20 @@ class TrackingAnalyzerApp:
         
         self.setup_gui()
         
+        # The window is usable before pandas and matplotlib load; fetch them while it idles
+        self.warm_up_task = BackgroundTask(
+            self.root,
+            lambda progress: warm_up_imports(),
+            on_done=self._on_warm_up_done,
+            on_error=lambda error: self.update_output(f"Error loading modules: {str(error)}")
+        ).start()
+        
+    def _on_warm_up_done(self, seconds):
+        self.csv_type_menu.configure(
+            values=[AUTO_DETECT] + [spec.label for spec in parsers.registered_parsers()]
+        )
+        self.update_diagnostics()
+        
     def _on_mousewheel(self, event):
         self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
         
@@ -87,24 +260,79 @@ class TrackingAnalyzerApp:
             fg=TEXT_COLOR
         ).pack(anchor="w", padx=10)
         
-        self.csv_type_var = tk.StringVar(value="Activity Logs")
-        csv_type_menu = ttk.Combobox(
+        # The parser choices are filled in once the parsers have loaded (see _on_warm_up_done)
+        self.csv_type_var = tk.StringVar(value=AUTO_DETECT)
+        self.csv_type_menu = ttk.Combobox(
             left_column,
             textvariable=self.csv_type_var,
-            values=["Activity Logs", "Device Logs"],
+            values=[AUTO_DETECT],
             state="readonly"
         )
-        csv_type_menu.pack(fill="x", padx=10, pady=5)
+        self.csv_type_menu.pack(fill="x", padx=10, pady=5)
+        
+        # Streaming mode keeps memory bounded on huge exports
+        self.low_memory_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            left_column,
+            text="Low-memory mode (summary and charts only, no table rows)",
+            variable=self.low_memory_var,
+            bg=FRAME_COLOR,
+            fg=TEXT_COLOR,
+            font=("Segoe UI", 10)
+        ).pack(anchor="w", padx=10)
+        
+        # Large activity CSVs are split into byte ranges parsed on every core
+        self.parallel_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(
+            left_column,
+            text="Parallel parsing (all CPU cores, large activity CSVs)",
+            variable=self.parallel_var,
+            bg=FRAME_COLOR,
+            fg=TEXT_COLOR,
+            font=("Segoe UI", 10)
+        ).pack(anchor="w", padx=10)
+        
+        # Per-stage timings for the Diagnostics panel and export sidecar files
+        self.diagnostics_var = tk.BooleanVar(value=INSTRUMENTATION.enabled)
+        tk.Checkbutton(
+            left_column,
+            text="Record diagnostics (stage timings and memory)",
+            variable=self.diagnostics_var,
+            bg=FRAME_COLOR,
+            fg=TEXT_COLOR,
+            font=("Segoe UI", 10),
+            command=self.toggle_diagnostics
+        ).pack(anchor="w", padx=10)
         
         tk.Button(
             left_column,
-            text="Select CSV File",
+            text="Select CSV or Takeout Zip",
             bg=BUTTON_COLOR,
             fg="white",
             font=("Segoe UI", 10),
             command=self.select_file
         ).pack(pady=10)
         
+        # Optional offline IP range -> ASN table for the network breakdown
+        tk.Button(
+            left_column,
+            text="Load IP Range Table (optional)",
+            bg=BUTTON_COLOR,
+            fg="white",
+            font=("Segoe UI", 10),
+            command=self.select_ip_ranges
+        ).pack(pady=(0, 10))
+        
+        # Device list joined to the activities; a Takeout zip's own Devices CSV is used otherwise
+        tk.Button(
+            left_column,
+            text="Load Devices CSV (optional)",
+            bg=BUTTON_COLOR,
+            fg="white",
+            font=("Segoe UI", 10),
+            command=self.select_device_file
+        ).pack(pady=(0, 10))
+        
         # Create output_text widget and pack separately
         self.output_text = tk.Text(
             left_column,
@@ -117,14 +345,60 @@ class TrackingAnalyzerApp:
         )
         self.output_text.pack(padx=10, pady=5, fill="x")
         
-        tk.Button(
-            left_column,
+        parse_controls = tk.Frame(left_column, bg=FRAME_COLOR)
+        parse_controls.pack(pady=15)
+        
+        self.parse_button = tk.Button(
+            parse_controls,
             text="Parse Data",
             bg=BUTTON_COLOR,
             fg="white",
             font=("Segoe UI", 10),
             command=self.parse_data
-        ).pack(pady=15)
+        )
+        self.parse_button.pack(side="left", padx=5)
+        
+        self.cancel_button = tk.Button(
+            parse_controls,
+            text="Cancel",
+            bg=BUTTON_COLOR,
+            fg="white",
+            font=("Segoe UI", 10),
+            state="disabled",
+            command=self.cancel_task
+        )
+        self.cancel_button.pack(side="left", padx=5)
+        
+        # Accumulated history of every imported export (see the date range below)
+        history_controls = tk.Frame(left_column, bg=FRAME_COLOR)
+        history_controls.pack(pady=(0, 10))
+        
+        tk.Button(
+            history_controls,
+            text="Import to History",
+            bg=BUTTON_COLOR,
+            fg="white",
+            font=("Segoe UI", 10),
+            command=self.import_history
+        ).pack(side="left", padx=5)
+        
+        tk.Button(
+            history_controls,
+            text="Load History",
+            bg=BUTTON_COLOR,
+            fg="white",
+            font=("Segoe UI", 10),
+            command=self.load_history
+        ).pack(side="left", padx=5)
+        
+        # Progress of the background parse or export
+        self.progress_var = tk.DoubleVar(value=0.0)
+        ttk.Progressbar(
+            left_column,
+            variable=self.progress_var,
+            maximum=100,
+            mode="determinate"
+        ).pack(fill="x", padx=10, pady=(0, 10))
         
         tk.Label(
             left_column,
@@ -146,6 +420,28 @@ class TrackingAnalyzerApp:
         )
         self.preview_text.pack(padx=10, pady=5, fill="both", expand=True)
         
+        tk.Label(
+            left_column,
+            text="Diagnostics",
+            font=("Segoe UI", 12, "bold"),
+            bg=FRAME_COLOR,
+            fg=TEXT_COLOR
+        ).pack(pady=(10, 5))
+        
+        # Fixed-width font keeps the stage table aligned
+        self.diagnostics_text = tk.Text(
+            left_column,
+            height=8,
+            width=50,
+            bg=FRAME_COLOR,
+            fg=TEXT_COLOR,
+            font="TkFixedFont",
+            wrap="none",
+            state="disabled"
+        )
+        self.diagnostics_text.pack(padx=10, pady=5, fill="x")
+        self.update_diagnostics()
+        
         # Right column
         right_column = tk.Frame(columns_frame, bg=FRAME_COLOR, bd=2, relief="ridge")
         right_column.pack(side="right", fill="both", expand=True, padx=(10, 0))
@@ -158,17 +454,72 @@ class TrackingAnalyzerApp:
             fg=TEXT_COLOR
         ).pack(pady=(10, 15))
         
-        # Table (using Treeview)
-        self.tree = ttk.Treeview(
+        # Filter panel: applies to the table, summary and charts of activity logs
+        filter_frame = tk.Frame(right_column, bg=FRAME_COLOR)
+        filter_frame.pack(fill="x", padx=10, pady=(0, 5))
+        
+        date_row = tk.Frame(filter_frame, bg=FRAME_COLOR)
+        date_row.pack(fill="x")
+        tk.Label(
+            date_row,
+            text="Filter from (YYYY-MM-DD):",
+            font=("Segoe UI", 10),
+            bg=FRAME_COLOR,
+            fg=TEXT_COLOR
+        ).pack(side="left")
+        self.filter_start_var = tk.StringVar()
+        self.filter_end_var = tk.StringVar()
+        start_entry = tk.Entry(date_row, textvariable=self.filter_start_var, width=12)
+        start_entry.pack(side="left", padx=5)
+        tk.Label(date_row, text="to", font=("Segoe UI", 10), bg=FRAME_COLOR, fg=TEXT_COLOR).pack(side="left")
+        end_entry = tk.Entry(date_row, textvariable=self.filter_end_var, width=12)
+        end_entry.pack(side="left", padx=5)
+        for entry in (start_entry, end_entry):
+            entry.bind("<Return>", self.apply_filters)
+            entry.bind("<FocusOut>", self.apply_filters)
+        tk.Button(
+            date_row,
+            text="Clear Filters",
+            bg=BUTTON_COLOR,
+            fg="white",
+            font=("Segoe UI", 10),
+            command=self.clear_filters
+        ).pack(side="right")
+        
+        lists_row = tk.Frame(filter_frame, bg=FRAME_COLOR)
+        lists_row.pack(fill="x", pady=(5, 0))
+        self.filter_lists = {}
+        for column, label in FILTER_LABELS.items():
+            column_frame = tk.Frame(lists_row, bg=FRAME_COLOR)
+            column_frame.pack(side="left", fill="x", expand=True, padx=(0, 5))
+            tk.Label(
+                column_frame,
+                text=label,
+                font=("Segoe UI", 10),
+                bg=FRAME_COLOR,
+                fg=TEXT_COLOR
+            ).pack(anchor="w")
+            listbox = tk.Listbox(
+                column_frame,
+                selectmode="multiple",
+                exportselection=False,
+                height=4,
+                bg=FRAME_COLOR,
+                fg=TEXT_COLOR,
+                font=("Segoe UI", 10)
+            )
+            listbox.pack(fill="x")
+            listbox.bind("<<ListboxSelect>>", self.apply_filters)
+            self.filter_lists[column] = listbox
+        
+        # Table (a Treeview holding only the visible rows; click a heading to sort)
+        self.table = VirtualTable(
             right_column,
             columns=("Timestamp", "IP Address", "Device Type", "Location", "App Used"),
-            show="headings",
-            height=15
+            height=15,
+            bg=FRAME_COLOR
         )
-        for col in self.tree["columns"]:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=120)
-        self.tree.pack(fill="both", padx=10, pady=5, expand=True)
+        self.table.pack(fill="both", padx=10, pady=5, expand=True)
         
         tk.Label(
             right_column,
@@ -229,6 +580,22 @@ class TrackingAnalyzerApp:
             command=lambda: webbrowser.open("https://adssettings.google.com/")
         ).pack(fill="x", pady=2)
         
+        # Optional time range for row exports
+        range_frame = tk.Frame(privacy_frame, bg=FRAME_COLOR)
+        range_frame.pack(fill="x", pady=(10, 2))
+        tk.Label(
+            range_frame,
+            text="Date range for export and history (YYYY-MM-DD, optional):",
+            font=("Segoe UI", 10),
+            bg=FRAME_COLOR,
+            fg=TEXT_COLOR
+        ).pack(side="left")
+        self.export_start_var = tk.StringVar()
+        tk.Entry(range_frame, textvariable=self.export_start_var, width=12).pack(side="left", padx=5)
+        tk.Label(range_frame, text="to", font=("Segoe UI", 10), bg=FRAME_COLOR, fg=TEXT_COLOR).pack(side="left")
+        self.export_end_var = tk.StringVar()
+        tk.Entry(range_frame, textvariable=self.export_end_var, width=12).pack(side="left", padx=5)
+        
         tk.Button(
             privacy_frame,
             text="Export Analysis",
@@ -265,7 +632,10 @@ class TrackingAnalyzerApp:
         self.bar_canvas = None
         self.pie_canvas = None
         self.line_canvas = None
-        self.line_scroll_canvas = None
+        self.line_frame = None
+        self.line_toolbar = None
+        self.heatmap_canvas = None
+        self.stacked_canvases = []
 
         # Timeframe dropdown for line chart
         tk.Label(
@@ -286,43 +656,267 @@ class TrackingAnalyzerApp:
         timeframe_menu.pack(pady=5)
         timeframe_menu.bind("<<ComboboxSelected>>", self.update_line_chart)
         
+        # Any column of the activity cube can be the bar chart's breakdown
+        tk.Label(
+            self.viz_frame,
+            text="Break down the bar chart by:",
+            font=("Segoe UI", 12),
+            bg=FRAME_COLOR,
+            fg=TEXT_COLOR
+        ).pack()
+        
+        self.bar_column_var = tk.StringVar(value="App Used")
+        self.bar_column_menu = ttk.Combobox(
+            self.viz_frame,
+            textvariable=self.bar_column_var,
+            values=["App Used"],
+            state="readonly"
+        )
+        self.bar_column_menu.pack(pady=5)
+        self.bar_column_menu.bind("<<ComboboxSelected>>", lambda event: self.show_visualizations())
+        
     def select_file(self):
-        file_path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv")])
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Takeout CSV or Zip", "*.csv *.zip"), ("CSV Files", "*.csv"), ("Zip Archives", "*.zip")]
+        )
         if file_path:
             self.selected_file = file_path
+            self.detected_spec = None
             self.update_output(f"Selected file: {os.path.basename(file_path)}")
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    preview = ''.join(f.readlines()[:10])
+                # One bounded read both identifies the export and fills the preview
+                csv_type = self.csv_type_var.get()
+                if csv_type == AUTO_DETECT:
+                    self.detected_spec, preview = parsers.detect_parser(file_path)
+                    self.update_output(
+                        f"Selected file: {os.path.basename(file_path)} (detected: {self.detected_spec.label})"
+                    )
+                else:
+                    _, preview = parsers.sniff_source(file_path, parsers.get_parser(csv_type).name)
                 self.update_text(self.preview_text, preview)
             except Exception as e:
                 self.update_text(self.preview_text, f"Error reading file: {str(e)}")
                 
+    def select_ip_ranges(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("IP range tables", "*.tsv *.csv"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+        try:
+            self.ip_ranges = analysis.load_range_table(file_path)
+            self.ip_ranges_file = file_path
+            ranges = len(self.ip_ranges.v4_row) + len(self.ip_ranges.v6_row)
+            self.update_output(f"Loaded {ranges} IP ranges from {os.path.basename(file_path)}.")
+        except Exception as e:
+            self.update_output(f"Error: {str(e)}")
+            
+    def select_device_file(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Takeout CSV or Zip", "*.csv *.zip"), ("CSV Files", "*.csv"), ("Zip Archives", "*.zip")]
+        )
+        if not file_path:
+            return
+        self.device_file = file_path
+        self.update_output(f"Device list: {os.path.basename(file_path)} (joined on the next parse)")
+            
     def parse_data(self):
         if not self.selected_file:
             self.update_output("No file selected.")
             return
+        if self.task is not None and self.task.is_running():
+            self.update_output("Parsing is already in progress.")
+            return
         
         csv_type = self.csv_type_var.get()
-        self.parser = parse_activity_csv if csv_type == "Activity Logs" else parse_device_csv
+        try:
+            if csv_type != AUTO_DETECT:
+                spec = parsers.get_parser(csv_type)
+            elif self.detected_spec is not None:
+                spec = self.detected_spec
+            else:
+                spec = parsers.detect_parser(self.selected_file)[0]
+        except Exception as e:
+            self.update_output(f"Error: {str(e)}")
+            return
+        self.parser = spec.parser
+        
+        # Read every Tk variable here; the worker thread must not touch widgets
+        source = self.selected_file
+        parser = self.parser
+        low_memory = spec.name == "activities" and self.low_memory_var.get()
+        if spec.name == "activities" and self.parallel_var.get():
+            parser = parsers.parse_activity_csv_parallel
+        timeframe = self.timeframe_var.get()
+        if self.parse_cache is None:
+            self.parse_cache = parsers.ParseCache()
+        cache = self.parse_cache
+        ip_ranges, ip_ranges_file = self.ip_ranges, self.ip_ranges_file
+        device_file = self.device_file
+        INSTRUMENTATION.reset()
         
+        def work(progress):
+            with span("parse (worker)"):
+                aggregator, alerts = None, None
+                if low_memory:
+                    df, breakdown, aggregator = parsers.stream_activity_csv(source, progress=progress)
+                elif spec.name == "activities":
+                    # The decoded UA fields tell devices apart for the linkage graph
+                    df, breakdown = parsers.cached_parse(parser, source, cache=cache, progress=progress,
+                                                 include_ua_fields=True)
+                    parse_key = parsers.cache_key(parser.__name__, source, include_ua_fields=True)
+                    df, sections, alerts, aggregator = analyze_activities(
+                        df, device_source(source, device_file), ip_ranges, cache, parse_key, ip_ranges_file
+                    )
+                    breakdown = "\n\n".join([breakdown] + sections)
+                else:
+                    df, breakdown = parsers.cached_parse(parser, source, cache=cache, progress=progress)
+                figures, time_series, frame_index = None, None, None
+                if spec.visualizations:
+                    figures, time_series = build_activity_figures(df, aggregator, timeframe, alerts,
+                                                                  stack_columns(df))
+                    if df is not None:
+                        frame_index = index_activity_frame(df)
+            return df, breakdown, aggregator, figures, time_series, frame_index, alerts
+        
+        self._start_task(work, self._on_parse_done, self._on_parse_error, "Parsing...")
+        
+    def _start_task(self, work, on_done, on_error, message):
+        self.progress_var.set(0.0)
+        self.parse_button.configure(state="disabled")
+        self.cancel_button.configure(state="normal")
+        self.update_output(message)
+        self.task = BackgroundTask(
+            self.root,
+            work,
+            on_done=on_done,
+            on_error=on_error,
+            on_progress=lambda fraction: self.progress_var.set(fraction * 100)
+        ).start()
+        
+    def cancel_task(self):
+        if self.task is not None and self.task.is_running():
+            self.task.cancel()
+            self.update_output("Cancelling...")
+            
+    def _finish_task(self):
+        self.parse_button.configure(state="normal")
+        self.cancel_button.configure(state="disabled")
+        
+    def _on_parse_done(self, result):
+        self._finish_task()
+        self.df, breakdown, self.aggregator, figures, self.time_series, self.frame_index, self.alerts = result
+        self.breakdown = breakdown
+        self.filter_view = None
+        self.filter_slice = None
+        self.bar_column_var.set("App Used")
+        self.bar_column_menu.configure(values=self.bar_columns())
+        self.progress_var.set(100.0)
         try:
-            self.df, breakdown = self.parser(self.selected_file)
-            self.update_table()
-            self.update_summary(breakdown)
-            self.update_output("Data parsed successfully.")
-            if csv_type == "Activity Logs":
-                self.show_visualizations()
+            with span("update_table", rows=0 if self.df is None else len(self.df)):
+                self.update_table()
+            with span("update_summary"):
+                self.update_summary(breakdown)
+            self.reset_filters()
+            if self.df is not None:
+                self.update_output(
+                    f"Data parsed successfully: {len(self.df):,} rows, "
+                    f"{frame_memory_bytes(self.df) / 2**20:,.1f} MB in memory."
+                )
+            else:
+                self.update_output("Data parsed successfully.")
+            if figures is not None:
+                with span("show_visualizations (render)"):
+                    self.show_visualizations(figures)
             else:
                 self.viz_frame.pack_forget()  # Hide visualizations for device logs
         except Exception as e:
             self.update_output(f"Error: {str(e)}")
+        self.update_diagnostics()
+            
+    def _on_parse_error(self, error):
+        self._finish_task()
+        self.progress_var.set(0.0)
+        if isinstance(error, ParseCancelled):
+            self.update_output("Parsing cancelled.")
+        else:
+            self.update_output(f"Error: {str(error)}")
+        self.update_diagnostics()
+            
+    def toggle_diagnostics(self):
+        INSTRUMENTATION.enabled = self.diagnostics_var.get()
+        INSTRUMENTATION.reset()
+        self.update_diagnostics()
+        
+    def update_diagnostics(self):
+        self.update_text(self.diagnostics_text, INSTRUMENTATION.report())
             
     def update_table(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for _, row in self.df.iterrows():
-            self.tree.insert("", "end", values=tuple(row))
+        self.table.set_frame(self.df)
+        
+    def reset_filters(self):
+        """Empty the filter entries and refill the lists from the current index."""
+        self.filter_start_var.set("")
+        self.filter_end_var.set("")
+        for column, listbox in self.filter_lists.items():
+            listbox.delete(0, tk.END)
+            if self.frame_index is not None:
+                for value in self.frame_index.values(column):
+                    listbox.insert(tk.END, value)
+                    
+    def clear_filters(self):
+        self.filter_start_var.set("")
+        self.filter_end_var.set("")
+        for listbox in self.filter_lists.values():
+            listbox.selection_clear(0, tk.END)
+        self.apply_filters()
+        
+    def apply_filters(self, event=None):
+        """Narrow the table, summary and charts to the filter selections."""
+        if self.frame_index is None:
+            return
+        try:
+            start, end = day_range(self.filter_start_var.get().strip(), self.filter_end_var.get().strip())
+        except ValueError as e:
+            self.update_output(f"Filter error: invalid date ({str(e)})")
+            return
+        selections = {
+            column: [listbox.get(i) for i in listbox.curselection()]
+            for column, listbox in self.filter_lists.items()
+        }
+        with span("apply filters", rows=self.frame_index.size):
+            # The index picks the table rows; the summary and charts come from the cube's slice
+            view = self.frame_index.filter(start, end, selections)
+            if not view.is_filtered() and self.filter_view is None:
+                return
+            self.filter_view = view if view.is_filtered() else None
+            self.filter_slice = self.aggregator.slice(start, end, selections) if view.is_filtered() else None
+            self.table.set_rows(view.positions)
+            if view.is_filtered():
+                self.update_summary(
+                    f"Filtered: {len(view)} of {self.frame_index.size} activities\n\n"
+                    + self.filter_slice.breakdown()
+                )
+            else:
+                self.update_summary(self.breakdown)
+        self.update_output(f"Showing {len(view)} of {self.frame_index.size} activities.")
+        # Charts redraw once the burst of selection events has settled
+        if self.chart_refresh is not None:
+            self.root.after_cancel(self.chart_refresh)
+        self.chart_refresh = self.root.after_idle(self.refresh_filtered_charts)
+        
+    def refresh_filtered_charts(self):
+        self.chart_refresh = None
+        with span("filtered charts"):
+            self.show_visualizations()
+        self.update_diagnostics()
+        
+    def bar_columns(self):
+        """Columns the bar chart can break down by: the cube's dimensions that hold values."""
+        dimensions = getattr(self.aggregator, 'dimensions', None)
+        if not dimensions:
+            return ["App Used"]
+        return [column for column in dimensions if len(self.aggregator.counts(column))]
             
     def update_output(self, text):
         self.update_text(self.output_text, text)
@@ -336,89 +930,256 @@ class TrackingAnalyzerApp:
         text_widget.insert(tk.END, content)
         text_widget.configure(state="disabled")
         
+    def date_range(self):
+        """The (start, end) bounds of the date range entries; end is exclusive."""
+        return day_range(self.export_start_var.get().strip(), self.export_end_var.get().strip())
+        
+    def history_store(self):
+        if self.history is None:
+            self.history = parsers.HistoryStore()
+        return self.history
+        
+    def import_history(self):
+        if not self.selected_file:
+            self.update_output("No file selected.")
+            return
+        if self.task is not None and self.task.is_running():
+            self.update_output("Please wait for the current task to finish.")
+            return
+        try:
+            store = self.history_store()
+        except Exception as e:
+            self.update_output(f"History error: {str(e)}")
+            return
+        source = self.selected_file
+        INSTRUMENTATION.reset()
+        
+        def on_done(result):
+            self._finish_task()
+            self.progress_var.set(100.0)
+            read, added = result
+            earliest, latest = store.time_range()
+            self.update_output(
+                f"Added {added} new of {read} activities to history "
+                f"({store.count()} stored, {earliest:%Y-%m-%d} to {latest:%Y-%m-%d})."
+            )
+            self.update_diagnostics()
+        
+        def on_error(error):
+            self._finish_task()
+            self.progress_var.set(0.0)
+            if isinstance(error, ParseCancelled):
+                self.update_output("Import cancelled; rows already added are kept.")
+            else:
+                self.update_output(f"History error: {str(error)}")
+            self.update_diagnostics()
+        
+        self._start_task(
+            lambda progress: store.import_activities(source, progress=progress),
+            on_done, on_error, "Importing into history..."
+        )
+        
+    def load_history(self):
+        if self.task is not None and self.task.is_running():
+            self.update_output("Please wait for the current task to finish.")
+            return
+        try:
+            start, end = self.date_range()
+            store = self.history_store()
+        except ValueError as e:
+            self.update_output(f"History error: invalid date ({str(e)})")
+            return
+        except Exception as e:
+            self.update_output(f"History error: {str(e)}")
+            return
+        low_memory = self.low_memory_var.get()
+        timeframe = self.timeframe_var.get()
+        ip_ranges = self.ip_ranges
+        selected_file, device_file = self.selected_file, self.device_file
+        cache = self.parse_cache
+        INSTRUMENTATION.reset()
+        
+        def work(progress):
+            with span("load history (worker)"):
+                # In low-memory mode the summary and charts are aggregated in SQL; otherwise the
+                # loaded rows are folded into a cube
+                aggregator = store.view(start, end)
+                if not store.count(start, end):
+                    raise ValueError("No history in this date range; import an export first.")
+                df = None if low_memory else store.load_activities(start, end, include_ua_fields=True)
+                sections, alerts = [], None
+                if df is not None:
+                    df, sections, alerts, aggregator = analyze_activities(
+                        df, device_source(selected_file, device_file), ip_ranges, cache
+                    )
+                breakdown = "\n\n".join([aggregator.breakdown()] + sections)
+                figures, time_series = build_activity_figures(df, aggregator, timeframe, alerts, stack_columns(df))
+                frame_index = index_activity_frame(df) if df is not None else None
+            return df, breakdown, aggregator, figures, time_series, frame_index, alerts
+        
+        self._start_task(work, self._on_parse_done, self._on_parse_error, "Loading history...")
+        
+    def export_directory(self):
+        """Where the export dialog opens: next to the selected file, else the history database."""
+        if self.selected_file:
+            return os.path.dirname(os.path.abspath(self.selected_file))
+        if self.history is not None and self.history.path != ':memory:':
+            return os.path.dirname(os.path.abspath(self.history.path))
+        return os.getcwd()
+        
     def export_analysis(self):
-        if self.df is None:
+        if self.df is None and self.aggregator is None:
             self.update_output("No data to export.")
             return
+        if self.task is not None and self.task.is_running():
+            self.update_output("Please wait for the current task to finish.")
+            return
         try:
-            output_file = os.path.join(
-                os.path.dirname(self.selected_file),
-                f"tracking_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+            start, end = self.date_range()
+        except ValueError as e:
+            self.update_output(f"Export error: invalid date ({str(e)})")
+            return
+        output_file = filedialog.asksaveasfilename(
+            initialdir=self.export_directory(),
+            initialfile=f"tracking_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+            defaultextension=".html",
+            filetypes=[
+                ("HTML Report", "*.html"),
+                ("CSV", "*.csv"),
+                ("JSON Lines", "*.jsonl"),
+                ("Parquet", "*.parquet")
+            ]
+        )
+        if not output_file:
+            return
+        
+        # Capture state for the worker thread
+        df, aggregator = self.df, self.aggregator
+        if self.filter_view is not None:
+            # Rows and charts of the filtered view; the summary text already describes it
+            df, aggregator = self.filter_view.frame(), self.filter_slice
+        summary = self.summary_text.get("1.0", tk.END)
+        with_charts = self.time_series is not None
+        timeframe = self.timeframe_var.get()
+        alerts = self.alerts
+        stacked = stack_columns(self.df)
+        bar_column = self.bar_column_var.get()
+        
+        def work(progress):
+            figures = None
+            if with_charts and output_file.lower().endswith(".html"):
+                figures, _ = build_activity_figures(df, aggregator, timeframe, alerts, stacked, bar_column)
+            rows = utils.export_analysis(
+                output_file, df, summary, figures, start=start, end=end, progress=progress
             )
-            with open(output_file, 'w') as f:
-                f.write(self.summary_text.get("1.0", tk.END))
-                f.write("\n\nDetailed Data:\n")
-                self.df.to_string(f)
+            if INSTRUMENTATION.enabled:
+                # Parse and export stages side by side with the exported file
+                INSTRUMENTATION.write_json(diagnostics_path(output_file))
+            return rows
+        
+        def on_error(error):
+            self._finish_task()
+            if isinstance(error, ParseCancelled):
+                self.update_output("Export cancelled.")
+            else:
+                self.update_output(f"Export error: {str(error)}")
+        
+        def on_done(rows):
+            self._finish_task()
+            self.progress_var.set(100.0)
             self.update_output(f"Analysis exported to: {output_file}")
-        except Exception as e:
-            self.update_output(f"Export error: {str(e)}")
+            self.update_diagnostics()
+        
+        self._start_task(work, on_done, on_error, "Exporting...")
             
-    def show_visualizations(self):
+    def show_visualizations(self, figures=None):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
         # Clear existing visualizations
         if self.bar_canvas:
             self.bar_canvas.get_tk_widget().destroy()
         if self.pie_canvas:
             self.pie_canvas.get_tk_widget().destroy()
-        if self.line_canvas:
-            self.line_canvas.get_tk_widget().destroy()
-        if self.line_scroll_canvas:
-            self.line_scroll_canvas.destroy()
+        if self.line_frame:
+            self.line_frame.destroy()
+        if self.heatmap_canvas:
+            self.heatmap_canvas.get_tk_widget().destroy()
+        for canvas in self.stacked_canvases:
+            canvas.get_tk_widget().destroy()
             
         # Show viz frame
         self.viz_frame.pack(fill="x", padx=120, pady=20)
         
+        if figures is None:
+            # An active filter's slice stands in for the full cube
+            df, aggregator = (None, self.filter_slice) if self.filter_slice is not None else (self.df, self.aggregator)
+            figures, self.time_series = build_activity_figures(
+                df, aggregator, self.timeframe_var.get(), self.alerts, stack_columns(self.df),
+                self.bar_column_var.get()
+            )
+        
         # Bar chart
-        fig_bar = create_bar_chart(self.df)
-        self.bar_canvas = FigureCanvasTkAgg(fig_bar, master=self.viz_frame)
+        self.bar_canvas = FigureCanvasTkAgg(figures['bar'], master=self.viz_frame)
         self.bar_canvas.draw()
         self.bar_canvas.get_tk_widget().pack(pady=10)
         
         # Pie chart
-        fig_pie = create_pie_chart(self.df)
-        self.pie_canvas = FigureCanvasTkAgg(fig_pie, master=self.viz_frame)
+        self.pie_canvas = FigureCanvasTkAgg(figures['pie'], master=self.viz_frame)
         self.pie_canvas.draw()
         self.pie_canvas.get_tk_widget().pack(pady=10)
         
         # Line chart
-        self.update_line_chart()
-        
-    def update_line_chart(self, event=None):
-        if self.line_canvas:
-            self.line_canvas.get_tk_widget().destroy()
-        if self.line_scroll_canvas:
-            self.line_scroll_canvas.destroy()
-            
-        timeframe = self.timeframe_var.get()
+        self.update_line_chart(fig_line=figures['line'])
         
-        # Create scrollable canvas
-        scroll_frame = tk.Frame(self.viz_frame, bg=FRAME_COLOR)
-        scroll_frame.pack(fill="x", pady=10)
+        # Hour-of-week heatmap
+        self.heatmap_canvas = FigureCanvasTkAgg(figures['heatmap'], master=self.viz_frame)
+        self.heatmap_canvas.draw()
+        self.heatmap_canvas.get_tk_widget().pack(pady=10)
         
-        canvas = tk.Canvas(scroll_frame, bg=FRAME_COLOR, height=600)
-        scrollbar = ttk.Scrollbar(scroll_frame, orient="horizontal", command=canvas.xview)
-        scrollable_frame = tk.Frame(canvas, bg=FRAME_COLOR)
+        # Stacked timelines per device type, app and joined physical device; they follow the timeframe too
+        self.stacked_canvases = []
+        for name in STACKED_FIGURES.values():
+            if name not in figures:
+                continue
+            canvas = FigureCanvasTkAgg(figures[name], master=self.viz_frame)
+            canvas.draw()
+            canvas.get_tk_widget().pack(pady=10)
+            self.stacked_canvases.append(canvas)
         
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
+    def update_line_chart(self, event=None, fig_line=None):
+        if self.time_series is None:
+            return
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        timeframe = self.timeframe_var.get()
         
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(xscrollcommand=scrollbar.set)
+        # Switching timeframe reuses the figure and canvas; only the line data changes
+        if fig_line is None and self.line_canvas is not None:
+            utils.update_line_chart_figure(self.line_canvas.figure, self.time_series[timeframe])
+            self.line_toolbar.update()  # Forget the zoom history of the previous series
+            self.line_canvas.draw_idle()
+            for canvas in self.stacked_canvases:
+                utils.update_stacked_chart_figure(canvas.figure, timeframe)
+                canvas.draw_idle()
+            return
         
-        scrollbar.pack(side="bottom", fill="x")
-        canvas.pack(side="top", fill="x")
+        if self.line_frame:
+            self.line_frame.destroy()
         
-        self.line_scroll_canvas = canvas
+        # Fixed-size chart; the toolbar pans and zooms, and the line re-resolves to the view
+        self.line_frame = tk.Frame(self.viz_frame, bg=FRAME_COLOR)
+        self.line_frame.pack(fill="x", pady=10)
         
-        # Line chart
-        fig_line = create_line_chart(self.df, timeframe)
-        self.line_canvas = FigureCanvasTkAgg(fig_line, master=scrollable_frame)
+        if fig_line is None:
+            fig_line = utils.create_line_chart(timeframe=timeframe, counts=self.time_series[timeframe], alerts=self.alerts)
+        self.line_canvas = FigureCanvasTkAgg(fig_line, master=self.line_frame)
+        self.line_toolbar = NavigationToolbar2Tk(self.line_canvas, self.line_frame, pack_toolbar=False)
+        self.line_toolbar.update()
+        self.line_toolbar.pack(side="bottom", fill="x")
         self.line_canvas.draw()
         self.line_canvas.get_tk_widget().pack()
         
 if __name__ == "__main__":
-    root = tk.Tk()
-    root.geometry("1200x800")
-    app = TrackingAnalyzerApp(root)
+    with span("startup: build window"):
+        root = tk.Tk()
+        root.geometry("1200x800")
+        app = TrackingAnalyzerApp(root)
     root.mainloop()
\ No newline at end of file
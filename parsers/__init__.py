@@ -1,2 +1,19 @@
-from .activity_parser import parse_activity_csv
-from .device_parser import parse_device_csv
\ No newline at end of file
+from utils.lazy import lazy_exports
+
+# Submodules (most of them need pandas) load the first time one of their names is used
+__getattr__, __dir__, __all__ = lazy_exports(__name__, globals(), {
+    '.activity_parser': ['parse_activity_csv'],
+    '.archive': ['find_takeout_members', 'is_zip_source', 'open_takeout_csv', 'takeout_export_name', 'takeout_parts'],
+    '.cache': ['ParseCache', 'cache_key', 'cached_derive', 'cached_parse'],
+    '.cube': ['CUBE_DIMENSIONS', 'DEFAULT_MEMO_SIZE', 'ActivityCube', 'CubeView'],
+    '.device_parser': ['parse_device_csv'],
+    '.history': ['DEFAULT_HISTORY_PATH', 'HistoryStore', 'HistoryView', 'number_repeats', 'row_hashes'],
+    '.parallel': ['PARALLEL_MIN_BYTES', 'parse_activity_csv_parallel', 'plan_byte_ranges'],
+    '.progress': ['ParseCancelled', 'ProgressReader'],
+    '.registry': [
+        'ParserSpec', 'detect_parser', 'get_parser', 'match_parser', 'register_parser', 'registered_parsers',
+        'sniff_source',
+    ],
+    '.streaming': ['ActivityAggregator', 'fold_activity_chunks', 'iter_activity_chunks', 'stream_activity_csv'],
+    '.user_agent': ['decode_user_agents', 'parse_user_agent'],
+})
\ No newline at end of file
@@ -1,58 +1,198 @@
 import pandas as pd
+from pandas.api.types import union_categoricals
+from utils.instrumentation import instrumented, span
+from .archive import open_takeout_csv
+from .progress import ParseCancelled
+from .user_agent import UA_COLUMNS, decode_user_agents
 
-def parse_activity_csv(file_path):
+ACTIVITY_COLUMNS = ['Timestamp', 'IP Address', 'Device Type', 'Location', 'App Used']
+
+# Further Takeout columns kept as they are (with include_ua_fields=True) for the cube breakdowns
+ACTIVITY_DETAIL_COLUMNS = ['Sub-Product Name', 'Activity Type', 'Gmail Access Channel', 'Activity Region',
+                           'Activity City']
+
+# The only Takeout columns the parser reads; the other three are never loaded
+ACTIVITY_SOURCE_COLUMNS = ['Activity Timestamp', 'IP Address', 'Activity Country', 'User Agent String',
+                           'Product Name'] + ACTIVITY_DETAIL_COLUMNS
+# Repetitive text columns, kept as categoricals (integer codes plus one copy of each
+# distinct string). They are read as plain strings and converted chunk by chunk, like
+# the timestamps: a chunk where a column is all blank would otherwise get categories of
+# another dtype, which can't be unioned with the rest
+ACTIVITY_CATEGORY_COLUMNS = ['IP Address', 'Activity Country', 'User Agent String',
+                             'Product Name'] + ACTIVITY_DETAIL_COLUMNS
+ACTIVITY_SOURCE_DTYPES = {column: 'str' for column in ACTIVITY_CATEGORY_COLUMNS}
+# Rows per read chunk; only one chunk's timestamp strings are alive at a time
+READ_CHUNKSIZE = 200_000
+
+def parse_timestamps(values):
+    """Parse Takeout's 'YYYY-MM-DD HH:MM:SS UTC' strings to datetime64[us, UTC].
+
+    The fixed format takes a vectorized ISO 8601 path; anything else is parsed
+    value by value, and unparseable values become NaT.
+    """
+    text = values.astype('str').str.removesuffix(' UTC')
+    timestamps = pd.to_datetime(text, format='ISO8601', utc=True, errors='coerce')
+    failed = timestamps.isna() & text.notna()
+    if failed.any():
+        timestamps[failed] = pd.to_datetime(values[failed], format='mixed', utc=True, errors='coerce')
+    return timestamps.dt.as_unit('us')
+
+def iter_raw_activity_chunks(source, chunksize=READ_CHUNKSIZE):
+    """Yield the Activities columns the parser uses, chunksize rows at a time.
+
+    Columns missing from the export are just absent; 'Activity Timestamp' is
+    already parsed to datetimes and ACTIVITY_CATEGORY_COLUMNS are categoricals.
+    """
+    reader = pd.read_csv(source, sep=',', usecols=lambda column: column in ACTIVITY_SOURCE_COLUMNS,
+                         dtype=ACTIVITY_SOURCE_DTYPES, on_bad_lines='skip', encoding='utf-8',
+                         chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            chunk['Activity Timestamp'] = parse_timestamps(chunk['Activity Timestamp'])
+            for column in ACTIVITY_CATEGORY_COLUMNS:
+                if column in chunk:
+                    chunk[column] = chunk[column].astype('category')
+            yield chunk
+
+def concat_chunks(chunks, columns=None):
+    """Concatenate chunk frames, unifying per-chunk categoricals so they stay categorical.
+
+    (pd.concat alone would turn categoricals with differing categories into
+    full string columns.) Categories are sorted, so they come out the same
+    however the rows were split into chunks; categories whose dtypes differ
+    between chunks are unioned as objects.
+    """
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    if len(chunks) == 1:
+        return sort_categories(chunks[0])
+    category_columns = list(chunks[0].select_dtypes('category').columns)
+    df = pd.concat([chunk.drop(columns=category_columns) for chunk in chunks])
+    for column in category_columns:
+        parts = [chunk[column] for chunk in chunks]
+        if len({part.cat.categories.dtype for part in parts}) > 1:
+            parts = [part.cat.set_categories(part.cat.categories.astype(object)) for part in parts]
+        df[column] = union_categoricals(parts, sort_categories=True)
+    return df[chunks[0].columns]
+
+def sort_categories(df):
+    """df with the categories of its categorical columns in sorted order."""
+    unsorted = {
+        column: df[column].cat.reorder_categories(df[column].cat.categories.sort_values())
+        for column in df.select_dtypes('category').columns
+        if not df[column].cat.categories.is_monotonic_increasing
+    }
+    return df.assign(**unsorted) if unsorted else df
+
+def _fill_missing(values, fill_value):
+    """fillna that also works on categoricals (fill_value becomes a category when needed)."""
+    if not values.hasnans:
+        return values
+    if isinstance(values.dtype, pd.CategoricalDtype) and fill_value not in values.cat.categories:
+        values = values.cat.add_categories([fill_value])
+    return values.fillna(fill_value)
+
+def normalize_activity_frame(df):
+    """Turn a raw Activities frame (see iter_raw_activity_chunks) into the table columns, in place.
+
+    Source columns are replaced or renamed rather than copied, so only
+    'User Agent String' is kept next to the table columns.
+    """
+    # Decode every User Agent String field once per distinct string
+    ua_fields = decode_user_agents(df['User Agent String'])
+
+    # Ensure required columns, fill missing with 'N/A'
+    df['Timestamp'] = df.pop('Activity Timestamp')
+    if 'IP Address' not in df:
+        df['IP Address'] = 'N/A'
+    for column in UA_COLUMNS:
+        df[column] = ua_fields[column]
+    df['Location'] = _fill_missing(df.pop('Activity Country'), 'N/A') if 'Activity Country' in df else 'N/A'
+    df['App Used'] = df.pop('Product Name') if 'Product Name' in df else 'N/A'
+    return df
+
+def select_activity_columns(df, include_ua_fields=False):
+    """Select the table columns of a normalized frame, dropping rows without a timestamp.
+
+    include_ua_fields adds the decoded UA fields and the detail columns the
+    export has. Categories are sorted (see concat_chunks).
+    """
+    required_columns = list(ACTIVITY_COLUMNS)
+    if include_ua_fields:
+        required_columns += [col for col in UA_COLUMNS if col not in required_columns]
+        required_columns += [col for col in ACTIVITY_DETAIL_COLUMNS if col in df]
+    result = df[required_columns]
+    missing = result['Timestamp'].isna()
+    if missing.any():
+        result = result[~missing]
+        # Dropped rows must not leave empty categories behind in the charts
+        result = result.assign(**{
+            column: result[column].cat.remove_unused_categories()
+            for column in result.select_dtypes('category').columns
+        })
+    return sort_categories(result)
+
+def _value_counts(values):
+    """value_counts as a dict, without the zero counts of categories no row holds."""
+    counts = values.value_counts()
+    return counts[counts > 0].to_dict()
+
+def format_activity_breakdown(unique_devices, unique_ips, total_activities, earliest, latest,
+                              apps_used, os_used, client_apps):
+    """Format the activity summary shown in the Tracking Summary panel."""
+    days_tracked = (latest - earliest).days if pd.notna(earliest) and pd.notna(latest) else 0
+    return (
+        "Activity Tracking Analysis\n\n"
+        "• Unique Devices Tracked: {}\n"
+        "• Unique IP Addresses: {}\n"
+        "• Total Activities Recorded: {}\n"
+        "• Tracking Period: {} days (from {} to {})\n"
+        "• Apps Used:\n{}\n"
+        "• Operating Systems:\n{}\n"
+        "• Client Apps:\n{}".format(
+            unique_devices,
+            unique_ips,
+            total_activities,
+            days_tracked,
+            earliest,
+            latest,
+            "\n".join([f"  - {app}: {count}" for app, count in apps_used.items()]),
+            "\n".join([f"  - {os_name}: {count}" for os_name, count in os_used.items()]),
+            "\n".join([f"  - {app}: {count}" for app, count in client_apps.items()])
+        )
+    )
+
+@instrumented('parse_activity_csv')
+def parse_activity_csv(file_path, include_ua_fields=False, progress=None):
     try:
         # Read CSV with flexible column handling
-        df = pd.read_csv(file_path, sep=',', parse_dates=['Activity Timestamp'], 
-                         on_bad_lines='skip', encoding='utf-8')
-        
-        # Extract device type from User Agent String
-        def extract_device_type(ua):
-            if pd.isna(ua):
-                return 'Unknown'
-            if 'Device Type :' in ua:
-                parts = ua.split('Device Type :')[1].split('.')[0].strip()
-                return parts
-            return 'Unknown'
-        
-        # Ensure required columns, fill missing with 'N/A'
-        df['Timestamp'] = df['Activity Timestamp'].fillna(pd.NaT)
-        df['IP Address'] = df.get('IP Address', 'N/A')
-        df['Device Type'] = df['User Agent String'].apply(extract_device_type)
-        df['Location'] = df.get('Activity Country', 'N/A').fillna('N/A')
-        df['App Used'] = df.get('Product Name', 'N/A')
-        
-        # Combine "Unknown" and "UNKNOWN" for consistency
-        df['Device Type'] = df['Device Type'].replace('UNKNOWN', 'Unknown')
-        
+        with span('read_csv') as stage:
+            with open_takeout_csv(file_path, 'activities', progress) as source:
+                df = concat_chunks(list(iter_raw_activity_chunks(source)), ACTIVITY_SOURCE_COLUMNS)
+            stage.rows = len(df)
+            stage.frame = df
+        with span('normalize (timestamps, UA decode)', rows=len(df)):
+            df = normalize_activity_frame(df)
+
         # Generate breakdown
-        unique_devices = df['Device Type'].nunique()
-        unique_ips = df['IP Address'].nunique()
-        total_activities = len(df)
-        earliest = df['Timestamp'].min()
-        latest = df['Timestamp'].max()
-        days_tracked = (latest - earliest).days if pd.notna(earliest) and pd.notna(latest) else 0
-        apps_used = df['App Used'].value_counts().to_dict()
-        
-        breakdown = (
-            "Activity Tracking Analysis\n\n"
-            "• Unique Devices Tracked: {}\n"
-            "• Unique IP Addresses: {}\n"
-            "• Total Activities Recorded: {}\n"
-            "• Tracking Period: {} days (from {} to {})\n"
-            "• Apps Used:\n{}".format(
-                unique_devices,
-                unique_ips,
-                total_activities,
-                days_tracked,
-                earliest,
-                latest,
-                "\n".join([f"  - {app}: {count}" for app, count in apps_used.items()])
+        with span('breakdown', rows=len(df)):
+            breakdown = format_activity_breakdown(
+                df['Device Type'].nunique(),
+                df['IP Address'].nunique(),
+                len(df),
+                df['Timestamp'].min(),
+                df['Timestamp'].max(),
+                _value_counts(df['App Used']),
+                _value_counts(df['OS']),
+                _value_counts(df['Client App'])
             )
-        )
-        
+
         # Select relevant columns
-        required_columns = ['Timestamp', 'IP Address', 'Device Type', 'Location', 'App Used']
-        return df[required_columns].dropna(subset=['Timestamp']), breakdown
+        with span('select columns', rows=len(df)) as stage:
+            df = select_activity_columns(df, include_ua_fields)
+            stage.frame = df
+        return df, breakdown
+    except ParseCancelled:
+        raise
     except Exception as e:
-        raise ValueError(f"Error reading activity CSV: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Error reading activity CSV: {str(e)}")
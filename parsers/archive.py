@@ -0,0 +1,153 @@
+import io
+import os
+import re
+import zipfile
+from contextlib import contextmanager
+from .progress import ProgressReader
+
+ACCESS_LOG_DIR = 'Access Log Activity'
+# Takeout names its CSVs "Activities - A list of ..." and "Devices - A list of ..."
+MEMBER_PREFIXES = {'activities': 'Activities', 'devices': 'Devices'}
+
+# Multi-part exports are named takeout-<timestamp>-001.zip, -002.zip, ...
+_PART_RE = re.compile(r'^(?P<stem>.+)-(?P<part>\d+)\.zip$', re.IGNORECASE)
+
+def is_zip_source(source):
+    """Whether a parser source refers to Takeout zip archive(s) rather than a CSV."""
+    if isinstance(source, (list, tuple)):
+        return bool(source) and all(is_zip_source(path) for path in source)
+    return isinstance(source, (str, os.PathLike)) and os.fspath(source).lower().endswith('.zip')
+
+def takeout_parts(zip_path):
+    """Return every part of the multi-part export zip_path belongs to, in part order."""
+    directory, name = os.path.split(os.path.abspath(zip_path))
+    match = _PART_RE.match(name)
+    if not match:
+        return [zip_path]
+    parts = []
+    for candidate in os.listdir(directory):
+        candidate_match = _PART_RE.match(candidate)
+        if candidate_match and candidate_match.group('stem') == match.group('stem'):
+            parts.append((int(candidate_match.group('part')), os.path.join(directory, candidate)))
+    return [path for _, path in sorted(parts)]
+
+def takeout_export_name(zip_path):
+    """Name shared by every part of an export: the zip name without its -NNN.zip suffix."""
+    name = os.path.basename(zip_path)
+    match = _PART_RE.match(name)
+    return match.group('stem') if match else os.path.splitext(name)[0]
+
+def find_takeout_members(zip_paths, kind=None):
+    """List (zip_path, member) pairs for the Access Log Activity CSVs in the given zips."""
+    members = []
+    for zip_path in zip_paths:
+        with zipfile.ZipFile(zip_path) as archive:
+            for name in sorted(archive.namelist()):
+                path_parts = name.split('/')
+                if len(path_parts) < 2 or path_parts[-2] != ACCESS_LOG_DIR:
+                    continue
+                if not name.lower().endswith('.csv'):
+                    continue
+                if kind is not None and not path_parts[-1].startswith(MEMBER_PREFIXES[kind]):
+                    continue
+                members.append((zip_path, name))
+    return members
+
+class _MemberChain(io.RawIOBase):
+    """Read-only stream that decompresses zip members one after another as one CSV.
+
+    The header line of every member after the first is skipped so the
+    concatenation parses like a single export.
+    """
+
+    def __init__(self, members):
+        super().__init__()
+        self._members = list(members)
+        self._archive = None
+        self._stream = None
+        self._opened = 0
+        self._pending = b''
+        self._last_byte = b'\n'
+
+    def readable(self):
+        return True
+
+    def _open_next(self):
+        zip_path, member = self._members.pop(0)
+        self._archive = zipfile.ZipFile(zip_path)
+        self._stream = self._archive.open(member)
+        if self._opened:
+            self._stream.readline()
+            # Keep the previous member's last record from running into this one
+            if self._last_byte != b'\n':
+                self._pending = b'\n'
+        self._opened += 1
+
+    def _close_current(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._archive.close()
+        self._stream = None
+        self._archive = None
+
+    def readinto(self, buffer):
+        if self._pending:
+            size = min(len(buffer), len(self._pending))
+            buffer[:size] = self._pending[:size]
+            self._pending = self._pending[size:]
+            return size
+        while True:
+            if self._stream is None:
+                if not self._members:
+                    return 0
+                self._open_next()
+                if self._pending:
+                    return self.readinto(buffer)
+            data = self._stream.read(len(buffer))
+            if data:
+                buffer[:len(data)] = data
+                self._last_byte = data[-1:]
+                return len(data)
+            self._close_current()
+
+    def close(self):
+        self._close_current()
+        super().close()
+
+def _members_size(members):
+    """Total uncompressed size of the given zip members."""
+    total = 0
+    for zip_path, member in members:
+        with zipfile.ZipFile(zip_path) as archive:
+            total += archive.getinfo(member).file_size
+    return total
+
+@contextmanager
+def open_takeout_csv(source, kind, progress=None):
+    """Yield something pd.read_csv can read for a CSV path or Takeout zip(s).
+
+    A zip path pulls in its sibling parts; a list of zip paths is used as is.
+    Matching members are stream-decompressed without touching the disk.
+    When progress is given it is called as progress(bytes_read, total_bytes)
+    while the data is consumed.
+    """
+    if not is_zip_source(source):
+        if progress is None:
+            yield source
+            return
+        raw = ProgressReader(io.FileIO(source, 'r'), os.path.getsize(source), progress)
+    else:
+        zip_paths = list(source) if isinstance(source, (list, tuple)) else takeout_parts(source)
+        members = find_takeout_members(zip_paths, kind)
+        if not members:
+            raise FileNotFoundError(
+                f"No {MEMBER_PREFIXES[kind]} CSV found under '{ACCESS_LOG_DIR}' in {source}"
+            )
+        raw = _MemberChain(members)
+        if progress is not None:
+            raw = ProgressReader(raw, _members_size(members), progress)
+    stream = io.BufferedReader(raw, buffer_size=1 << 20)
+    try:
+        yield stream
+    finally:
+        stream.close()
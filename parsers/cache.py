@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from utils.instrumentation import instrumented, span
+from .archive import is_zip_source, takeout_parts
+
+CACHE_VERSION = 6
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'google-tracking-analyzer')
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Sampled content hash: a few blocks spread over the file instead of hashing gigabytes
+_HASH_BLOCK = 1 << 20
+_HASH_SAMPLES = 4
+
+def _content_hash(path, size):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        if size <= _HASH_BLOCK * _HASH_SAMPLES:
+            digest.update(f.read())
+        else:
+            step = (size - _HASH_BLOCK) // (_HASH_SAMPLES - 1)
+            for i in range(_HASH_SAMPLES):
+                f.seek(i * step)
+                digest.update(f.read(_HASH_BLOCK))
+    return digest.hexdigest()
+
+def file_fingerprint(path):
+    """Path, size, mtime and sampled content hash identifying one input file."""
+    stat = os.stat(path)
+    return {
+        'path': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': _content_hash(path, stat.st_size),
+    }
+
+def source_fingerprint(source):
+    """Fingerprints of every file a parser source reads (all zip parts for a zip)."""
+    if is_zip_source(source):
+        paths = list(source) if isinstance(source, (list, tuple)) else takeout_parts(source)
+    else:
+        paths = [source]
+    return [file_fingerprint(path) for path in paths]
+
+def cache_key(parser_name, source, **parser_kwargs):
+    payload = {
+        'version': CACHE_VERSION,
+        'parser': parser_name,
+        'kwargs': parser_kwargs,
+        'sources': source_fingerprint(source),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _save_column(directory, index, series):
+    """Write one column as .npy file(s), returning its metadata entry."""
+    name = f'col{index}'
+    meta = {'name': series.name, 'file': name, 'dtype': str(series.dtype)}
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        meta['kind'] = 'category'
+        meta['categories'] = series.cat.categories.tolist()
+        # An empty list alone would come back as object categories
+        meta['categories_dtype'] = str(series.cat.categories.dtype)
+        np.save(os.path.join(directory, name + '.npy'), series.cat.codes.to_numpy())
+    elif pd.api.types.is_datetime64_any_dtype(series.dtype):
+        meta['kind'] = 'datetime'
+        meta['tz'] = str(series.dt.tz) if series.dt.tz is not None else None
+        values = series.dt.tz_convert('UTC').dt.tz_localize(None) if meta['tz'] else series
+        meta['unit'] = np.datetime_data(values.dtype)[0]
+        np.save(os.path.join(directory, name + '.npy'), values.to_numpy().view('int64'))
+    elif pd.api.types.is_numeric_dtype(series.dtype):
+        meta['kind'] = 'numeric'
+        np.save(os.path.join(directory, name + '.npy'), series.to_numpy())
+    else:
+        # Dictionary-encode strings so the column is stored as integer codes
+        meta['kind'] = 'dictionary'
+        codes, uniques = pd.factorize(series.astype(object))
+        meta['uniques'] = [str(value) for value in uniques]
+        np.save(os.path.join(directory, name + '.npy'), codes)
+    return meta
+
+def _load_column(directory, meta, index):
+    values = np.load(os.path.join(directory, meta['file'] + '.npy'), mmap_mode='r')
+    if meta['kind'] == 'category':
+        data = pd.Categorical.from_codes(
+            values, categories=pd.Index(meta['categories'], dtype=meta['categories_dtype'])
+        )
+    elif meta['kind'] == 'datetime':
+        data = pd.DatetimeIndex(np.asarray(values).view(f"datetime64[{meta['unit']}]"))
+        if meta['tz']:
+            data = data.tz_localize('UTC').tz_convert(meta['tz'])
+    elif meta['kind'] == 'numeric':
+        data = np.asarray(values)
+    else:
+        uniques = np.array(meta['uniques'] + [np.nan], dtype=object)
+        data = uniques.take(values)  # code -1 picks the trailing NaN
+    if meta['kind'] != 'dictionary':
+        return pd.Series(data, index=index, name=meta['name'])
+    series = pd.Series(data, index=index, name=meta['name'], dtype=object)
+    return series if meta['dtype'] == 'object' else series.astype(meta['dtype'])
+
+class ParseCache:
+    """Size-bounded on-disk cache of parsed (frame, breakdown) results.
+
+    Each entry is a directory of per-column .npy files loaded memory-mapped,
+    plus a meta.json with the breakdown. Least recently used entries are
+    evicted once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key):
+        """Return the cached (df, breakdown) for key, or None on a miss."""
+        directory = self._entry_dir(key)
+        meta_path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            index = pd.Index(np.load(os.path.join(directory, 'index.npy')))
+            df = pd.DataFrame({
+                column['name']: _load_column(directory, column, index)
+                for column in meta['columns']
+            }, index=index)
+            os.utime(meta_path)  # Mark as recently used for eviction
+            return df, meta['breakdown']
+        except (OSError, ValueError, KeyError):
+            # A corrupt entry is treated as a miss and rebuilt
+            shutil.rmtree(directory, ignore_errors=True)
+            return None
+
+    def store(self, key, df, breakdown):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        directory = self._entry_dir(key)
+        staging = f'{directory}.tmp{os.getpid()}'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        try:
+            np.save(os.path.join(staging, 'index.npy'), df.index.to_numpy())
+            meta = {
+                'breakdown': breakdown,
+                'columns': [_save_column(staging, i, df[column]) for i, column in enumerate(df.columns)],
+                'created': time.time(),
+            }
+            with open(os.path.join(staging, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            shutil.rmtree(directory, ignore_errors=True)
+            os.replace(staging, directory)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            directory = os.path.join(self.cache_dir, name)
+            meta_path = os.path.join(directory, 'meta.json')
+            if not os.path.exists(meta_path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(directory))
+            entries.append((os.stat(meta_path).st_mtime, size, directory))
+        total = sum(size for _, size, _ in entries)
+        for _, size, directory in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(directory, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+@instrumented('cached_parse')
+def cached_parse(parser, source, cache=None, progress=None, **parser_kwargs):
+    """Run parser(source, **parser_kwargs) through the on-disk cache.
+
+    progress is handed to the parser on a miss and is not part of the key.
+    """
+    if cache is None:
+        cache = ParseCache()
+    with span('cache lookup') as stage:
+        key = cache_key(parser.__name__, source, **parser_kwargs)
+        cached = cache.load(key)
+        stage.rows = len(cached[0]) if cached is not None else None
+    if cached is not None:
+        return cached
+    df, breakdown = parser(source, progress=progress, **parser_kwargs)
+    try:
+        with span('cache store', rows=len(df)):
+            cache.store(key, df, breakdown)
+    except OSError:
+        pass  # A read-only or full cache directory must not break parsing
+    return df, breakdown
+
+@instrumented('cached_derive')
+def cached_derive(compute, parse_key, name, sources=(), cache=None):
+    """Run compute() through the on-disk cache, for results derived from a cached parse.
+
+    compute returns (frames, meta): a dict of DataFrames and JSON-serializable
+    metadata. The key combines parse_key (the cache_key of the parsed frame),
+    name and the fingerprints of the further input files in sources (None
+    for an input that isn't set), so changing any of them recomputes. Each frame is
+    an entry of its own, listed by an index entry stored last; a hit needs
+    all of them.
+    """
+    if cache is None:
+        cache = ParseCache()
+    payload = {
+        'version': CACHE_VERSION,
+        'parse': parse_key,
+        'derived': name,
+        'sources': [None if source is None else source_fingerprint(source) for source in sources],
+    }
+    key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+    with span('cache lookup') as stage:
+        cached = cache.load(key)
+        if cached is not None:
+            names, meta = cached[0]['frame'].tolist(), cached[1]
+            frames = {frame_name: cache.load(f'{key}-{index}') for index, frame_name in enumerate(names)}
+            if all(frame is not None for frame in frames.values()):
+                stage.rows = len(frames)
+                return {frame_name: frame for frame_name, (frame, _) in frames.items()}, meta
+    frames, meta = compute()
+    try:
+        with span('cache store', rows=len(frames)):
+            for index, frame in enumerate(frames.values()):
+                cache.store(f'{key}-{index}', frame, None)
+            cache.store(key, pd.DataFrame({'frame': list(frames)}, dtype=object), meta)
+    except OSError:
+        pass  # As in cached_parse
+    return frames, meta
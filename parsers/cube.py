@@ -0,0 +1,303 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from utils.timebins import NS_PER_DAY, NS_PER_HOUR, bound_ns, day_index, day_label_counts, epoch_ns, hour_of_week_counts, value_codes
+from .activity_parser import ACTIVITY_DETAIL_COLUMNS, format_activity_breakdown
+
+# Columns the cube counts by, of those the frame has ('Device' is the joined physical device).
+# IP Address is not one: cells would multiply with the addresses (see ActivityCube)
+CUBE_DIMENSIONS = ['App Used', 'Device Type', 'Location', 'OS', 'Client App'] + ACTIVITY_DETAIL_COLUMNS + ['Device']
+# Query results (and slices) kept per cube, least recently used dropped first
+DEFAULT_MEMO_SIZE = 256
+
+_NO_TIME = np.iinfo('int64').min
+_MAX_KEY = 1 << 62
+
+def _first_appearances(codes):
+    """Row of each code's first appearance, for factorize codes (numbered in that order)."""
+    return np.flatnonzero(np.diff(np.maximum.accumulate(codes), prepend=-1) > 0)
+
+def _sorted_counts(counts, index):
+    series = pd.Series(counts, index=index, dtype='int64')
+    return series[series > 0].sort_values(ascending=False, kind='stable')
+
+class CubeView:
+    """The cells of an ActivityCube in a slice; offers the same methods as ActivityAggregator.
+
+    Every query is a bincount over the cells (weighted by their counts), so
+    it costs the number of cells, not rows, and is memoized in the cube.
+    """
+
+    def __init__(self, cube, cells, key):
+        self.cube = cube
+        self.cells = cells
+        self.key = key
+        self.dimensions = cube.dimensions
+
+    def _memoized(self, key, compute):
+        memo, key = self.cube.memo, (self.key, key)
+        if key in memo:
+            memo.move_to_end(key)
+            return memo[key]
+        value = memo[key] = compute()
+        if len(memo) > self.cube.memo_size:
+            memo.popitem(last=False)
+        return value
+
+    def _take(self, values):
+        return values if self.cells is None else values[self.cells]
+
+    def __len__(self):
+        return self._memoized('total', lambda: int(self._take(self.cube.cell_counts).sum()))
+
+    def is_filtered(self):
+        return self.cells is not None
+
+    def counts(self, column):
+        """Activities per value of a dimension, most first (like value_counts)."""
+        def compute():
+            labels = self.cube.labels[column]
+            counts = np.bincount(self._take(self.cube.codes[column]), weights=self._take(self.cube.cell_counts),
+                                 minlength=len(labels) + 1)
+            return _sorted_counts(counts[:len(labels)], pd.Index(labels, dtype=object))
+        return self._memoized(('counts', column), compute)
+
+    def rollup(self, columns):
+        """Activities per combination of dimension values, most first, as a Series on a MultiIndex."""
+        columns = tuple(columns)
+
+        def compute():
+            codes = [self._take(self.cube.codes[column]).astype('int64') for column in columns]
+            # Cells missing any of the values are left out, as groupby does
+            known = np.ones(len(self._take(self.cube.cell_counts)), dtype=bool)
+            for column, column_codes in zip(columns, codes):
+                known &= column_codes < len(self.cube.labels[column])
+            key = np.zeros(int(known.sum()), dtype='int64')
+            for column, column_codes in zip(columns, codes):
+                key, _ = pd.factorize(key * len(self.cube.labels[column]) + column_codes[known])
+            counts = np.bincount(key, weights=self._take(self.cube.cell_counts)[known]).astype('int64')
+            first = _first_appearances(key)
+            index = pd.MultiIndex.from_arrays([
+                np.asarray(self.cube.labels[column], dtype=object)[column_codes[known][first]]
+                for column, column_codes in zip(columns, codes)
+            ], names=list(columns))
+            return _sorted_counts(counts, index)
+        return self._memoized(('rollup', columns), compute)
+
+    def app_counts_series(self):
+        return self.counts('App Used')
+
+    def device_counts_series(self):
+        return self.counts('Device Type')
+
+    def _timed(self):
+        """(hour start times in ns, counts) of the cells with a timestamp."""
+        hours, counts = self._take(self.cube.cell_hours), self._take(self.cube.cell_counts)
+        valid = hours != _NO_TIME
+        return hours[valid] * NS_PER_HOUR, counts[valid]
+
+    def daily_counts(self):
+        """Activities per UTC day, sorted by day."""
+        def compute():
+            times, counts = self._timed()
+            days = times // NS_PER_DAY
+            day0 = days.min() if len(days) else 0
+            totals = np.bincount(days - day0, weights=counts).astype('int64')
+            present = np.flatnonzero(totals)
+            return pd.Series(totals[present], index=day_index(present + day0, self.cube.tz), dtype='int64')
+        return self._memoized('daily', compute)
+
+    def hour_of_week_counts(self):
+        """Activities per (weekday, UTC hour), a 7x24 array."""
+        return self._memoized('hour_of_week', lambda: hour_of_week_counts(*self._timed()))
+
+    def day_label_counts(self, column):
+        """Activities per UTC day and value of column (days x values)."""
+        def compute():
+            hours, counts = self._take(self.cube.cell_hours), self._take(self.cube.cell_counts)
+            times = np.where(hours != _NO_TIME, hours * NS_PER_HOUR, _NO_TIME)
+            return day_label_counts(times, self._take(self.cube.codes[column]), self.cube.labels[column],
+                                    self.cube.tz, counts)
+        return self._memoized(('day_labels', column), compute)
+
+    def time_bounds(self):
+        def compute():
+            first, last = self._take(self.cube.cell_first), self._take(self.cube.cell_last)
+            first, last = first[first != _NO_TIME], last[last != _NO_TIME]
+            if not len(first):
+                return pd.NaT, pd.NaT
+            bounds = pd.to_datetime([first.min(), last.max()], utc=True)
+            if self.cube.tz is None:
+                bounds = bounds.tz_localize(None)
+            elif str(self.cube.tz) != 'UTC':
+                bounds = bounds.tz_convert(self.cube.tz)
+            return bounds[0], bounds[1]
+        return self._memoized('bounds', compute)
+
+    def unique_ips(self):
+        """Distinct IP addresses of the view, from the cube's (cell, address) pairs."""
+        def compute():
+            if self.cube.ip_cells is None:
+                return 0
+            codes = self.cube.ip_codes
+            if self.cells is not None:
+                kept = np.zeros(len(self.cube.cell_counts), dtype=bool)
+                kept[self.cells] = True
+                codes = codes[kept[self.cube.ip_cells]]
+            present = np.bincount(codes, minlength=len(self.cube.ip_labels) + 1)[:len(self.cube.ip_labels)]
+            return int(np.count_nonzero(present))
+        return self._memoized('unique_ips', compute)
+
+    def breakdown(self):
+        earliest, latest = self.time_bounds()
+        optional = lambda column: self.counts(column).to_dict() if column in self.cube.codes else {}
+        return format_activity_breakdown(
+            len(self.counts('Device Type')),
+            self.unique_ips(),
+            len(self),
+            earliest,
+            latest,
+            self.app_counts_series().to_dict(),
+            optional('OS'),
+            optional('Client App')
+        )
+
+    def slice(self, start=None, end=None, selections=None):
+        """The cells with start <= hour < end whose dimensions hold selected values.
+
+        Bounds are taken to the hour (the filter panel's day bounds are exact);
+        selections maps dimensions to the values to keep, as FrameIndex.filter.
+        Slices are memoized like any other query.
+        """
+        selections = tuple(sorted(
+            (column, tuple(sorted(map(str, values)))) for column, values in (selections or {}).items() if values
+        ))
+        lo = None if start is None else bound_ns(start, self.cube.tz) // NS_PER_HOUR
+        hi = None if end is None else bound_ns(end, self.cube.tz) // NS_PER_HOUR
+        if lo is None and hi is None and not selections:
+            return self
+
+        def compute():
+            mask = np.ones(len(self._take(self.cube.cell_counts)), dtype=bool)
+            if lo is not None or hi is not None:
+                hours = self._take(self.cube.cell_hours)
+                mask &= hours != _NO_TIME
+                if lo is not None:
+                    mask &= hours >= lo
+                if hi is not None:
+                    mask &= hours < hi
+            for column, values in selections:
+                labels = self.cube.labels[column]
+                wanted = [code for code, label in enumerate(labels) if str(label) in values]
+                mask &= np.isin(self._take(self.cube.codes[column]), wanted)
+            cells = np.flatnonzero(mask)
+            return CubeView(self.cube, cells if self.cells is None else self.cells[cells],
+                            (self.key, lo, hi, selections))
+        return self._memoized(('slice', lo, hi, selections), compute)
+
+class ActivityCube(CubeView):
+    """Activity counts per (UTC hour, dimension values) cell of a table frame, built once.
+
+    A row's cell key is its hour and dimension codes in mixed radix,
+    renumbered with a hash factorize whenever the next dimension would
+    overflow it (and once at the end), so most frames take one factorize. A cell keeps its count, its
+    dimension codes and its first and last timestamp, so the summary, the
+    charts and any roll-up or slice over the dimensions read the cells instead
+    of the rows. Rows without a timestamp get their own cells; they count in
+    the totals but not in anything by time. Cells are hours rather than days
+    so that the hour-of-week heatmap comes from them too.
+    """
+
+    def __init__(self, df, dimensions=None, memo_size=DEFAULT_MEMO_SIZE):
+        self.dimensions = [column for column in (dimensions or CUBE_DIMENSIONS) if column in df]
+        self.memo = OrderedDict()
+        self.memo_size = memo_size
+        self.tz = getattr(df['Timestamp'].dtype, 'tz', None)
+        times = epoch_ns(df['Timestamp'])
+        valid = times != _NO_TIME
+        hours = np.where(valid, times // NS_PER_HOUR, _NO_TIME)
+        # Hour 0 is no timestamp
+        hour0 = hours[valid].min() - 1 if valid.any() else 0
+        cells = np.where(valid, hours - hour0, 0)
+        bound = int(cells.max()) + 1 if len(cells) else 1
+        row_codes, self.labels = {}, {}
+        for column in self.dimensions:
+            codes, labels = value_codes(df[column])
+            row_codes[column], self.labels[column] = codes, labels
+            if bound * (len(labels) + 1) >= _MAX_KEY:
+                cells, _ = pd.factorize(cells)
+                bound = int(cells.max()) + 1
+            cells = cells * (len(labels) + 1) + codes
+            bound *= len(labels) + 1
+        cells, _ = pd.factorize(cells)
+        size = int(cells.max()) + 1 if len(cells) else 0
+        first_rows = _first_appearances(cells)
+
+        self.cell_counts = np.bincount(cells, minlength=size)
+        self.cell_hours = hours[first_rows]
+        self.codes = {
+            column: codes[first_rows].astype(np.min_scalar_type(len(self.labels[column])))
+            for column, codes in row_codes.items()
+        }
+        self.cell_first = np.full(size, np.iinfo('int64').max)
+        self.cell_last = np.full(size, _NO_TIME)
+        np.minimum.at(self.cell_first, cells[valid], times[valid])
+        np.maximum.at(self.cell_last, cells[valid], times[valid])
+        self.cell_first[self.cell_hours == _NO_TIME] = _NO_TIME
+
+        # Addresses only need counting per slice, so each cell keeps the set of its
+        # addresses as (cell, address) pairs instead of a cell per address
+        self.ip_cells = self.ip_codes = self.ip_labels = None
+        if 'IP Address' in df:
+            ip_codes, self.ip_labels = value_codes(df['IP Address'])
+            width = len(self.ip_labels) + 1
+            pairs = pd.unique(cells.astype('int64') * width + ip_codes)
+            self.ip_cells, self.ip_codes = pairs // width, pairs % width
+        super().__init__(self, None, ())
+
+    def values(self, column):
+        """Values of a dimension, most frequent first."""
+        return list(self.counts(column).index)
+
+    def to_frames(self):
+        """({'cells': frame, 'addresses': frame}, meta) of the cube for the parse cache; see from_frames."""
+        def categorical(codes, labels):
+            codes = codes.astype('int64')
+            return pd.Categorical.from_codes(np.where(codes < len(labels), codes, -1),
+                                             categories=pd.Index(labels, dtype=object))
+
+        cells = pd.DataFrame({column: categorical(codes, self.labels[column]) for column, codes in self.codes.items()})
+        cells['cell count'] = self.cell_counts
+        cells['cell hour'] = self.cell_hours
+        cells['cell first'] = self.cell_first
+        cells['cell last'] = self.cell_last
+        frames = {'cells': cells}
+        if self.ip_cells is not None:
+            frames['addresses'] = pd.DataFrame({
+                'cell': self.ip_cells, 'IP Address': categorical(self.ip_codes, self.ip_labels)
+            })
+        return frames, {'dimensions': self.dimensions, 'tz': None if self.tz is None else str(self.tz)}
+
+    @classmethod
+    def from_frames(cls, frames, meta, memo_size=DEFAULT_MEMO_SIZE):
+        """The cube to_frames was called on, without going back to the rows."""
+        cube = cls.__new__(cls)
+        cube.dimensions = list(meta['dimensions'])
+        cube.memo = OrderedDict()
+        cube.memo_size = memo_size
+        cube.tz = None if meta['tz'] is None else pd.DatetimeTZDtype(tz=meta['tz']).tz
+        cells = frames['cells']
+        cube.labels, cube.codes = {}, {}
+        for column in cube.dimensions:
+            codes, cube.labels[column] = value_codes(cells[column])
+            cube.codes[column] = codes.astype(np.min_scalar_type(len(cube.labels[column])))
+        cube.cell_counts = cells['cell count'].to_numpy(dtype='int64')
+        cube.cell_hours = cells['cell hour'].to_numpy(dtype='int64')
+        cube.cell_first = cells['cell first'].to_numpy(dtype='int64')
+        cube.cell_last = cells['cell last'].to_numpy(dtype='int64')
+        cube.ip_cells = cube.ip_codes = cube.ip_labels = None
+        if 'addresses' in frames:
+            cube.ip_cells = frames['addresses']['cell'].to_numpy(dtype='int64')
+            cube.ip_codes, cube.ip_labels = value_codes(frames['addresses']['IP Address'])
+        CubeView.__init__(cube, cube, None, ())
+        return cube
@@ -1,92 +1,113 @@
 import pandas as pd
-import re
+from utils.instrumentation import instrumented, span
+from .archive import open_takeout_csv
+from .progress import ParseCancelled
 
-def parse_device_csv(file_path):
+# Descriptive device fields carried along with include_device_fields=True
+DEVICE_FIELDS = ['Brand Name', 'Marketing Name', 'OS', 'OS Version', 'Device Model']
+
+# Both values of a "Country ISO: US\nLast Activity Time: 2025-03-24 02:38:54 UTC" cell in one
+# pass; the lookaheads let either line be missing or come first
+LOCATION_PATTERN = (
+    r'(?s)^(?=(?:.*?Country ISO: (?P<country>\w{2}))?)'
+    r'(?=(?:.*?Last Activity Time: (?P<time>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) UTC)?)'
+)
+
+def _find_column(df, name):
+    """Return the column named name (stripped, case-insensitive), else the first containing it."""
+    columns = df.columns.str.strip().str.lower()
+    matches = df.columns[columns == name]
+    if not len(matches):
+        matches = df.columns[columns.str.contains(name, regex=False)]
+    return matches[0] if len(matches) else None
+
+def _clean_field(series):
+    """Strip a text field into a categorical, treating blanks as 'Unknown'."""
+    values = series.astype(str).str.strip()
+    values = values.mask(values.isin(['', 'UNKNOWN']), 'Unknown')
+    return values.astype('category')
+
+@instrumented('parse_device_csv')
+def parse_device_csv(file_path, include_device_fields=False, progress=None):
     try:
-        # Read CSV with comma separator, using Python engine for complex fields
-        df = pd.read_csv(file_path, sep=',', encoding='utf-8', on_bad_lines='warn', 
-                         keep_default_na=False, engine='python')
-        
+        # The C engine handles the multiline quoted Device Last Location cells
+        with span('read_csv') as stage:
+            with open_takeout_csv(file_path, 'devices', progress) as source:
+                df = pd.read_csv(source, sep=',', encoding='utf-8', on_bad_lines='warn',
+                                 keep_default_na=False, dtype=str)
+            stage.rows = len(df)
+
         # Check if Device Last Location column exists (case-insensitive)
-        columns = df.columns.str.strip().str.lower()
-        location_col = None
-        for col in columns:
-            if 'device last location' in col:
-                location_col = df.columns[columns == col][0]
-                break
-        
+        location_col = _find_column(df, 'device last location')
         if location_col is None:
             raise ValueError(f"Column 'Device Last Location' not found in CSV. Available columns: {df.columns.tolist()}")
-        
-        # Check if Device Type column exists (case-insensitive)
-        device_type_col = None
-        for col in columns:
-            if 'device type' in col:
-                device_type_col = df.columns[columns == col][0]
-                break
-        
-        # Function to extract timestamp and country from Device Last Location
-        def extract_location_info(location):
-            # Handle empty or whitespace-only cells
-            if pd.isna(location) or str(location).strip() == '':
-                return pd.NaT, 'N/A'
-            # Use regex to find timestamp and country
-            time_match = re.search(r'Last Activity Time: (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2} UTC)', location)
-            country_match = re.search(r'Country ISO: (\w{2})', location)
-            timestamp = pd.to_datetime(time_match.group(1), format='%Y-%m-%d %H:%M:%S UTC', errors='coerce') if time_match else pd.NaT
-            country = country_match.group(1) if country_match else 'N/A'
-            return timestamp, country
-        
-        # Apply extraction, ensuring row count consistency
-        location_results = df[location_col].apply(extract_location_info)
-        if len(location_results) != len(df):
-            raise ValueError(f"Mismatch in row counts: DataFrame has {len(df)} rows, but location extraction produced {len(location_results)} rows")
-        
-        df['Timestamp'], df['Location'] = zip(*location_results)
-        
-        # Assign Device Type
-        if device_type_col is None:
-            df['Device Type'] = 'Unknown'
-        else:
-            df['Device Type'] = df[device_type_col].apply(
-                lambda x: str(x).strip() if pd.notna(x) and str(x).strip() != '' else 'Unknown'
-            ).replace('UNKNOWN', 'Unknown')
-        
-        # Fill other required columns
-        df['IP Address'] = 'N/A'
-        df['App Used'] = 'N/A'
-        
-        # Filter out rows with invalid timestamps
-        filtered_df = df.dropna(subset=['Timestamp'])
-        
+
+        # Extract country and last activity time from every cell at once
+        with span('extract location', rows=len(df)):
+            location_info = df[location_col].str.extract(LOCATION_PATTERN)
+            df['Timestamp'] = pd.to_datetime(location_info['time'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+            df['Location'] = location_info['country'].fillna('N/A')
+
+        with span('clean fields', rows=len(df)):
+            # Assign Device Type (case-insensitive column lookup)
+            device_type_col = _find_column(df, 'device type')
+            if device_type_col is None:
+                df['Device Type'] = pd.Categorical(['Unknown'] * len(df))
+            else:
+                df['Device Type'] = _clean_field(df[device_type_col])
+
+            # Descriptive fields, 'Unknown' where the export leaves them blank or out
+            for field in DEVICE_FIELDS:
+                source_col = _find_column(df, field.lower())
+                if source_col is None:
+                    df[field] = pd.Categorical(['Unknown'] * len(df))
+                else:
+                    df[field] = _clean_field(df[source_col])
+
+            # Fill other required columns
+            df['IP Address'] = 'N/A'
+            df['App Used'] = 'N/A'
+
+            # Filter out rows with invalid timestamps
+            filtered_df = df.dropna(subset=['Timestamp'])
+            category_columns = ['Device Type'] + DEVICE_FIELDS
+            filtered_df = filtered_df.assign(**{
+                column: filtered_df[column].cat.remove_unused_categories() for column in category_columns
+            })
+
         # Generate breakdown
-        unique_devices = filtered_df['Device Type'].nunique()
-        unique_locations = filtered_df['Location'].nunique()
-        total_records = len(filtered_df)
-        earliest = filtered_df['Timestamp'].min()
-        latest = filtered_df['Timestamp'].max()
-        days_tracked = (latest - earliest).days if pd.notna(earliest) and pd.notna(latest) else 0
-        device_types = filtered_df['Device Type'].value_counts().to_dict()
-        
-        breakdown = (
-            "Device Tracking Analysis\n\n"
-            "• Unique Device Types: {}\n"
-            "• Unique Locations: {}\n"
-            "• Total Records: {}\n"
-            "• Tracking Period: {} days (from {} to {})\n"
-            "• Device Types:\n{}".format(
-                unique_devices,
-                unique_locations,
-                total_records,
-                days_tracked,
-                earliest,
-                latest,
-                "\n".join([f"  - {device}: {count}" for device, count in device_types.items()])
+        with span('breakdown', rows=len(filtered_df)):
+            unique_devices = filtered_df['Device Type'].nunique()
+            unique_locations = filtered_df['Location'].nunique()
+            total_records = len(filtered_df)
+            earliest = filtered_df['Timestamp'].min()
+            latest = filtered_df['Timestamp'].max()
+            days_tracked = (latest - earliest).days if pd.notna(earliest) and pd.notna(latest) else 0
+            device_types = filtered_df['Device Type'].value_counts().to_dict()
+
+            breakdown = (
+                "Device Tracking Analysis\n\n"
+                "• Unique Device Types: {}\n"
+                "• Unique Locations: {}\n"
+                "• Total Records: {}\n"
+                "• Tracking Period: {} days (from {} to {})\n"
+                "• Device Types:\n{}".format(
+                    unique_devices,
+                    unique_locations,
+                    total_records,
+                    days_tracked,
+                    earliest,
+                    latest,
+                    "\n".join([f"  - {device}: {count}" for device, count in device_types.items()])
+                )
             )
-        )
-        
+
         # Select required columns
         required_columns = ['Timestamp', 'IP Address', 'Device Type', 'Location', 'App Used']
+        if include_device_fields:
+            required_columns += DEVICE_FIELDS
         return filtered_df[required_columns], breakdown
+    except ParseCancelled:
+        raise
     except Exception as e:
-        raise ValueError(f"Error reading device CSV: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Error reading device CSV: {str(e)}")
@@ -0,0 +1,366 @@
+import hashlib
+import os
+import sqlite3
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.instrumentation import instrumented, span
+from utils.timebins import EPOCH_HOUR_OF_WEEK, HOURS_PER_WEEK, NS_PER_DAY, NS_PER_HOUR, bound_ns, day_index, epoch_ns
+from .activity_parser import ACTIVITY_COLUMNS, concat_chunks, format_activity_breakdown, sort_categories
+from .cache import source_fingerprint
+from .progress import ParseCancelled
+from .streaming import DEFAULT_CHUNKSIZE, iter_activity_chunks
+from .user_agent import UA_COLUMNS, decode_user_agents
+
+DEFAULT_HISTORY_PATH = os.path.join(
+    os.path.expanduser('~'), '.local', 'share', 'google-tracking-analyzer', 'history.sqlite3'
+)
+HISTORY_SCHEMA_VERSION = 1
+# Table columns of the stored activity fields
+STORE_COLUMNS = {'Device Type': 'device_type', 'App Used': 'app', 'Location': 'location'}
+
+# row_hash is the deduplication key (and rowid); ts is epoch nanoseconds UTC. The long,
+# highly repetitive user-agent strings live once in user_agents.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_agents (
+    id INTEGER PRIMARY KEY,
+    user_agent TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS activities (
+    row_hash INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    ip TEXT,
+    device_type TEXT,
+    location TEXT,
+    app TEXT,
+    ua_id INTEGER REFERENCES user_agents(id)
+);
+CREATE INDEX IF NOT EXISTS idx_activities_ts ON activities(ts);
+CREATE INDEX IF NOT EXISTS idx_activities_device ON activities(device_type, ts);
+CREATE INDEX IF NOT EXISTS idx_activities_app ON activities(app, ts);
+CREATE TABLE IF NOT EXISTS imports (
+    id INTEGER PRIMARY KEY,
+    source TEXT,
+    fingerprint TEXT,
+    imported_at TEXT,
+    rows_read INTEGER,
+    rows_added INTEGER
+);
+"""
+
+_MASK = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+def _mix64(values):
+    """splitmix64 finalizer over a uint64 array: a cheap, well-distributed bijection."""
+    with np.errstate(over='ignore'):
+        values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return values ^ (values >> np.uint64(31))
+
+def _text_hash(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+def row_hashes(timestamps_ns, ips, user_agents, products):
+    """64-bit dedup keys of timestamp+IP+UA+product rows, as signed int64 for SQLite.
+
+    The text fields are hashed with blake2b once per distinct (IP, UA, product)
+    combination and mixed with the timestamp in numpy, so the cost per row is
+    a few integer operations and the keys are stable across runs and versions.
+    """
+    combos = pd.MultiIndex.from_arrays([
+        pd.Series(ips, dtype=object).fillna(''),
+        pd.Series(user_agents, dtype=object).fillna(''),
+        pd.Series(products, dtype=object).fillna(''),
+    ])
+    codes, uniques = pd.factorize(combos)
+    combo_hashes = np.array([_text_hash('\x1f'.join(map(str, combo))) for combo in uniques], dtype=np.uint64)
+    mixed = _mix64(combo_hashes[codes] ^ _mix64(np.asarray(timestamps_ns).astype(np.uint64)))
+    return mixed.view(np.int64)
+
+def number_repeats(hashes, carry=None):
+    """Make repeated keys distinct: the k-th repeat of a key gets a key derived from (key, k).
+
+    An export can hold the same event twice in one second; numbering them keeps
+    both while re-importing the export still reproduces the same keys. carry
+    is the (keys, counts) returned for the previous chunk, so repeats straddling
+    a chunk boundary (adjacent in a time-ordered export) keep counting.
+    Returns (keys, carry).
+    """
+    order = np.argsort(hashes, kind='stable')
+    ordered = hashes[order]
+    run_start = np.ones(len(ordered), dtype=bool)
+    run_start[1:] = ordered[1:] != ordered[:-1]
+    starts = np.flatnonzero(run_start)
+    positions = np.arange(len(ordered))
+    repeat = positions - starts[np.cumsum(run_start) - 1]
+    unique, counts = ordered[starts], np.diff(np.append(starts, len(ordered)))
+    if carry is not None and len(carry[0]):
+        found = np.searchsorted(carry[0], unique)
+        found = np.minimum(found, len(carry[0]) - 1)
+        offsets = np.where(carry[0][found] == unique, carry[1][found], 0)
+        repeat = repeat + np.repeat(offsets, counts)
+        counts = counts + offsets
+    keys = hashes.copy()
+    repeated = order[repeat > 0]
+    keys[repeated] = _mix64(
+        hashes[repeated].view(np.uint64) ^ _mix64(repeat[repeat > 0].astype(np.uint64))
+    ).view(np.int64)
+    return keys, (unique, counts)
+
+class HistoryView:
+    """Aggregates of a time range of the history store.
+
+    Offers the same methods as ActivityAggregator, so the summary and charts
+    can be built from SQL GROUP BYs without loading the rows.
+    """
+
+    def __init__(self, store, start=None, end=None):
+        self.store = store
+        self.start = start
+        self.end = end
+
+    def _grouped(self, column):
+        where, params = self.store._range_clause(self.start, self.end)
+        rows = self.store.connection.execute(
+            f"SELECT {column}, COUNT(*) FROM activities {where} GROUP BY {column}", params
+        ).fetchall()
+        counts = pd.Series(dict(rows), dtype='int64')
+        return counts.sort_values(ascending=False, kind='stable')
+
+    def app_counts_series(self):
+        return self._grouped('app')
+
+    def device_counts_series(self):
+        return self._grouped('device_type')
+
+    def daily_counts(self):
+        """Activities per UTC day, sorted by day (integer division by a day floors ts)."""
+        where, params = self.store._range_clause(self.start, self.end)
+        rows = self.store.connection.execute(
+            f"SELECT ts / {NS_PER_DAY} AS day, COUNT(*) FROM activities {where} GROUP BY day ORDER BY day",
+            params
+        ).fetchall()
+        days = np.array([row[0] for row in rows], dtype='int64') * NS_PER_DAY
+        return pd.Series([row[1] for row in rows], index=pd.to_datetime(days, utc=True), dtype='int64')
+
+    def hour_of_week_counts(self):
+        """Activities per (weekday, UTC hour), a 7x24 array."""
+        where, params = self.store._range_clause(self.start, self.end)
+        rows = self.store.connection.execute(
+            f"SELECT (ts / {NS_PER_HOUR} + {EPOCH_HOUR_OF_WEEK}) % {HOURS_PER_WEEK} AS bucket, COUNT(*) "
+            f"FROM activities {where} GROUP BY bucket", params
+        ).fetchall()
+        counts = np.zeros(HOURS_PER_WEEK, dtype='int64')
+        for bucket, count in rows:
+            counts[bucket] = count
+        return counts.reshape(7, 24)
+
+    def day_label_counts(self, column):
+        """Activities per UTC day and value of column (days x values)."""
+        where, params = self.store._range_clause(self.start, self.end)
+        field = STORE_COLUMNS[column]
+        rows = self.store.connection.execute(
+            f"SELECT ts / {NS_PER_DAY} AS day, COALESCE({field}, 'N/A'), COUNT(*) FROM activities {where} "
+            f"GROUP BY day, {field}", params
+        ).fetchall()
+        days, days_present = pd.factorize(np.array([row[0] for row in rows], dtype='int64'), sort=True)
+        labels, label_values = pd.factorize(pd.Series([row[1] for row in rows], dtype=object))
+        counts = np.zeros((len(days_present), len(label_values)), dtype='int64')
+        np.add.at(counts, (days, labels), [row[2] for row in rows])
+        return pd.DataFrame(counts, index=day_index(days_present), columns=pd.Index(label_values, dtype=object))
+
+    def breakdown(self):
+        where, params = self.store._range_clause(self.start, self.end)
+        connection = self.store.connection
+        total, devices, ips, earliest, latest = connection.execute(
+            f"SELECT COUNT(*), COUNT(DISTINCT device_type), COUNT(DISTINCT ip), MIN(ts), MAX(ts) "
+            f"FROM activities {where}", params
+        ).fetchone()
+        # OS and client app come from the user agents, decoded once per distinct string
+        ua_rows = connection.execute(
+            f"SELECT u.user_agent, COUNT(*) FROM activities LEFT JOIN user_agents u ON u.id = ua_id "
+            f"{where} GROUP BY ua_id", params
+        ).fetchall()
+        ua_counts = pd.Series([row[1] for row in ua_rows], dtype='int64')
+        ua_fields = decode_user_agents(pd.Series([row[0] for row in ua_rows], dtype=object))
+
+        def counts_by(column):
+            grouped = ua_counts.groupby(ua_fields[column].astype(object).to_numpy(), sort=False).sum()
+            return grouped.sort_values(ascending=False, kind='stable').to_dict()
+
+        return format_activity_breakdown(
+            devices, ips, total, _from_ns(earliest), _from_ns(latest),
+            self.app_counts_series().to_dict(), counts_by('OS'), counts_by('Client App')
+        )
+
+class HistoryStore:
+    """Persistent SQLite store of activity rows accumulated across Takeout exports.
+
+    Appends skip rows already stored (same timestamp, IP, user agent and
+    product), so importing overlapping monthly exports keeps one copy of each.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # The GUI imports on a worker thread and queries on the Tk thread, never both at once
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+        self.connection.execute(f"PRAGMA user_version={HISTORY_SCHEMA_VERSION}")
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _user_agent_ids(self, user_agents):
+        """Map UA strings to user_agents ids, inserting the new ones."""
+        distinct = [ua for ua in pd.unique(user_agents) if isinstance(ua, str)]
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO user_agents (user_agent) VALUES (?)", ((ua,) for ua in distinct)
+        )
+        ids = {}
+        for offset in range(0, len(distinct), 500):
+            batch = distinct[offset:offset + 500]
+            ids.update(self.connection.execute(
+                f"SELECT user_agent, id FROM user_agents WHERE user_agent IN ({','.join('?' * len(batch))})",
+                batch
+            ).fetchall())
+        return ids
+
+    def append_activities(self, chunk, carry=None):
+        """Insert the rows of a normalized Activities chunk that are not stored yet.
+
+        chunk is what normalize_activity_frame produces (it still carries the raw
+        'User Agent String'). Rows without a timestamp are
+        skipped. carry links consecutive chunks of one export (see
+        number_repeats). Returns (rows_added, carry).
+        """
+        chunk = chunk[chunk['Timestamp'].notna()]
+        if not len(chunk):
+            return 0, carry
+        ts = epoch_ns(chunk['Timestamp'])
+        user_agents = chunk['User Agent String'].astype(object).to_numpy()
+        products = chunk['Product Name'].astype(object).to_numpy() if 'Product Name' in chunk else \
+            chunk['App Used'].astype(object).to_numpy()
+        hashes, carry = number_repeats(row_hashes(ts, chunk['IP Address'].to_numpy(), user_agents, products), carry)
+        ua_ids = self._user_agent_ids(user_agents)
+
+        def text(series):
+            return series.astype(object).where(series.notna(), None).to_numpy()
+
+        rows = zip(
+            hashes.tolist(), ts.tolist(), text(chunk['IP Address']), text(chunk['Device Type']),
+            text(chunk['Location']), text(chunk['App Used']),
+            [ua_ids.get(ua) if isinstance(ua, str) else None for ua in user_agents]
+        )
+        before = self.connection.total_changes
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO activities (row_hash, ts, ip, device_type, location, app, ua_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return self.connection.total_changes - before, carry
+
+    @instrumented('history import')
+    def import_activities(self, source, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+        """Stream an Activities CSV (or Takeout zip) into the store; returns (rows_read, rows_added)."""
+        read = added = 0
+        carry = None
+        try:
+            for chunk in iter_activity_chunks(source, chunksize, progress):
+                read += len(chunk)
+                with span('history append', rows=len(chunk)):
+                    chunk_added, carry = self.append_activities(chunk, carry)
+                added += chunk_added
+        except ParseCancelled:
+            raise
+        except Exception as e:
+            raise ValueError(f"Error importing activity CSV into history: {str(e)}")
+        sources = list(source) if isinstance(source, (list, tuple)) else [source]
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO imports (source, fingerprint, imported_at, rows_read, rows_added) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (os.pathsep.join(map(str, sources)), repr(source_fingerprint(source)),
+                 datetime.now().isoformat(timespec='seconds'), read, added)
+            )
+        return read, added
+
+    def _range_clause(self, start=None, end=None):
+        """WHERE clause for start <= ts < end (either bound optional), using the ts index."""
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("ts >= ?")
+            params.append(bound_ns(start, 'UTC'))
+        if end is not None:
+            conditions.append("ts < ?")
+            params.append(bound_ns(end, 'UTC'))
+        return ("WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+    def count(self, start=None, end=None):
+        where, params = self._range_clause(start, end)
+        return self.connection.execute(f"SELECT COUNT(*) FROM activities {where}", params).fetchone()[0]
+
+    def time_range(self):
+        """(earliest, latest) stored timestamps, NaT when empty."""
+        earliest, latest = self.connection.execute("SELECT MIN(ts), MAX(ts) FROM activities").fetchone()
+        return _from_ns(earliest), _from_ns(latest)
+
+    def imports(self):
+        return pd.read_sql_query("SELECT * FROM imports ORDER BY id", self.connection)
+
+    def view(self, start=None, end=None):
+        return HistoryView(self, start, end)
+
+    @instrumented('history load')
+    def load_activities(self, start=None, end=None, include_ua_fields=False, chunksize=DEFAULT_CHUNKSIZE):
+        """Rows with start <= Timestamp < end as the table frame parse_activity_csv returns.
+
+        Rows come back newest first, like a Takeout export. They are read
+        chunksize rows at a time and each chunk's text columns are turned into
+        categoricals before the next is read; the UA fields are decoded once
+        per stored user agent and spread over the rows by their ids.
+        """
+        where, params = self._range_clause(start, end)
+        query = (f"SELECT ts, ip, device_type, location, app, ua_id FROM activities {where} "
+                 f"ORDER BY ts DESC")
+        chunks, ua_ids = [], []
+        for chunk in pd.read_sql_query(query, self.connection, params=params, chunksize=chunksize):
+            chunks.append(pd.DataFrame({
+                'Timestamp': pd.to_datetime(chunk['ts'].to_numpy(dtype='int64'), utc=True).as_unit('us'),
+                'IP Address': chunk['ip'].astype('category'),
+                'Device Type': chunk['device_type'].astype('category'),
+                'Location': chunk['location'].astype('category'),
+                'App Used': chunk['app'].astype('category'),
+            }))
+            ua_ids.append(chunk['ua_id'].fillna(-1).to_numpy(dtype='int64'))
+        if not chunks:
+            chunks = [pd.DataFrame({
+                'Timestamp': pd.DatetimeIndex([], tz='UTC').as_unit('us'),
+                **{column: pd.Categorical([]) for column in ACTIVITY_COLUMNS[1:]},
+            })]
+        df = concat_chunks(chunks).reset_index(drop=True)
+        if include_ua_fields:
+            known = pd.read_sql_query("SELECT id, user_agent FROM user_agents ORDER BY id", self.connection)
+            ids = np.concatenate(ua_ids) if ua_ids else np.zeros(0, dtype='int64')
+            positions = np.searchsorted(known['id'].to_numpy(), ids)
+            found = (ids >= 0) & (positions < len(known))
+            found[found] = known['id'].to_numpy()[positions[found]] == ids[found]
+            user_agents = pd.Categorical.from_codes(np.where(found, positions, -1), categories=known['user_agent'])
+            ua_fields = decode_user_agents(pd.Series(user_agents, index=df.index))
+            for column in UA_COLUMNS:
+                if column not in df:
+                    df[column] = ua_fields[column]
+        return sort_categories(df)
+
+def _from_ns(value):
+    return pd.Timestamp(value, tz='UTC') if value is not None else pd.NaT
\ No newline at end of file
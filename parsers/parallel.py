@@ -0,0 +1,156 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from utils.instrumentation import instrumented, span
+from .activity_parser import (
+    concat_chunks, iter_raw_activity_chunks, normalize_activity_frame, parse_activity_csv, select_activity_columns
+)
+from .archive import is_zip_source
+from .progress import ParseCancelled
+from .streaming import ActivityAggregator, fold_activity_chunks
+
+# Smaller files are parsed serially; starting a pool would cost more than it saves
+PARALLEL_MIN_BYTES = 64 * 2**20
+# Upper bound on one byte range, so each task's raw bytes and strings stay small
+RANGE_BYTES = 64 * 2**20
+_SCAN_BYTES = 1 << 20
+
+def _count_quotes(path, start, end):
+    """Number of '"' bytes in [start, end) of path."""
+    count = 0
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(_SCAN_BYTES, remaining))
+            if not block:
+                break
+            count += block.count(b'"')
+            remaining -= len(block)
+    return count
+
+def _next_record_start(f, offset, quotes_before):
+    """Offset of the first record that starts at or after offset.
+
+    quotes_before is the number of quotes before offset: a newline ends a
+    record only when an even number of quotes precede it (escaped quotes
+    come in pairs, so they never change the parity).
+    """
+    f.seek(offset)
+    parity = quotes_before % 2
+    while True:
+        block = f.read(_SCAN_BYTES)
+        if not block:
+            return f.tell()
+        data = np.frombuffer(block, dtype=np.uint8)
+        quoted = (np.cumsum(data == ord('"')) + parity) % 2
+        newlines = np.flatnonzero((data == ord('\n')) & (quoted == 0))
+        if len(newlines):
+            return offset + int(newlines[0]) + 1
+        parity = int(quoted[-1])
+        offset += len(block)
+
+def plan_byte_ranges(path, parts, executor=None, range_bytes=RANGE_BYTES):
+    """Split a CSV into (header_bytes, [(start, end), ...]) byte ranges of whole records.
+
+    The data after the header is cut into at least parts ranges of at most
+    range_bytes each, and every cut is moved forward to the next record
+    boundary outside quoted fields. The quotes before each cut are counted
+    on executor (in parallel) when given.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header_end = _next_record_start(f, 0, 0)
+        f.seek(0)
+        header = f.read(header_end)
+        step = max(1, min(range_bytes, -(-(size - header_end) // max(parts, 1))))
+        cuts = list(range(header_end + step, size, step))
+        # Quotes in each stretch between consecutive cuts, prefix-summed to the count before each cut
+        stretches = list(zip([header_end] + cuts[:-1], cuts))
+        if executor is not None:
+            counts = list(executor.map(_count_quotes, [path] * len(stretches), *zip(*stretches))) \
+                if stretches else []
+        else:
+            counts = [_count_quotes(path, start, end) for start, end in stretches]
+        quotes_before = np.cumsum(counts, dtype=np.int64) + header.count(b'"')
+        bounds = [header_end]
+        for cut, quotes in zip(cuts, quotes_before):
+            start = _next_record_start(f, cut, int(quotes))
+            if bounds[-1] < start < size:
+                bounds.append(start)
+    bounds.append(size)
+    return header, [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+def _empty_table(header, include_ua_fields):
+    """The table parse_activity_csv returns for a CSV of just header: its columns, no rows."""
+    chunk = next(iter_raw_activity_chunks(io.BytesIO(header)))
+    return select_activity_columns(normalize_activity_frame(chunk), include_ua_fields)
+
+def _parse_range(path, header, start, end, include_ua_fields):
+    """Parse one byte range in a worker; returns (selected frame, ActivityAggregator)."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    source = io.BytesIO(header + data)
+    del data
+    chunks = (normalize_activity_frame(chunk) for chunk in iter_raw_activity_chunks(source))
+    aggregator, kept = fold_activity_chunks(chunks, keep_rows=True, include_ua_fields=include_ua_fields)
+    return concat_chunks(kept) if kept else _empty_table(header, include_ua_fields), aggregator
+
+@instrumented('parse_activity_csv_parallel')
+def parse_activity_csv_parallel(file_path, include_ua_fields=False, progress=None, workers=None,
+                                min_bytes=PARALLEL_MIN_BYTES, range_bytes=RANGE_BYTES):
+    """parse_activity_csv across a process pool, one byte range of the CSV per task.
+
+    Returns the same (df, breakdown): range frames are concatenated in file
+    order with their row labels shifted to where the serial parser puts them
+    (and categories sorted, as the serial parser sorts them), and the
+    per-range aggregates are merged in the same order. Zips, files
+    under min_bytes and single-worker pools fall back to parse_activity_csv.
+    """
+    workers = workers or os.cpu_count() or 1
+    if is_zip_source(file_path) or workers < 2 or os.path.getsize(file_path) < min_bytes:
+        return parse_activity_csv(file_path, include_ua_fields, progress)
+    try:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            with span('plan byte ranges') as stage:
+                header, ranges = plan_byte_ranges(file_path, workers, executor, range_bytes)
+                stage.rows = len(ranges)
+            with span('parse byte ranges'):
+                futures = {
+                    executor.submit(_parse_range, file_path, header, start, end, include_ua_fields): i
+                    for i, (start, end) in enumerate(ranges)
+                }
+                results = [None] * len(ranges)
+                done, total = 0, os.path.getsize(file_path)
+                for future in as_completed(futures):
+                    i = futures[future]
+                    results[i] = future.result()
+                    done += ranges[i][1] - ranges[i][0]
+                    if progress is not None:
+                        progress(done, total)
+        except BaseException:
+            # Drop the queued ranges and return without waiting for the running ones
+            # (a `with` block would join the pool), so a cancel takes effect at once
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+        with span('merge byte ranges') as stage:
+            aggregator = ActivityAggregator()
+            frames = []
+            for frame, part in results:
+                # Serial row labels count every row read before this range, dropped ones included
+                frames.append(frame.set_axis(frame.index + aggregator.total_activities))
+                aggregator.merge(part)
+            df = concat_chunks(frames) if frames else _empty_table(header, include_ua_fields)
+            breakdown = aggregator.breakdown()
+            stage.rows = len(df)
+            stage.frame = df
+        return df, breakdown
+    except ParseCancelled:
+        raise
+    except Exception as e:
+        raise ValueError(f"Error reading activity CSV: {str(e)}")
@@ -0,0 +1,30 @@
+import io
+
+class ParseCancelled(Exception):
+    """Raised from a progress callback to stop a parse that is in flight."""
+
+class ProgressReader(io.RawIOBase):
+    """Raw stream wrapper reporting progress(bytes_read, total_bytes) on every read.
+
+    The callback may raise ParseCancelled to abort the reader's consumer.
+    """
+
+    def __init__(self, raw, total_bytes, progress):
+        super().__init__()
+        self._raw = raw
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self._progress = progress
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = self._raw.readinto(buffer)
+        self.bytes_read += size or 0
+        self._progress(self.bytes_read, self.total_bytes)
+        return size
+
+    def close(self):
+        self._raw.close()
+        super().close()
@@ -0,0 +1,84 @@
+import csv
+import io
+from collections import namedtuple
+from .activity_parser import parse_activity_csv
+from .archive import MEMBER_PREFIXES, find_takeout_members, is_zip_source, open_takeout_csv, takeout_parts
+from .device_parser import parse_device_csv
+
+SNIFF_BYTES = 64 * 1024
+PREVIEW_LINES = 10
+
+# name: registry key and Takeout member kind; label: what the GUI shows; headers: columns
+# that identify the export; visualizations: whether the charts apply to its frame
+ParserSpec = namedtuple('ParserSpec', ['name', 'label', 'parser', 'headers', 'visualizations'])
+
+_REGISTRY = []
+
+def register_parser(name, label, parser, headers, visualizations=False):
+    """Register a parser for Takeout CSVs whose header contains all of headers."""
+    spec = ParserSpec(name, label, parser, frozenset(h.strip().lower() for h in headers), visualizations)
+    _REGISTRY[:] = [existing for existing in _REGISTRY if existing.name != name]
+    _REGISTRY.append(spec)
+    return spec
+
+def registered_parsers():
+    return list(_REGISTRY)
+
+def get_parser(name_or_label):
+    for spec in _REGISTRY:
+        if name_or_label in (spec.name, spec.label):
+            return spec
+    raise KeyError(f"No parser registered for {name_or_label!r}")
+
+def sniff_source(source, kind=None, max_bytes=SNIFF_BYTES):
+    """Read at most max_bytes of a CSV (or zipped Takeout CSV of the given kind).
+
+    Returns (header_columns, preview_text); only whole lines are kept in the preview.
+    """
+    with open_takeout_csv(source, kind) as csv_source:
+        if is_zip_source(source):
+            data = csv_source.read(max_bytes + 1)
+        else:
+            with open(csv_source, 'rb') as f:
+                data = f.read(max_bytes + 1)
+    truncated = len(data) > max_bytes
+    text = data[:max_bytes].decode('utf-8-sig', errors='ignore')
+    if truncated and '\n' in text:
+        text = text[:text.rindex('\n') + 1]
+    header = next(csv.reader(io.StringIO(text)), [])
+    preview = ''.join(io.StringIO(text).readlines()[:PREVIEW_LINES])
+    return [column.strip() for column in header], preview
+
+def match_parser(header_columns):
+    """Return the registered parser whose identifying headers best match, or None."""
+    columns = {column.strip().lower() for column in header_columns}
+    best, best_score = None, 0
+    for spec in _REGISTRY:
+        if spec.headers <= columns and len(spec.headers) > best_score:
+            best, best_score = spec, len(spec.headers)
+    return best
+
+def detect_parser(source, max_bytes=SNIFF_BYTES):
+    """Detect the export type of source from its header.
+
+    Returns (spec, preview_text). For zips, the registered kinds are tried in
+    registration order and the first member present is sniffed.
+    """
+    if is_zip_source(source):
+        zip_paths = list(source) if isinstance(source, (list, tuple)) else takeout_parts(source)
+        for spec in _REGISTRY:
+            if spec.name in MEMBER_PREFIXES and find_takeout_members(zip_paths, spec.name):
+                header, preview = sniff_source(zip_paths, spec.name, max_bytes)
+                return match_parser(header) or spec, preview
+        raise ValueError(f"No recognised Takeout CSV found in {source}")
+    header, preview = sniff_source(source, None, max_bytes)
+    spec = match_parser(header)
+    if spec is None:
+        raise ValueError(f"Unrecognised CSV header: {', '.join(header)}")
+    return spec, preview
+
+register_parser(
+    'activities', "Activity Logs", parse_activity_csv,
+    ['Activity Timestamp', 'User Agent String', 'Product Name'], visualizations=True
+)
+register_parser('devices', "Device Logs", parse_device_csv, ['Device Last Location'])
@@ -0,0 +1,169 @@
+from collections import Counter
+import numpy as np
+import pandas as pd
+from .activity_parser import (
+    ACTIVITY_COLUMNS, concat_chunks, format_activity_breakdown, iter_raw_activity_chunks,
+    normalize_activity_frame, select_activity_columns
+)
+from utils.instrumentation import instrumented, span
+from utils.timebins import STACK_COLUMNS, activity_day_label_counts, activity_hour_of_week
+from .archive import open_takeout_csv
+from .progress import ParseCancelled
+
+DEFAULT_CHUNKSIZE = 100_000
+
+def _sorted_counts(counter):
+    """Turn a Counter into a Series ordered like value_counts (descending, ties by first seen)."""
+    counts = pd.Series(dict(counter), dtype='int64')
+    return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+class ActivityAggregator:
+    """Incrementally folds normalized activity chunks into the summary and chart inputs.
+
+    Memory is bounded by the number of distinct devices, IPs, apps and days,
+    not by the number of rows.
+    """
+
+    def __init__(self):
+        self.total_activities = 0
+        self.earliest = pd.NaT
+        self.latest = pd.NaT
+        self.devices = set()
+        self.ips = set()
+        self.app_counts = Counter()
+        self.os_counts = Counter()
+        self.client_app_counts = Counter()
+        # Chart inputs only count rows that survive the timestamp filter, like the table
+        self.chart_app_counts = Counter()
+        self.chart_device_counts = Counter()
+        self.daily = Counter()
+        self.hour_of_week = np.zeros((7, 24), dtype='int64')
+        self.day_labels = {}
+
+    def update(self, chunk):
+        """Fold one normalized chunk (see normalize_activity_frame) into the aggregates."""
+        self.total_activities += len(chunk)
+        self.devices.update(chunk['Device Type'].dropna().unique())
+        self.ips.update(chunk['IP Address'].dropna().unique())
+        self.app_counts.update(chunk['App Used'].value_counts(sort=False).to_dict())
+        self.os_counts.update(chunk['OS'].value_counts(sort=False).to_dict())
+        self.client_app_counts.update(chunk['Client App'].value_counts(sort=False).to_dict())
+
+        valid = chunk['Timestamp'].notna()
+        if not valid.any():
+            return
+        timestamps = chunk['Timestamp'][valid]
+        earliest, latest = timestamps.min(), timestamps.max()
+        self.earliest = earliest if pd.isna(self.earliest) else min(self.earliest, earliest)
+        self.latest = latest if pd.isna(self.latest) else max(self.latest, latest)
+        self.chart_app_counts.update(chunk['App Used'][valid].value_counts(sort=False).to_dict())
+        self.chart_device_counts.update(
+            chunk['Device Type'][valid].value_counts(sort=False).to_dict()
+        )
+        self.daily.update(timestamps.dt.floor('D').value_counts(sort=False).to_dict())
+        self.hour_of_week += activity_hour_of_week(chunk)
+        for column in STACK_COLUMNS:
+            self._add_day_labels(column, activity_day_label_counts(chunk, column))
+
+    def _add_day_labels(self, column, counts):
+        if column in self.day_labels:
+            # Days or values only one side has come out as NaN
+            counts = self.day_labels[column].add(counts, fill_value=0).fillna(0).astype('int64')
+        self.day_labels[column] = counts
+
+    def merge(self, other):
+        """Fold in the aggregates of rows that come after this one's (order matters for ties)."""
+        self.total_activities += other.total_activities
+        for bound in (other.earliest, other.latest):
+            if pd.notna(bound):
+                self.earliest = bound if pd.isna(self.earliest) else min(self.earliest, bound)
+                self.latest = bound if pd.isna(self.latest) else max(self.latest, bound)
+        self.devices |= other.devices
+        self.ips |= other.ips
+        for name in ('app_counts', 'os_counts', 'client_app_counts', 'chart_app_counts',
+                     'chart_device_counts', 'daily'):
+            getattr(self, name).update(getattr(other, name))
+        self.hour_of_week += other.hour_of_week
+        for column, counts in other.day_labels.items():
+            self._add_day_labels(column, counts)
+        return self
+
+    def breakdown(self):
+        return format_activity_breakdown(
+            len(self.devices),
+            len(self.ips),
+            self.total_activities,
+            self.earliest,
+            self.latest,
+            _sorted_counts(self.app_counts).to_dict(),
+            _sorted_counts(self.os_counts).to_dict(),
+            _sorted_counts(self.client_app_counts).to_dict()
+        )
+
+    def app_counts_series(self):
+        """Activities per app, as create_bar_chart would count them from the table."""
+        return _sorted_counts(self.chart_app_counts)
+
+    def device_counts_series(self):
+        """Activities per device type, as create_pie_chart would count them from the table."""
+        return _sorted_counts(self.chart_device_counts)
+
+    def daily_counts(self):
+        """Activities per UTC day, sorted by day."""
+        counts = pd.Series(dict(self.daily), dtype='int64')
+        return counts.sort_index()
+
+    def hour_of_week_counts(self):
+        """Activities per (weekday, UTC hour), a 7x24 array."""
+        return self.hour_of_week
+
+    def day_label_counts(self, column):
+        """Activities per UTC day and value of column (days x values)."""
+        counts = self.day_labels.get(column)
+        if counts is None:
+            return pd.DataFrame(index=pd.DatetimeIndex([], tz='UTC'), dtype='int64')
+        return counts.sort_index()
+
+def iter_activity_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    """Yield normalized Activities chunks read with pd.read_csv(chunksize=...)."""
+    with open_takeout_csv(file_path, 'activities', progress) as source:
+        for chunk in iter_raw_activity_chunks(source, chunksize):
+            yield normalize_activity_frame(chunk)
+
+def fold_activity_chunks(chunks, keep_rows=False, include_ua_fields=False):
+    """Aggregate normalized chunks; returns (aggregator, selected chunk frames or [])."""
+    aggregator = ActivityAggregator()
+    kept = []
+    for chunk in chunks:
+        aggregator.update(chunk)
+        if keep_rows:
+            kept.append(select_activity_columns(chunk, include_ua_fields))
+    return aggregator, kept
+
+@instrumented('stream_activity_csv')
+def stream_activity_csv(file_path, chunksize=DEFAULT_CHUNKSIZE, keep_rows=False,
+                        include_ua_fields=False, progress=None):
+    """Parse an Activities CSV chunk by chunk with bounded memory.
+
+    Returns (df, breakdown, aggregator). df holds the same rows as
+    parse_activity_csv when keep_rows is True and is None otherwise.
+    """
+    try:
+        with span('read + aggregate chunks') as stage:
+            aggregator, kept = fold_activity_chunks(
+                iter_activity_chunks(file_path, chunksize, progress), keep_rows, include_ua_fields
+            )
+            stage.rows = aggregator.total_activities
+
+        df = None
+        if keep_rows:
+            with span('concat chunks', rows=aggregator.total_activities) as stage:
+                df = concat_chunks(kept, ACTIVITY_COLUMNS)
+                stage.frame = df
+        with span('breakdown', rows=aggregator.total_activities):
+            breakdown = aggregator.breakdown()
+        return df, breakdown, aggregator
+    except ParseCancelled:
+        raise
+    except Exception as e:
+        raise ValueError(f"Error reading activity CSV: {str(e)}")
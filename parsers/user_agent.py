@@ -0,0 +1,54 @@
+import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# Fields of Google's "App : X. App Version : Y. Os : Z. Os Version : W. Device Type : T." grammar,
+# mapped to the column names used in the parsed frame
+UA_FIELDS = {
+    'App': 'Client App',
+    'App Version': 'Client App Version',
+    'Os': 'OS',
+    'Os Version': 'OS Version',
+    'Device Type': 'Device Type',
+}
+UA_COLUMNS = list(UA_FIELDS.values())
+
+# A field value runs up to the ". " that starts the next "Key : " pair (values such as
+# "18.3.2" contain dots themselves), or up to the final "." of the string
+_UA_FIELD_RE = re.compile(r'([A-Za-z][A-Za-z ]*?) : (.*?)\.(?=\s+[A-Za-z][A-Za-z ]*? : |\s*$)')
+
+@lru_cache(maxsize=4096)
+def parse_user_agent(ua):
+    """Parse one Takeout User Agent String into a tuple ordered like UA_COLUMNS."""
+    fields = dict(_UA_FIELD_RE.findall(ua)) if isinstance(ua, str) else {}
+    values = []
+    for key in UA_FIELDS:
+        value = fields.get(key)
+        if key == 'Device Type':
+            # Same normalisation the parser has always applied to device types
+            value = 'Unknown' if value is None or value.strip() == 'UNKNOWN' else value.strip()
+        elif value is None or value.strip() == '':
+            value = 'Unknown'
+        else:
+            value = value.strip()
+        values.append(value)
+    return tuple(values)
+
+def decode_user_agents(ua_series):
+    """Decode a Series of User Agent Strings into categorical UA_COLUMNS.
+
+    Each distinct string is parsed once (and memoized across calls), then the
+    results are broadcast back to every row through the factorized codes.
+    """
+    codes, uniques = pd.factorize(ua_series)
+    # Missing user agents (code -1) map onto an extra trailing row
+    table = [parse_user_agent(ua) for ua in uniques] + [parse_user_agent(None)]
+    codes = codes.copy()
+    codes[codes < 0] = len(uniques)
+
+    decoded = {}
+    for i, column in enumerate(UA_COLUMNS):
+        field_codes, categories = pd.factorize(np.array([row[i] for row in table], dtype=object))
+        decoded[column] = pd.Categorical.from_codes(field_codes[codes], categories=categories)
+    return pd.DataFrame(decoded, index=ua_series.index)
@@ -0,0 +1,56 @@
+import os
+import sys
+import zipfile
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The packages live at the top of the repo, which a bare `pytest` doesn't put on the path
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+# The Takeout export bundled with the repo
+SAMPLE_ZIP = os.path.join(ROOT, 'takeout-20250326T151156Z-001.zip')
+
+def _extract(tmp_path_factory, kind):
+    with zipfile.ZipFile(SAMPLE_ZIP) as archive:
+        name = next(name for name in archive.namelist()
+                    if 'Access Log Activity' in name and os.path.basename(name).startswith(kind))
+        target = tmp_path_factory.mktemp(kind.lower())
+        return archive.extract(name, target)
+
+@pytest.fixture(scope='session')
+def sample_zip():
+    return SAMPLE_ZIP
+
+@pytest.fixture(scope='session')
+def activities_csv(tmp_path_factory):
+    return _extract(tmp_path_factory, 'Activities')
+
+@pytest.fixture(scope='session')
+def devices_csv(tmp_path_factory):
+    return _extract(tmp_path_factory, 'Devices')
+
+@pytest.fixture(scope='session')
+def raw_activities(activities_csv):
+    """The sample Activities CSV as written, every field a string."""
+    return pd.read_csv(activities_csv, dtype=str, keep_default_na=False)
+
+@pytest.fixture(scope='session')
+def half_blank_csv(raw_activities, tmp_path_factory):
+    """The sample twice over (two read chunks): the categorical columns are filled in
+    the first copy and blank throughout the second."""
+    filled, blank = raw_activities.copy(), raw_activities.copy()
+    filled['Activity Country'] = 'US'
+    filled['Activity Type'] = 'User Initiated'
+    filled['Gmail Access Channel'] = 'IMAP'
+    for column in ('Activity Country', 'Activity Type', 'Gmail Access Channel', 'Sub-Product Name'):
+        blank[column] = ''
+    path = tmp_path_factory.mktemp('half_blank') / 'Activities.csv'
+    pd.concat([filled, blank]).to_csv(path, index=False)
+    return str(path)
+
+@pytest.fixture(scope='session')
+def activity_table(activities_csv):
+    """parse_activity_csv of the sample with the UA fields: (df, breakdown). Don't modify."""
+    from parsers.activity_parser import parse_activity_csv
+    return parse_activity_csv(activities_csv, include_ua_fields=True)
@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+from baseline import assert_same_table, baseline_parse_activity_csv
+from parsers.activity_parser import ACTIVITY_COLUMNS, concat_chunks, iter_raw_activity_chunks, parse_activity_csv
+from parsers.streaming import stream_activity_csv
+from parsers.user_agent import UA_COLUMNS, decode_user_agents, parse_user_agent
+
+def test_matches_baseline_parser(activities_csv, activity_table):
+    reference, reference_breakdown = baseline_parse_activity_csv(activities_csv)
+    df, breakdown = activity_table
+    assert_same_table(df, reference)
+    # The summary has grown sections after the apps; everything before is unchanged
+    assert breakdown.startswith(reference_breakdown + "\n")
+
+def test_plain_parse_has_the_table_columns(activities_csv, activity_table):
+    df, breakdown = parse_activity_csv(activities_csv)
+    assert list(df.columns) == ACTIVITY_COLUMNS
+    pd.testing.assert_frame_equal(df, activity_table[0][ACTIVITY_COLUMNS])
+    assert breakdown == activity_table[1]
+
+def test_zip_matches_csv(sample_zip, activity_table):
+    df, breakdown = parse_activity_csv(sample_zip, include_ua_fields=True)
+    pd.testing.assert_frame_equal(df, activity_table[0])
+    assert breakdown == activity_table[1]
+
+def test_user_agent_decode_matches_per_row_parse(raw_activities):
+    agents = raw_activities['User Agent String'].replace('', None)
+    decoded = decode_user_agents(agents)
+    expected = pd.DataFrame([parse_user_agent(ua) for ua in agents], columns=UA_COLUMNS)
+    for column in UA_COLUMNS:
+        assert decoded[column].astype(object).tolist() == expected[column].tolist(), column
+
+def test_user_agent_device_type_matches_baseline(raw_activities):
+    # The baseline's extraction: the text between 'Device Type :' and the next '.'
+    def extract_device_type(ua):
+        if 'Device Type :' not in ua:
+            return 'Unknown'
+        device_type = ua.split('Device Type :')[1].split('.')[0].strip()
+        return 'Unknown' if device_type == 'UNKNOWN' else device_type
+    for ua in raw_activities['User Agent String'].unique():
+        assert parse_user_agent(ua or None)[UA_COLUMNS.index('Device Type')] == extract_device_type(ua), ua
+
+def test_user_agent_fields():
+    ua = "App : CHROME. App Version : 134.0.6998.99. Os : IOS_OS. Os Version : 18.3.2. Device Type : MOBILE."
+    assert parse_user_agent(ua) == ('CHROME', '134.0.6998.99', 'IOS_OS', '18.3.2', 'MOBILE')
+    assert parse_user_agent("App : GMAIL_APP. Device Type : UNKNOWN.") == (
+        'GMAIL_APP', 'Unknown', 'Unknown', 'Unknown', 'Unknown')
+    assert parse_user_agent(None) == ('Unknown',) * 5
+
+def test_category_blank_for_a_whole_chunk(half_blank_csv, raw_activities):
+    df, _ = parse_activity_csv(half_blank_csv, include_ua_fields=True)
+    assert len(df) == 2 * len(raw_activities)
+    assert df['Location'].value_counts().to_dict() == {'US': len(raw_activities), 'N/A': len(raw_activities)}
+    assert df['Activity Type'].count() == len(raw_activities)
+    for column in ('Location', 'Activity Type', 'Gmail Access Channel'):
+        assert isinstance(df[column].dtype, pd.CategoricalDtype)
+
+@pytest.mark.filterwarnings('ignore::pandas.errors.DtypeWarning')
+def test_category_blank_chunks_match_baseline_parser(half_blank_csv):
+    reference, reference_breakdown = baseline_parse_activity_csv(half_blank_csv)
+    df, breakdown = parse_activity_csv(half_blank_csv)
+    assert_same_table(df, reference)
+    assert breakdown.startswith(reference_breakdown + "\n")
+
+def test_stream_with_blank_chunks_matches_parse(half_blank_csv):
+    df, breakdown = parse_activity_csv(half_blank_csv)
+    streamed, streamed_breakdown, _ = stream_activity_csv(half_blank_csv, chunksize=50_000, keep_rows=True)
+    pd.testing.assert_frame_equal(streamed, df)
+    assert streamed_breakdown == breakdown
+
+def test_concat_chunks_unions_categories_of_blank_chunks(half_blank_csv):
+    chunks = list(iter_raw_activity_chunks(half_blank_csv, chunksize=100_000))
+    assert chunks[-1]['Activity Country'].isna().all()
+    df = concat_chunks(chunks)
+    assert list(df['Activity Country'].cat.categories) == ['US']
+    assert df['Activity Country'].count() == sum(chunk['Activity Country'].count() for chunk in chunks)
+
+def test_concat_chunks_of_nothing_has_the_columns():
+    assert list(concat_chunks([], ACTIVITY_COLUMNS).columns) == ACTIVITY_COLUMNS
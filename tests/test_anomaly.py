@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+from analysis.anomaly import ALERT_COLUMNS, detect_anomalies
+
+START = pd.Timestamp('2024-01-01', tz='UTC')
+HOME_IP = '8.8.8.8'
+
+def _frame(events):
+    """Activity table frame of (time offset, IP, location) events."""
+    return pd.DataFrame({
+        'Timestamp': pd.DatetimeIndex([START + pd.Timedelta(offset) for offset, _, _ in events]),
+        'IP Address': [ip for _, ip, _ in events],
+        'Location': [location for _, _, location in events],
+    })
+
+def _hourly(hours, per_hour=1, start_hour=0, ip=HOME_IP, location='US'):
+    return [(f'{hour}h', ip, location) for hour in range(start_hour, start_hour + hours)
+            for _ in range(per_hour)]
+
+def _kind(alerts, kind):
+    return alerts[alerts['Kind'] == kind].reset_index(drop=True)
+
+def test_empty_input():
+    for df in (_frame([]), _frame([('0h', HOME_IP, 'US')]).assign(Timestamp=pd.NaT)):
+        alerts = detect_anomalies(df)
+        assert list(alerts.columns) == ALERT_COLUMNS
+        assert not len(alerts)
+
+def test_new_networks_after_the_learning_period():
+    events = _hourly(10 * 24) + [
+        ('3D', '9.9.9.9', 'US'),          # Within the learning period: baseline
+        ('8D', '1.1.1.1', 'US'), ('8D 1h', '1.1.1.1', 'US'), ('9D', '1.1.1.1', 'US'),
+        ('8D 2h', '8.8.8.9', 'US'),       # New address in a known /24
+        ('8D 3h', '192.168.1.7', 'US'),   # Private addresses are never news
+        ('8D 4h', 'not an ip', 'US'),
+    ]
+    alerts = detect_anomalies(_frame(events))
+    new_ips = _kind(alerts, 'New IP')
+    assert new_ips['Detail'].tolist() == ['1.1.1.1 (US)', '8.8.8.9 (US)']
+    assert new_ips['Events'].tolist() == [3, 1]
+    assert new_ips['Time'].tolist() == [START + pd.Timedelta('8D'), START + pd.Timedelta('8D 2h')]
+    prefixes = _kind(alerts, 'New prefix')
+    assert prefixes['Detail'].tolist() == ['1.1.1.0/24 (US)']
+    assert prefixes['Events'].tolist() == [3]
+
+def test_v6_prefix_and_learning_period_edge():
+    events = _hourly(2 * 24, ip='2001:db8::1') + [
+        ('1D', '2001:4860::1', 'US'),     # Exactly at the end of the learning period: new
+        ('1D 1h', '2001:4860::2', 'US'),  # Same /64
+    ]
+    alerts = detect_anomalies(_frame(events), learning_period='1D')
+    assert _kind(alerts, 'New IP')['Detail'].tolist() == ['2001:4860::1 (US)', '2001:4860::2 (US)']
+    assert _kind(alerts, 'New prefix')['Detail'].tolist() == ['2001:4860::/64 (US)']
+    assert _kind(alerts, 'New prefix')['Events'].tolist() == [2]
+
+def test_new_country_skips_missing_locations():
+    events = _hourly(10 * 24) + [
+        ('8D', HOME_IP, 'FR'), ('9D', HOME_IP, 'FR'),
+        ('8D 5h', HOME_IP, 'N/A'), ('8D 6h', HOME_IP, ''), ('8D 7h', HOME_IP, None),
+    ]
+    alerts = detect_anomalies(_frame(events))
+    countries = _kind(alerts, 'New country')
+    assert countries['Detail'].tolist() == ['FR']
+    assert countries['Events'].tolist() == [2]
+
+@pytest.mark.parametrize('missing', [None, 'N/A'])
+def test_all_locations_missing(missing):
+    events = _hourly(10 * 24, location=missing) + [('8D', '1.1.1.1', missing), ('8D 30min', HOME_IP, missing)]
+    df = _frame(events)
+    if missing is None:
+        df['Location'] = df['Location'].astype('category')
+    alerts = detect_anomalies(df)
+    assert set(alerts['Kind']) == {'New IP', 'New prefix'}
+    # No location to show next to the address
+    assert _kind(alerts, 'New IP')['Detail'].tolist() == ['1.1.1.1']
+
+def test_burst_needs_a_day_of_history():
+    quiet = _hourly(3 * 24)
+    early = detect_anomalies(_frame(quiet + _hourly(1, per_hour=100, start_hour=23)))
+    assert not len(_kind(early, 'Burst'))
+    on_time = _kind(detect_anomalies(_frame(quiet + _hourly(1, per_hour=100, start_hour=24))), 'Burst')
+    assert on_time['Time'].tolist() == [START + pd.Timedelta('24h')]
+    assert on_time['Events'].tolist() == [101]
+    assert on_time['Detail'].tolist() == ['101 events in 1h (baseline 1/h)']
+
+def test_burst_run_is_one_alert():
+    events = _hourly(3 * 24) + _hourly(2, per_hour=100, start_hour=30)
+    bursts = _kind(detect_anomalies(_frame(events)), 'Burst')
+    assert bursts['Time'].tolist() == [START + pd.Timedelta('30h')]
+    assert bursts['Events'].tolist() == [202]
+    assert bursts['Detail'].str.contains('in 2h').all()
+
+def test_burst_min_events():
+    events = _hourly(3 * 24) + _hourly(1, per_hour=40, start_hour=30)
+    assert not len(_kind(detect_anomalies(_frame(events)), 'Burst'))
+    bursts = _kind(detect_anomalies(_frame(events), burst_min_events=20), 'Burst')
+    assert bursts['Events'].tolist() == [41]
+
+@pytest.mark.parametrize('second, flagged', [(54, False), (55, True)])
+def test_burst_trailing_window_edge(second, flagged):
+    # With a 24h window, hour 54 still has the hour-30 spike in its baseline and hour 55 doesn't
+    events = _hourly(3 * 24) + _hourly(1, per_hour=1000, start_hour=30) + _hourly(1, per_hour=100, start_hour=second)
+    bursts = _kind(detect_anomalies(_frame(events), burst_window='24h'), 'Burst')
+    expected = [START + pd.Timedelta('30h')] + ([START + pd.Timedelta(f'{second}h')] if flagged else [])
+    assert bursts['Time'].tolist() == expected
+
+def test_impossible_travel():
+    events = [
+        ('0h', HOME_IP, 'US'),
+        ('10min', HOME_IP, 'N/A'),        # Unlocated events don't break the hop
+        ('20min', HOME_IP, 'FR'),
+        ('1h', HOME_IP, 'US'),
+        ('2h', HOME_IP, 'FR'),
+        ('4h', HOME_IP, 'US'),            # Exactly min_travel_time: plausible
+        ('1D', HOME_IP, 'FR'),
+        ('1D 1h', HOME_IP, 'US'),
+    ]
+    travel = _kind(detect_anomalies(_frame(events)), 'Impossible travel')
+    assert travel['Detail'].tolist() == [
+        'US → FR in 0 days 00:20:00',
+        'FR → US in 0 days 00:40:00',
+        'FR → US in 0 days 01:00:00',
+    ]
+    # One alert per pair and UTC day, counting its hops
+    assert travel['Events'].tolist() == [2, 1, 1]
+    assert travel['Time'].tolist() == [START + pd.Timedelta(offset) for offset in ('20min', '1h', '1D 1h')]
+
+def test_alerts_are_in_time_order_in_the_frame_timezone():
+    events = _hourly(10 * 24) + [('9D', '1.1.1.1', 'FR'), ('8D', HOME_IP, 'DE')]
+    df = _frame(events).sample(frac=1, random_state=0)
+    df['Timestamp'] = df['Timestamp'].dt.tz_convert('America/New_York')
+    alerts = detect_anomalies(df)
+    assert alerts['Time'].is_monotonic_increasing
+    assert str(alerts['Time'].dt.tz) == 'America/New_York'
+    assert alerts['Events'].dtype == np.int64
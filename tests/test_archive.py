@@ -0,0 +1,74 @@
+import zipfile
+import pandas as pd
+import pytest
+from parsers.activity_parser import parse_activity_csv
+from parsers.archive import find_takeout_members, open_takeout_csv, takeout_export_name, takeout_parts
+
+MEMBER = 'Takeout/Access Log Activity/Activities - A list of Google services accessed by.csv'
+
+def _write_zip(path, members):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return str(path)
+
+@pytest.fixture(scope='module')
+def two_part_takeout(activities_csv, devices_csv, tmp_path_factory):
+    """The sample split into takeout-…-001.zip and -002.zip, each part a CSV with its own header.
+
+    Returns (first part, the CSV bytes as one file).
+    """
+    data = open(activities_csv, 'rb').read()
+    header_end = data.index(b'\n') + 1
+    middle = data.index(b'\n', len(data) // 2) + 1
+    directory = tmp_path_factory.mktemp('two_part')
+    first = _write_zip(directory / 'takeout-20250326T151156Z-001.zip', {
+        MEMBER: data[:middle],
+        'Takeout/Access Log Activity/Devices - A list of devices.csv': open(devices_csv, 'rb').read(),
+    })
+    _write_zip(directory / 'takeout-20250326T151156Z-002.zip', {MEMBER: data[:header_end] + data[middle:]})
+    # Another export in the same directory is not a part
+    _write_zip(directory / 'takeout-20250401T000000Z-001.zip', {MEMBER: data[:header_end]})
+    return first, data
+
+def _read(source, kind='activities'):
+    with open_takeout_csv(source, kind) as stream:
+        return stream.read()
+
+def test_parts_read_as_one_csv(two_part_takeout):
+    first, data = two_part_takeout
+    parts = takeout_parts(first)
+    assert [path.rsplit('-', 1)[1] for path in parts] == ['001.zip', '002.zip']
+    # Any part finds the others; the repeated header is skipped
+    assert _read(first) == data
+    assert _read(parts[1]) == data
+    assert _read(parts) == data
+    assert len(find_takeout_members(parts, 'activities')) == 2
+    assert len(find_takeout_members(parts, 'devices')) == 1
+    assert takeout_export_name(parts[1]) == 'takeout-20250326T151156Z'
+
+def test_parts_parse_like_the_single_csv(two_part_takeout, activity_table):
+    df, breakdown = parse_activity_csv(takeout_parts(two_part_takeout[0]), include_ua_fields=True)
+    pd.testing.assert_frame_equal(df, activity_table[0])
+    assert breakdown == activity_table[1]
+
+def test_parts_in_numeric_order(tmp_path):
+    for part in (10, 2, 1):
+        _write_zip(tmp_path / f'takeout-x-{part:03d}.zip', {MEMBER: f'Header\nrow {part}\n'})
+    _write_zip(tmp_path / 'takeout-x-9.zip', {MEMBER: 'Header\nrow 9\n'})
+    parts = takeout_parts(str(tmp_path / 'takeout-x-002.zip'))
+    assert [path.rsplit('-', 1)[1] for path in parts] == ['001.zip', '002.zip', '9.zip', '010.zip']
+    assert _read(parts) == b'Header\nrow 1\nrow 2\nrow 9\nrow 10\n'
+    # A zip that isn't numbered is its own only part
+    single = _write_zip(tmp_path / 'export.zip', {MEMBER: 'Header\n'})
+    assert takeout_parts(single) == [single]
+
+def test_member_without_final_newline(tmp_path):
+    _write_zip(tmp_path / 'takeout-y-001.zip', {MEMBER: 'Header\nrow 1'})
+    _write_zip(tmp_path / 'takeout-y-002.zip', {MEMBER: 'Header\nrow 2'})
+    assert _read(str(tmp_path / 'takeout-y-001.zip')) == b'Header\nrow 1\nrow 2'
+
+def test_missing_member(tmp_path):
+    path = _write_zip(tmp_path / 'empty.zip', {'Takeout/archive_browser.html': ''})
+    with pytest.raises(FileNotFoundError, match="No Activities CSV found under 'Access Log Activity'"):
+        _read(path)
@@ -0,0 +1,106 @@
+import threading
+import pytest
+from gui.background import BackgroundTask
+from parsers import ParseCancelled
+
+class _Root:
+    """Stands in for Tk: after() queues the callback, run() plays the queue once the worker is done."""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, callback):
+        self.pending.append((ms, callback))
+
+    def run(self, task):
+        task._thread.join(timeout=10)
+        assert not task.is_running()
+        polls = 0
+        while self.pending:
+            _, callback = self.pending.pop(0)
+            callback()
+            polls += 1
+        return polls
+
+def _task(work, root=None):
+    outcome = {'done': [], 'error': [], 'progress': []}
+    task = BackgroundTask(
+        root or _Root(), work, outcome['done'].append, outcome['error'].append,
+        outcome['progress'].append, poll_ms=25
+    )
+    return task, outcome
+
+def test_result_and_progress_reach_the_main_thread():
+    root = _Root()
+    def work(progress):
+        progress(1, 4)
+        progress(3, 4)
+        progress(9, 4)
+        progress(5, 0)  # No total, no report
+        return 'table'
+    task, outcome = _task(work, root)
+    task.start()
+    assert root.pending[0][0] == 25
+    # One poll picks up everything: only the latest progress is shown
+    assert root.run(task) == 1
+    assert outcome == {'done': ['table'], 'error': [], 'progress': [1.0]}
+
+def test_polls_until_the_work_ends():
+    root, reported, release = _Root(), threading.Event(), threading.Event()
+    def work(progress):
+        progress(1, 2)
+        reported.set()
+        release.wait(10)
+        return 'table'
+    task, outcome = _task(work, root)
+    task.start()
+    reported.wait(10)
+    # A poll while the work runs reports progress and polls again
+    _, callback = root.pending.pop(0)
+    callback()
+    assert outcome == {'done': [], 'error': [], 'progress': [0.5]}
+    assert len(root.pending) == 1
+    release.set()
+    root.run(task)
+    assert outcome['done'] == ['table'] and not root.pending
+
+def test_errors_reach_on_error():
+    error = ValueError("Error reading activity CSV: bad row")
+    def work(progress):
+        progress(1, 2)
+        raise error
+    task, outcome = _task(work)
+    task.start()
+    task.root.run(task)
+    assert outcome == {'done': [], 'error': [error], 'progress': [0.5]}
+
+def test_cancel_stops_the_work_at_its_next_progress_report():
+    started, reports = threading.Event(), []
+    def work(progress):
+        started.set()
+        while True:
+            progress(len(reports), 10**9)
+            reports.append(None)
+    task, outcome = _task(work)
+    task.start()
+    started.wait(10)
+    task.cancel()
+    task.root.run(task)
+    assert outcome['done'] == []
+    assert len(outcome['error']) == 1 and isinstance(outcome['error'][0], ParseCancelled)
+
+def test_cancel_after_the_work_returned_drops_the_result():
+    root = _Root()
+    task, outcome = _task(lambda progress: 'table', root)
+    task.cancel()
+    task.start()
+    root.run(task)
+    assert outcome['done'] == []
+    assert [type(error) for error in outcome['error']] == [ParseCancelled]
+
+@pytest.mark.parametrize('total', [0, None])
+def test_progress_without_total(total):
+    task, outcome = _task(lambda progress: progress(1, total))
+    task.start()
+    task.root.run(task)
+    assert outcome == {'done': [None], 'error': [], 'progress': []}
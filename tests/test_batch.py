@@ -0,0 +1,70 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+import pandas as pd
+import pytest
+from benchmarks.generate import generate_takeout
+from conftest import ROOT
+
+def _batch(*args):
+    return subprocess.run([sys.executable, '-m', 'analyzer', 'batch', *map(str, args)],
+                          cwd=ROOT, capture_output=True, text=True, timeout=600)
+
+@pytest.fixture(scope='module')
+def batch_run(tmp_path_factory):
+    """`python -m analyzer batch` over a generated zip export and an extracted one."""
+    inputs = tmp_path_factory.mktemp('inputs')
+    generate_takeout(str(inputs / 'zipped'), 3_000, as_zip=True)
+    generate_takeout(str(inputs / 'extracted'), 2_000, seed=1)
+    output = tmp_path_factory.mktemp('output')
+    result = _batch(inputs, '-o', output, '-j', 2, '--diagnostics')
+    return result, output
+
+def test_batch_exit_status_and_summaries(batch_run):
+    result, output = batch_run
+    assert result.returncode == 0, result.stderr
+    assert "Analyzed 2 export(s), 0 failed" in result.stdout
+    with open(output / 'batch_summary.json', encoding='utf-8') as f:
+        summaries = json.load(f)
+    assert [(summary['account'], summary['status'], summary['activities']) for summary in summaries] == [
+        ('extracted', 'ok', 2_000), ('takeout-synthetic-3000', 'ok', 3_000)
+    ]
+    with open(output / 'batch_summary.csv', newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [(row['account'], row['activities']) for row in rows] == [('extracted', '2000'),
+                                                                    ('takeout-synthetic-3000', '3000')]
+
+def test_batch_account_outputs(batch_run):
+    _, output = batch_run
+    account = output / 'takeout-synthetic-3000'
+    with open(account / 'summary.json', encoding='utf-8') as f:
+        summary = json.load(f)
+    assert summary['devices'] > 0 and summary['matched_activities'] > 0
+    for name in ('alerts.csv', 'device_links.csv', 'ip_prefixes.csv', 'device_join.csv',
+                 'activities_by_hour_of_week.csv', 'diagnostics.json'):
+        assert (account / name).is_file(), name
+    # Every count file adds up to the activities
+    assert pd.read_csv(account / 'activities_by_app.csv')['count'].sum() == 3_000
+    assert pd.read_csv(account / 'activities_daily.csv')['count'].sum() == 3_000
+    assert pd.read_csv(account / 'activities_by_hour_of_week.csv', index_col=0).to_numpy().sum() == 3_000
+    assert pd.read_csv(account / 'device_join.csv')['Activities'].sum() == 3_000
+    assert summary['alerts'] == len(pd.read_csv(account / 'alerts.csv'))
+    charts = sorted(name for name in os.listdir(account) if name.endswith('.png'))
+    assert 'activities_by_app.png' in charts and 'activities_by_hour_of_week.png' in charts
+    assert all(os.path.getsize(account / name) > 0 for name in charts)
+    with open(account / 'diagnostics.json', encoding='utf-8') as f:
+        stages = {stage['stage'] for stage in json.load(f)['stages']}
+    assert {'activity cube', 'anomaly detection'} <= stages
+
+def test_batch_failures_set_the_exit_status(tmp_path):
+    bad = tmp_path / 'Activities - broken.csv'
+    bad.write_text('not,a,takeout\n1,2,3\n', encoding='utf-8')
+    result = _batch(bad, '-o', tmp_path / 'output', '--no-charts')
+    assert result.returncode == 1
+    assert "1 failed" in result.stdout
+    with open(tmp_path / 'output' / 'batch_summary.json', encoding='utf-8') as f:
+        assert json.load(f)[0]['status'] == 'error'
+    result = _batch(tmp_path / 'output', '-o', tmp_path / 'nothing')
+    assert result.returncode == 1 and "No Takeout exports found." in result.stdout
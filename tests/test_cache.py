@@ -0,0 +1,96 @@
+import os
+import shutil
+import pandas as pd
+from parsers.activity_parser import parse_activity_csv
+from parsers.cache import ParseCache, cache_key, cached_derive, cached_parse
+from parsers.device_parser import parse_device_csv
+
+def _counting(parser, calls):
+    def parse(source, **kwargs):
+        calls.append(source)
+        return parser(source, **kwargs)
+    parse.__name__ = parser.__name__
+    return parse
+
+def test_hit_returns_the_parsed_frame(activities_csv, activity_table, tmp_path):
+    cache, calls = ParseCache(str(tmp_path)), []
+    parser = _counting(parse_activity_csv, calls)
+    for _ in range(2):
+        df, breakdown = cached_parse(parser, activities_csv, cache=cache, include_ua_fields=True)
+        pd.testing.assert_frame_equal(df, activity_table[0])
+        assert breakdown == activity_table[1]
+    assert len(calls) == 1
+
+def test_devices_round_trip(devices_csv, tmp_path):
+    cache = ParseCache(str(tmp_path))
+    expected = parse_device_csv(devices_csv, include_device_fields=True)
+    cached_parse(parse_device_csv, devices_csv, cache=cache, include_device_fields=True)
+    df, breakdown = cached_parse(parse_device_csv, devices_csv, cache=cache, include_device_fields=True)
+    pd.testing.assert_frame_equal(df, expected[0])
+    assert breakdown == expected[1]
+
+def test_key_follows_file_contents_and_arguments(devices_csv, tmp_path):
+    path = tmp_path / 'Devices.csv'
+    path.write_bytes(open(devices_csv, 'rb').read())
+    key = cache_key('parse_device_csv', str(path))
+    assert cache_key('parse_device_csv', str(path)) == key
+    assert cache_key('parse_device_csv', str(path), include_device_fields=True) != key
+    with open(path, 'ab') as f:
+        f.write(b'\n')
+    assert cache_key('parse_device_csv', str(path)) != key
+
+def test_corrupt_entry_is_a_miss(devices_csv, tmp_path):
+    cache, calls = ParseCache(str(tmp_path)), []
+    parser = _counting(parse_device_csv, calls)
+    cached_parse(parser, devices_csv, cache=cache)
+    key = cache_key('parse_device_csv', devices_csv)
+    os.remove(os.path.join(str(tmp_path), key, 'index.npy'))
+    assert cache.load(key) is None
+    cached_parse(parser, devices_csv, cache=cache)
+    assert len(calls) == 2
+
+def test_least_recently_used_entries_are_evicted(devices_csv, tmp_path):
+    df, breakdown = parse_device_csv(devices_csv)
+    cache = ParseCache(str(tmp_path))
+    for key in ('a', 'b', 'c'):
+        cache.store(key, df, breakdown)
+    size = lambda key: sum(entry.stat().st_size for entry in os.scandir(tmp_path / key))
+    os.utime(tmp_path / 'a' / 'meta.json', (0, 0))
+    os.utime(tmp_path / 'b' / 'meta.json', (1, 1))
+    cache.max_bytes = size('b') + size('c')
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == ['b', 'c']
+
+def test_derived_results_are_cached(devices_csv, tmp_path):
+    cache, calls = ParseCache(str(tmp_path)), []
+    df, _ = parse_device_csv(devices_csv)
+    def compute():
+        calls.append(None)
+        return {'head': df.head(3), 'empty': df.iloc[:0]}, {'rows': len(df)}
+    key = cache_key('parse_device_csv', devices_csv)
+    for _ in range(2):
+        frames, meta = cached_derive(compute, key, 'head', cache=cache)
+        assert list(frames) == ['head', 'empty'] and meta == {'rows': len(df)}
+        pd.testing.assert_frame_equal(frames['head'], df.head(3))
+        assert len(frames['empty']) == 0
+    assert len(calls) == 1
+
+    # Another name or another input file is another result
+    cached_derive(compute, key, 'tail', cache=cache)
+    cached_derive(compute, key, 'head', [devices_csv], cache=cache)
+    cached_derive(compute, key, 'head', [None, devices_csv], cache=cache)
+    assert len(calls) == 4
+    cached_derive(compute, key, 'head', [devices_csv, None], cache=cache)
+    assert len(calls) == 5
+
+def test_derived_result_missing_a_frame_is_a_miss(devices_csv, tmp_path):
+    cache, calls = ParseCache(str(tmp_path)), []
+    df, _ = parse_device_csv(devices_csv)
+    def compute():
+        calls.append(None)
+        return {'a': df, 'b': df}, None
+    cached_derive(compute, 'parse', 'pair', cache=cache)
+    entries = [entry for entry in os.listdir(tmp_path) if entry.endswith('-1')]
+    shutil.rmtree(tmp_path / entries[0])
+    cached_derive(compute, 'parse', 'pair', cache=cache)
+    assert len(calls) == 2
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+from analysis.filtering import FrameIndex
+from baseline import (
+    day_label_dict, reference_counts, reference_daily_counts, reference_day_labels, reference_hour_of_week
+)
+from benchmarks.generate import generate_takeout
+from parsers.activity_parser import parse_activity_csv
+from parsers.cache import ParseCache
+from parsers.cube import ActivityCube
+
+START, END = '2025-03-05', '2025-03-19 12:00'
+SELECTIONS = {'App Used': ['Maps', 'Gmail'], 'Device Type': ['MOBILE']}
+
+@pytest.fixture(scope='module')
+def generated_table(tmp_path_factory):
+    """A synthetic export with countries, regions and cities filled in on part of the rows."""
+    paths = generate_takeout(str(tmp_path_factory.mktemp('generated')), 30_000)
+    return parse_activity_csv(paths['activities'], include_ua_fields=True)[0]
+
+@pytest.fixture(scope='module', params=['sample', 'generated'])
+def table(request, activity_table, generated_table):
+    return activity_table[0] if request.param == 'sample' else generated_table
+
+def _rows(df, start=None, end=None, selections=None):
+    """The rows a slice or filter should keep, by plain boolean masks."""
+    keep = pd.Series(True, index=df.index)
+    tz = df['Timestamp'].dt.tz
+    if start is not None:
+        keep &= df['Timestamp'] >= pd.Timestamp(start).tz_localize(tz)
+    if end is not None:
+        keep &= df['Timestamp'] < pd.Timestamp(end).tz_localize(tz)
+    for column, values in (selections or {}).items():
+        keep &= df[column].astype(object).isin(values)
+    return df[keep]
+
+def _assert_matches(view, df):
+    assert len(view) == len(df)
+    for column in view.dimensions:
+        assert sorted(view.counts(column).items()) == sorted(reference_counts(df[column])), column
+    assert list(view.app_counts_series().items()) == reference_counts(df['App Used'])
+    assert view.unique_ips() == df['IP Address'].nunique()
+    daily = view.daily_counts()
+    expected = reference_daily_counts(df)
+    assert daily.index.equals(expected.index)
+    assert daily.tolist() == expected.tolist()
+    np.testing.assert_array_equal(view.hour_of_week_counts(), reference_hour_of_week(df))
+    for column in ('Device Type', 'App Used', 'Location'):
+        assert day_label_dict(view.day_label_counts(column)) == reference_day_labels(df, column)
+    earliest, latest = view.time_bounds()
+    if len(df):
+        assert (earliest, latest) == (df['Timestamp'].min(), df['Timestamp'].max())
+    else:
+        assert pd.isna(earliest) and pd.isna(latest)
+
+def test_cube_matches_the_table(table):
+    _assert_matches(ActivityCube(table), table)
+
+def test_breakdown_matches_the_parser(activity_table):
+    assert ActivityCube(activity_table[0]).breakdown() == activity_table[1]
+
+def test_cells_do_not_grow_with_addresses(activity_table):
+    df = activity_table[0]
+    unique = df.assign(**{'IP Address': pd.Categorical([f'address {i}' for i in range(len(df))])})
+    assert len(ActivityCube(unique).cell_counts) == len(ActivityCube(df).cell_counts)
+    assert ActivityCube(unique).unique_ips() == len(df)
+
+def test_frames_round_trip(table, tmp_path):
+    cube = ActivityCube(table)
+    frames, meta = cube.to_frames()
+    cache = ParseCache(str(tmp_path))
+    for name, frame in frames.items():
+        cache.store(name, frame, meta)
+    restored = ActivityCube.from_frames({name: cache.load(name)[0] for name in frames}, cache.load('cells')[1])
+    assert restored.dimensions == cube.dimensions and restored.tz == cube.tz
+    _assert_matches(restored, table)
+    _assert_matches(restored.slice(START, END, SELECTIONS), _rows(table, START, END, SELECTIONS))
+
+def test_rollup_matches_groupby(table):
+    columns = ['App Used', 'Device Type', 'Location']
+    rollup = ActivityCube(table).rollup(columns)
+    expected = table[columns].astype(object).groupby(columns).size()
+    assert dict(rollup.items()) == dict(expected.items())
+    assert rollup.is_monotonic_decreasing
+
+def test_slices_match_masks(table):
+    cube = ActivityCube(table)
+    for start, end, selections in ((START, None, None), (None, END, None), (None, None, SELECTIONS),
+                                   (START, END, SELECTIONS), ('2030-01-01', None, None)):
+        _assert_matches(cube.slice(start, end, selections), _rows(table, start, end, selections))
+    nested = cube.slice(START, None).slice(None, END, SELECTIONS)
+    _assert_matches(nested, _rows(table, START, END, SELECTIONS))
+
+def test_queries_are_memoized(activity_table):
+    cube = ActivityCube(activity_table[0], memo_size=4)
+    view = cube.slice(START, END, SELECTIONS)
+    assert cube.slice(START, END, SELECTIONS) is view
+    assert view.counts('OS') is view.counts('OS')
+    for column in cube.dimensions:
+        view.counts(column)
+    assert len(cube.memo) == 4
+
+def test_frame_index_filter_matches_masks(table):
+    index = FrameIndex(table)
+    for start, end, selections in ((START, END, None), (None, None, SELECTIONS), (START, END, SELECTIONS)):
+        view = index.filter(start, end, selections)
+        pd.testing.assert_frame_equal(view.frame(), _rows(table, start, end, selections))
+    # Rows out of time order take the mask path
+    shuffled = FrameIndex(table.sample(frac=1, random_state=0))
+    filtered = shuffled.filter(START, END, SELECTIONS).frame()
+    pd.testing.assert_frame_equal(filtered.sort_index(), _rows(table, START, END, SELECTIONS))
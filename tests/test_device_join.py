@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+from analysis.device_join import UNMATCHED, device_join_table, join_devices, normalize_join_field
+
+def _devices(rows):
+    """Device list frame of (Device Type, Marketing Name, OS, OS Version, last seen) rows."""
+    return pd.DataFrame({
+        'Device Type': [row[0] for row in rows],
+        'Marketing Name': [row[1] for row in rows],
+        'Device Model': 'Unknown',
+        'OS': [row[2] for row in rows],
+        'OS Version': [row[3] for row in rows],
+        'Timestamp': pd.to_datetime([row[4] for row in rows]),
+    })
+
+def _activities(rows):
+    """Activity frame of (Device Type, OS, OS Version, time) rows, as the UA decode writes them."""
+    return pd.DataFrame({
+        'Timestamp': pd.to_datetime([row[3] for row in rows], utc=True),
+        'Device Type': pd.Categorical([row[0] for row in rows]),
+        'OS': pd.Categorical([row[1] for row in rows]),
+        'OS Version': pd.Categorical([row[2] for row in rows]),
+    })
+
+DEVICES = _devices([
+    ('PHONE', 'Pixel 8', 'Android', '14', '2025-03-01 10:00:00'),
+    ('PHONE', 'Pixel 6', 'Android', '13', '2025-03-02 10:00:00'),
+    ('PC', 'Surface', 'Windows', '10', '2025-03-03 10:00:00'),
+    ('PC', 'MacBook', 'Mac', '14.2', '2025-03-04 10:00:00'),
+    ('TV', 'Frame', 'Tizen', '7', '2025-03-05 10:00:00'),
+])
+
+def test_normalize_join_field():
+    assert normalize_join_field('OS', 'MAC_OS') == normalize_join_field('OS', 'Mac') == 'macos'
+    assert normalize_join_field('OS', 'IOS_OS') == normalize_join_field('OS', 'iOS') == 'ios'
+    assert normalize_join_field('OS Version', '14.1.2') == '14'
+    assert normalize_join_field('OS Version', 'beta') == ''
+    assert normalize_join_field('Device Type', 'UNKNOWN') == normalize_join_field('Device Type', float('nan')) == ''
+
+def test_most_specific_level_wins():
+    activities = _activities([
+        ('PHONE', 'ANDROID_OS', '14.1', '2025-03-01 09:00:00'),    # Device Type, OS and version
+        ('PHONE', 'ANDROID_OS', '12', '2025-03-01 09:30:00'),      # No device runs 12: both phones
+        ('PHONE', 'ANDROID_OS', 'Unknown', '2025-03-01 09:40:00'), # Unknown version: both phones
+        ('TABLET', 'WINDOWS_OS', '11', '2025-03-01 10:00:00'),     # Only the OS is shared
+        ('PC', 'MAC_OS', '10', '2025-03-01 11:00:00'),             # Device Type and OS
+        ('PC', 'LINUX_OS', '6', '2025-03-01 12:00:00'),            # Nothing matches
+        ('Unknown', 'Unknown', 'Unknown', '2025-03-01 13:00:00'),
+    ])
+    join = join_devices(activities, DEVICES)
+    assert join.matches.tolist() == [
+        'Pixel 8 (Android 14)',
+        'Pixel 8 (Android 14) / Pixel 6 (Android 13)',
+        'Pixel 8 (Android 14) / Pixel 6 (Android 13)',
+        'Surface (Windows 10)',
+        'MacBook (Mac 14.2)',
+        UNMATCHED,
+        UNMATCHED,
+    ]
+    assert join.levels.tolist() == [0, 1, 1, 2, 1, -1, -1]
+    assert join.matches.cat.categories[-1] == UNMATCHED
+    # members are the device list rows of each category
+    groups = dict(zip(join.matches.cat.categories, join.members))
+    assert groups == {
+        'Pixel 8 (Android 14)': (0,), 'Pixel 8 (Android 14) / Pixel 6 (Android 13)': (0, 1),
+        'Surface (Windows 10)': (2,), 'MacBook (Mac 14.2)': (3,), 'Frame (Tizen 7)': (4,), UNMATCHED: (),
+    }
+
+def test_duplicate_device_names():
+    devices = _devices([
+        ('PHONE', 'Pixel 8', 'Android', '14', '2025-03-01 10:00:00'),
+        ('PHONE', 'Pixel 8', 'Android', '14', '2025-03-03 10:00:00'),  # Same key: one group
+        ('TABLET', 'Pixel 8', 'Android', '14', '2025-03-02 10:00:00'),  # Same label, another key
+    ])
+    activities = _activities([
+        ('PHONE', 'ANDROID_OS', '14', '2025-03-01 09:00:00'),
+        ('TABLET', 'ANDROID_OS', '14', '2025-03-01 10:00:00'),
+    ])
+    join = join_devices(activities, devices)
+    assert join.matches.tolist() == ['Pixel 8 (Android 14) ×2', 'Pixel 8 (Android 14)']
+    assert dict(zip(join.matches.cat.categories, join.members)) == {
+        'Pixel 8 (Android 14) ×2': (0, 1), 'Pixel 8 (Android 14)': (2,), UNMATCHED: (),
+    }
+
+    devices = devices.iloc[[0, 2]].reset_index(drop=True)
+    join = join_devices(activities, devices)
+    assert join.matches.tolist() == ['Pixel 8 (Android 14)', 'Pixel 8 (Android 14) #2']
+
+    # Any number of repeats gets distinct names
+    devices = _devices([(device_type, 'Pixel 8', 'Android', '14', '2025-03-01 10:00:00')
+                        for device_type in ('PHONE', 'TABLET', 'TV', 'WATCH')])
+    join = join_devices(activities, devices)
+    assert join.matches.cat.categories.tolist() == [
+        'Pixel 8 (Android 14)', 'Pixel 8 (Android 14) #2', 'Pixel 8 (Android 14) #3', 'Pixel 8 (Android 14) #4',
+        UNMATCHED,
+    ]
+
+def test_join_table():
+    activities = _activities([
+        ('PHONE', 'ANDROID_OS', '14', '2025-03-01 09:00:00'),
+        ('PHONE', 'ANDROID_OS', '14', '2025-03-01 12:00:00'),
+        ('PHONE', 'ANDROID_OS', '12', '2025-03-02 08:00:00'),
+        ('PC', 'LINUX_OS', '6', '2025-03-01 12:00:00'),
+    ])
+    join = join_devices(activities, DEVICES)
+    table = device_join_table(activities, DEVICES, join).set_index('Device')
+    # Busiest first; devices without activity stay listed
+    assert table.index.tolist() == [
+        'Pixel 8 (Android 14)', 'Pixel 8 (Android 14) / Pixel 6 (Android 13)', UNMATCHED,
+        'Surface (Windows 10)', 'MacBook (Mac 14.2)', 'Frame (Tizen 7)',
+    ]
+    assert table['Activities'].tolist() == [2, 1, 1, 0, 0, 0]
+    assert table['Devices'].tolist() == [1, 2, 0, 1, 1, 1]
+    pixel = table.loc['Pixel 8 (Android 14)']
+    assert pixel['First Activity'] == pd.Timestamp('2025-03-01 09:00:00', tz='UTC')
+    assert pixel['Last Activity'] == pd.Timestamp('2025-03-01 12:00:00', tz='UTC')
+    assert pixel['Device Last Seen'] == pd.Timestamp('2025-03-01 10:00:00', tz='UTC')
+    assert pixel['Difference'] == pd.Timedelta('2h')
+    # A group was last seen when the latest of its devices was
+    assert table.loc['Pixel 8 (Android 14) / Pixel 6 (Android 13)', 'Device Last Seen'] == \
+        pd.Timestamp('2025-03-02 10:00:00', tz='UTC')
+    assert pd.isna(table.loc[UNMATCHED, 'Device Last Seen'])
+    idle = table.loc['Frame (Tizen 7)']
+    assert pd.isna(idle['First Activity']) and pd.isna(idle['Last Activity']) and pd.isna(idle['Difference'])
+    assert idle['Device Last Seen'] == pd.Timestamp('2025-03-05 10:00:00', tz='UTC')
+
+def test_devices_without_activity():
+    activities = _activities([('PHONE', 'ANDROID_OS', '14', '2025-03-01 09:00:00')])
+    join = join_devices(activities, DEVICES)
+    assert join.matches.tolist() == ['Pixel 8 (Android 14)']
+    assert dict(zip(join.matches.cat.categories, join.members)) == {
+        'Pixel 8 (Android 14)': (0,), 'Pixel 6 (Android 13)': (1,), 'Surface (Windows 10)': (2,),
+        'MacBook (Mac 14.2)': (3,), 'Frame (Tizen 7)': (4,), UNMATCHED: (),
+    }
+
+    # Idle devices sharing a full key are one group; unknown keys stay apart
+    devices = _devices([
+        ('PHONE', 'Pixel 8', 'Android', '14', '2025-03-01 10:00:00'),
+        ('PHONE', 'Pixel 8', 'Android', '14', '2025-03-02 10:00:00'),
+        ('Unknown', 'Old phone', 'Unknown', '', '2025-03-03 10:00:00'),
+        ('Unknown', 'Old phone', 'Unknown', '', '2025-03-04 10:00:00'),
+    ])
+    empty = activities.iloc[:0]
+    join = join_devices(empty, devices)
+    assert len(join.matches) == 0 and len(join.levels) == 0
+    table = device_join_table(empty, devices, join)
+    assert table['Device'].tolist() == ['Pixel 8 (Android 14) ×2', 'Old phone', 'Old phone #2']
+    assert table['Activities'].tolist() == [0, 0, 0]
+    assert table['Devices'].tolist() == [2, 1, 1]
+
+def test_activities_without_ua_fields():
+    activities = _activities([('PHONE', 'ANDROID_OS', '14', '2025-03-01 09:00:00')])[['Timestamp', 'OS']]
+    join = join_devices(activities, DEVICES)
+    # Only the OS is known, and three devices don't run Android
+    assert join.matches.tolist() == ['Pixel 8 (Android 14) / Pixel 6 (Android 13)']
+    assert join.levels.tolist() == [2]
+    assert np.asarray(join.matches.cat.codes).tolist() == [0]
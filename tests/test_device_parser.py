@@ -0,0 +1,36 @@
+import pandas as pd
+from baseline import assert_same_table, baseline_parse_device_csv
+from parsers.device_parser import DEVICE_FIELDS, parse_device_csv
+
+DEVICE_HEADER = ('Device Type,Brand Name,Marketing Name,OS,OS Version,Device Model,User Given Name,'
+                 'Device Last Location,Gaia ID\n')
+
+def test_matches_baseline_parser(devices_csv):
+    reference, reference_breakdown = baseline_parse_device_csv(devices_csv)
+    df, breakdown = parse_device_csv(devices_csv)
+    assert_same_table(df, reference)
+    assert breakdown == reference_breakdown
+
+def test_zip_matches_csv(sample_zip, devices_csv):
+    df, breakdown = parse_device_csv(sample_zip, include_device_fields=True)
+    expected, expected_breakdown = parse_device_csv(devices_csv, include_device_fields=True)
+    pd.testing.assert_frame_equal(df, expected)
+    assert breakdown == expected_breakdown
+
+def test_location_cells_match_baseline(tmp_path):
+    # Either line missing, lines swapped, blank and UNKNOWN fields, a cell without a time
+    rows = [
+        'MOBILE,Apple,iPhone,iOS,18.3.2,iPhone15,Phone,"Country ISO: US\nLast Activity Time: 2025-03-24 02:38:54 UTC",1',
+        'PC,,,Windows,10.0,,,"Last Activity Time: 2025-03-21 15:55:54 UTC\nCountry ISO: DE",1',
+        ' UNKNOWN ,,,,,,,"Last Activity Time: 2025-03-20 10:00:00 UTC",1',
+        ',,,,,,,"Country ISO: FR",1',
+        'TABLET,Apple,iPad,iOS,18.3.2,iPad13,,,1',
+    ]
+    path = tmp_path / 'Devices.csv'
+    path.write_text(DEVICE_HEADER + '\n'.join(rows) + '\n', encoding='utf-8')
+    reference, reference_breakdown = baseline_parse_device_csv(path)
+    df, breakdown = parse_device_csv(path, include_device_fields=True)
+    assert_same_table(df, reference)
+    assert breakdown == reference_breakdown
+    assert df['OS'].astype(object).tolist() == ['iOS', 'Windows', 'Unknown']
+    assert all(isinstance(df[field].dtype, pd.CategoricalDtype) for field in DEVICE_FIELDS)
@@ -0,0 +1,115 @@
+import base64
+import io
+import sys
+import pandas as pd
+import pytest
+from matplotlib.figure import Figure
+from utils.export import export_analysis, export_csv, export_html_report, export_jsonl, export_parquet
+
+START, END = '2025-03-10', '2025-03-20'
+
+@pytest.fixture(scope='module')
+def table(activity_table):
+    # Every 150th row, so the rows span weeks
+    return activity_table[0].iloc[::150].head(900)
+
+def _between(df, start, end):
+    tz = df['Timestamp'].dt.tz
+    return df[(df['Timestamp'] >= pd.Timestamp(start).tz_localize(tz))
+              & (df['Timestamp'] < pd.Timestamp(end).tz_localize(tz))]
+
+def _read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+def test_csv_writes_the_header_once(table, tmp_path):
+    path = tmp_path / 'rows.csv'
+    # Chunks that don't divide the rows evenly
+    assert export_csv(table, path, chunksize=97) == len(table)
+    assert _read(path) == table.to_csv(index=False)
+    assert pd.read_csv(path, keep_default_na=False)['IP Address'].tolist() == table['IP Address'].tolist()
+
+def test_csv_time_range(table, tmp_path):
+    path = tmp_path / 'range.csv'
+    expected = _between(table, START, END)
+    assert 0 < len(expected) < len(table)
+    assert export_csv(table, path, START, END, chunksize=97) == len(expected)
+    assert _read(path) == expected.to_csv(index=False)
+    # Nothing in range, or nothing at all, still writes the header
+    for df, start in ((table, '2030-01-01'), (table.iloc[:0], None)):
+        assert export_csv(df, path, start, chunksize=97) == 0
+        assert _read(path) == table.iloc[:0].to_csv(index=False)
+
+def test_jsonl_round_trip(table, tmp_path):
+    path = tmp_path / 'rows.jsonl'
+    assert export_jsonl(table, path, chunksize=97) == len(table)
+    assert _read(path) == table.to_json(orient='records', lines=True, date_format='iso')
+    read = pd.read_json(path, lines=True)
+    assert len(read) == len(table)
+    assert pd.to_datetime(read['Timestamp']).tolist() == table['Timestamp'].tolist()
+    expected = _between(table, START, END)
+    assert export_jsonl(table, path, START, END, chunksize=97) == len(expected)
+    assert len(_read(path).splitlines()) == len(expected)
+
+def test_progress_reaches_the_total(table, tmp_path):
+    calls = []
+    export_jsonl(table, tmp_path / 'rows.jsonl', chunksize=400, progress=lambda done, total: calls.append(done))
+    assert calls == [400, 800, 900]
+
+def test_parquet_round_trip(table, tmp_path):
+    pytest.importorskip('pyarrow')
+    path = tmp_path / 'rows.parquet'
+    assert export_parquet(table, path, chunksize=97) == len(table)
+    read = pd.read_parquet(path)
+    pd.testing.assert_frame_equal(read, table.reset_index(drop=True), check_dtype=False, check_categorical=False)
+    expected = _between(table, START, END)
+    assert export_parquet(table, path, START, END, chunksize=97) == len(expected)
+    assert len(pd.read_parquet(path)) == len(expected)
+
+def test_parquet_schema_is_stable_across_chunks(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    pa = pytest.importorskip('pyarrow')
+    # The first chunk has no value to type 'Note' by
+    df = pd.DataFrame({
+        'Timestamp': pd.date_range('2025-03-01', periods=6, freq='h', tz='UTC'),
+        'Note': pd.Series([None, None, None, 'a', None, 'b'], dtype=object),
+    })
+    path = tmp_path / 'notes.parquet'
+    assert export_parquet(df, path, chunksize=3) == 6
+    parquet = pq.ParquetFile(path)
+    assert parquet.num_row_groups == 2
+    assert parquet.schema_arrow.field('Note').type == pa.string()
+    notes = pd.read_parquet(path)['Note']
+    assert notes.isna().tolist() == [True, True, True, False, True, False]
+    assert notes.dropna().tolist() == ['a', 'b']
+    # A categorical without categories (a column blank throughout)
+    blank = df.assign(Note=pd.Categorical([None] * 6, categories=pd.Index([], dtype=object)))
+    assert export_parquet(blank, path, chunksize=3) == 6
+    assert pq.ParquetFile(path).schema_arrow.field('Note').type.value_type == pa.string()
+    assert pd.read_parquet(path)['Note'].isna().all()
+
+def test_parquet_needs_pyarrow(table, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    with pytest.raises(ImportError, match='requires pyarrow'):
+        export_parquet(table, tmp_path / 'rows.parquet')
+
+def test_html_report(tmp_path):
+    fig = Figure(figsize=(2, 2))
+    fig.add_subplot().plot([0, 1], [1, 0])
+    path = tmp_path / 'report.html'
+    assert export_analysis(str(path), summary="• Apps <Gmail> & Maps", figures={'Line "chart"': fig}) == 0
+    document = _read(path)
+    assert '<pre>• Apps &lt;Gmail&gt; &amp; Maps</pre>' in document
+    assert 'alt="Line &quot;chart&quot;"' in document
+    image = document.split('base64,', 1)[1].split('"', 1)[0]
+    assert base64.b64decode(image).startswith(b'\x89PNG')
+    export_html_report(path, "")
+    assert '<img' not in _read(path)
+
+def test_export_by_extension(table, tmp_path):
+    assert export_analysis(str(tmp_path / 'rows.CSV'), table, chunksize=97) == len(table)
+    assert export_analysis(str(tmp_path / 'rows.jsonl'), table, start=START, end=END) == len(_between(table, START, END))
+    with pytest.raises(ValueError, match='Unsupported export format: rows.xlsx'):
+        export_analysis(str(tmp_path / 'rows.xlsx'), table)
+    with pytest.raises(ValueError, match='No table rows'):
+        export_analysis(str(tmp_path / 'rows.csv'), None)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+from baseline import (
+    day_label_dict, reference_counts, reference_daily_counts, reference_day_labels, reference_hour_of_week
+)
+from parsers.history import HistoryStore
+
+@pytest.fixture(scope='module')
+def store(activities_csv):
+    with HistoryStore(':memory:') as store:
+        store.import_activities(activities_csv, chunksize=40_000)
+        yield store
+
+def test_import_keeps_every_row_once(store, activities_csv, activity_table):
+    # Repeated events (same second, IP, user agent and product) are all kept
+    assert store.count() == len(activity_table[0])
+    assert store.import_activities(activities_csv) == (len(activity_table[0]), 0)
+    assert store.count() == len(activity_table[0])
+
+def test_overlapping_exports_are_deduplicated(raw_activities, activity_table, tmp_path):
+    # Two exports sharing the middle third of the rows
+    third = len(raw_activities) // 3
+    paths = []
+    for name, rows in (('newer.csv', raw_activities.iloc[:2 * third]), ('older.csv', raw_activities.iloc[third:])):
+        paths.append(tmp_path / name)
+        rows.to_csv(paths[-1], index=False)
+    with HistoryStore(':memory:') as store:
+        read, added = store.import_activities(str(paths[0]), chunksize=30_000)
+        assert read == added == 2 * third
+        read, added = store.import_activities(str(paths[1]), chunksize=30_000)
+        assert (read, added) == (len(raw_activities) - third, len(raw_activities) - 2 * third)
+        assert store.count() == len(activity_table[0])
+
+def test_load_matches_the_parsed_table(store, activity_table):
+    df = activity_table[0]
+    loaded = store.load_activities(include_ua_fields=True)
+    expected = df.sort_values('Timestamp', ascending=False, kind='stable')
+    assert (loaded['Timestamp'].to_numpy() == expected['Timestamp'].to_numpy()).all()
+    # Rows with the same timestamp can come back in any order
+    columns = ['Timestamp', 'IP Address', 'Device Type', 'Location', 'App Used', 'OS', 'Client App']
+    as_rows = lambda frame: sorted(map(tuple, frame[columns].astype(str).to_numpy()))
+    assert as_rows(loaded) == as_rows(expected)
+    assert loaded['Timestamp'].dtype == df['Timestamp'].dtype
+    for column in columns[1:]:
+        assert isinstance(loaded[column].dtype, pd.CategoricalDtype), column
+        assert loaded[column].cat.categories.is_monotonic_increasing
+
+def test_load_in_small_chunks(store):
+    loaded = store.load_activities(include_ua_fields=True)
+    pd.testing.assert_frame_equal(store.load_activities(include_ua_fields=True, chunksize=7_000), loaded)
+
+def test_load_of_an_empty_range(store, activity_table):
+    empty = store.load_activities('2000-01-01', '2000-01-02', include_ua_fields=True)
+    assert not len(empty)
+    assert list(empty.columns) == list(activity_table[0].columns[:len(empty.columns)])
+    assert isinstance(empty['IP Address'].dtype, pd.CategoricalDtype)
+
+def test_view_aggregates_match_the_table(store, activity_table):
+    df = activity_table[0]
+    view = store.view()
+    assert sorted(view.app_counts_series().items()) == sorted(reference_counts(df['App Used']))
+    assert sorted(view.device_counts_series().items()) == sorted(reference_counts(df['Device Type']))
+    daily = view.daily_counts()
+    expected = reference_daily_counts(df)
+    assert daily.index.equals(expected.index)
+    assert daily.tolist() == expected.tolist()
+    np.testing.assert_array_equal(view.hour_of_week_counts(), reference_hour_of_week(df))
+    for column in ('Device Type', 'App Used'):
+        assert day_label_dict(view.day_label_counts(column)) == reference_day_labels(df, column)
+    assert sorted(view.breakdown().splitlines()) == sorted(activity_table[1].splitlines())
+
+def test_view_of_a_time_range(store, activity_table):
+    df = activity_table[0]
+    start, end = pd.Timestamp('2025-03-10', tz='UTC'), pd.Timestamp('2025-03-17', tz='UTC')
+    rows = df[(df['Timestamp'] >= start) & (df['Timestamp'] < end)]
+    assert store.count(start, end) == len(rows)
+    view = store.view(start, end)
+    assert sorted(view.app_counts_series().items()) == sorted(reference_counts(rows['App Used']))
+    assert view.daily_counts().tolist() == reference_daily_counts(rows).tolist()
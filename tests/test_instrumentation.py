@@ -0,0 +1,121 @@
+import json
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytest
+import utils.instrumentation
+from utils.instrumentation import (
+    INSTRUMENTATION, Instrumentation, diagnostics_path, frame_memory_bytes, instrumented, peak_rss_bytes
+)
+
+def test_nested_spans():
+    recorder = Instrumentation(enabled=True)
+    with recorder.span('parse', rows=1_000) as outer:
+        time.sleep(0.02)
+        with recorder.span('read chunks') as inner:
+            time.sleep(0.01)
+            inner.rows = 500
+        outer.frame = pd.DataFrame({'x': np.zeros(1 << 17)})
+    inner_record, outer_record = recorder.records()
+    # Inner stages finish first; depth follows the nesting
+    assert (inner_record['stage'], inner_record['depth']) == ('read chunks', 1)
+    assert (outer_record['stage'], outer_record['depth']) == ('parse', 0)
+    assert inner_record['seconds'] >= 0.01
+    assert outer_record['seconds'] >= inner_record['seconds'] + 0.02
+    assert inner_record['rows'] == 500
+    assert inner_record['rows_per_sec'] == pytest.approx(500 / inner_record['seconds'], rel=1e-3)
+    assert outer_record['frame_mb'] == 1.0 and inner_record['frame_mb'] is None
+
+def test_errors_are_recorded_and_raised():
+    recorder = Instrumentation(enabled=True)
+    with pytest.raises(ValueError):
+        with recorder.span('parse'):
+            raise ValueError('bad row')
+    record, = recorder.records()
+    assert record['error'] == 'ValueError' and record['rows_per_sec'] is None
+    # The depth is restored after a failed stage
+    with recorder.span('next'):
+        pass
+    assert recorder.records()[-1]['depth'] == 0
+
+def test_peak_rss_fields(monkeypatch):
+    readings = iter([100 * 2**20, 300 * 2**20, None, None])
+    monkeypatch.setattr(utils.instrumentation, 'peak_rss_bytes', lambda: next(readings))
+    recorder = Instrumentation(enabled=True)
+    for name in ('allocate', 'unknown'):
+        with recorder.span(name):
+            pass
+    allocate, unknown = recorder.records()
+    assert (allocate['peak_rss_mb'], allocate['peak_rss_growth_mb']) == (300.0, 200.0)
+    # Where peak RSS can't be read (Windows without psutil) the fields are empty
+    assert (unknown['peak_rss_mb'], unknown['peak_rss_growth_mb']) == (None, None)
+
+@pytest.mark.skipif(peak_rss_bytes() is None, reason="peak RSS can't be read here")
+def test_peak_rss_of_this_process():
+    recorder = Instrumentation(enabled=True)
+    with recorder.span('allocate'):
+        block = np.ones(64 << 17)  # 64 MB, touched
+    record, = recorder.records()
+    assert record['peak_rss_mb'] >= block.nbytes / 2**20
+    assert 0 <= record['peak_rss_growth_mb'] <= record['peak_rss_mb']
+    assert record['peak_rss_mb'] <= round(peak_rss_bytes() / 2**20, 1)
+
+def test_threads_nest_separately():
+    recorder = Instrumentation(enabled=True)
+    def work():
+        with recorder.span('worker stage'):
+            pass
+    with recorder.span('main stage'):
+        thread = threading.Thread(target=work, name='worker')
+        thread.start()
+        thread.join()
+    worker, main = recorder.records()
+    assert (worker['thread'], worker['depth']) == ('worker', 0)
+    assert (main['thread'], main['depth']) == (threading.current_thread().name, 0)
+
+def test_disabled_recorder_records_nothing():
+    recorder = Instrumentation()
+    with recorder.span('parse', rows=10) as stage:
+        stage.rows = 20
+        stage.frame = pd.DataFrame({'x': [1]})
+        assert stage.rows is None and stage.frame is None
+    assert recorder.records() == []
+    assert recorder.report() == "Diagnostics are off."
+    recorder.enabled = True
+    assert recorder.report() == "No stages recorded."
+
+def test_json_output_and_report(tmp_path):
+    recorder = Instrumentation(enabled=True)
+    with recorder.span('parse', rows=1_234):
+        with recorder.span('read chunks', rows=1_234):
+            pass
+    path = tmp_path / 'diagnostics.json'
+    recorder.write_json(path)
+    with open(path, encoding='utf-8') as f:
+        written = json.load(f)
+    assert written == {'pid': os.getpid(), 'stages': recorder.records()}
+    assert set(written['stages'][0]) == {
+        'stage', 'depth', 'thread', 'seconds', 'rows', 'rows_per_sec', 'peak_rss_mb', 'peak_rss_growth_mb',
+        'frame_mb', 'error'
+    }
+    header, inner, outer = recorder.report().splitlines()
+    assert header.startswith('Stage') and 'Peak RSS (MB)' in header
+    assert inner.startswith('  read chunks') and outer.startswith('parse ') and '1,234' in outer
+    recorder.reset()
+    assert recorder.records() == []
+    assert diagnostics_path(os.path.join('out', 'rows.parquet')) == os.path.join('out', 'rows.diagnostics.json')
+
+def test_instrumented_decorator(monkeypatch):
+    monkeypatch.setattr(INSTRUMENTATION, 'enabled', True)
+    monkeypatch.setattr(INSTRUMENTATION, '_records', [])
+    @instrumented('double')
+    def double(x):
+        return 2 * x
+    assert double(21) == 42 and double.__name__ == 'double'
+    assert [record['stage'] for record in INSTRUMENTATION.records()] == ['double']
+
+def test_frame_memory_counts_strings():
+    strings = pd.DataFrame({'x': pd.Series(['a' * 1_000] * 100, dtype=object)})
+    assert frame_memory_bytes(strings) > 100_000
@@ -0,0 +1,97 @@
+import ipaddress
+from functools import lru_cache
+import pandas as pd
+from analysis.ip import (
+    FAMILY_INVALID, format_ip, load_range_table, lookup_networks, network_counts,
+    parse_ips, prefix_counts
+)
+
+EDGE_CASES = ['::ffff:192.0.2.7', ' 10.0.0.1 ', 'not an ip', '', '2001:db8::1', '255.255.255.255', '::']
+
+@lru_cache(maxsize=None)
+def _address(text):
+    try:
+        address = ipaddress.ip_address(str(text).strip())
+    except ValueError:
+        return None
+    return address.ipv4_mapped or address if address.version == 6 else address
+
+def _ips(activity_table):
+    return pd.Series(list(activity_table[0]['IP Address'].astype(object)) + EDGE_CASES + [None])
+
+def test_parse_matches_ipaddress(activity_table):
+    values = _ips(activity_table)
+    ips = parse_ips(values)
+    for i, text in enumerate(values):
+        address = _address(text)
+        if address is None:
+            assert ips.family[i] == FAMILY_INVALID
+        else:
+            assert format_ip(ips.family[i], ips.v4[i], ips.v6_high[i], ips.v6_low[i]) == str(address)
+
+def test_prefix_counts_match_ip_network(activity_table):
+    values = _ips(activity_table)
+    networks = {}
+    for text, events in values.value_counts(dropna=False).items():
+        address = _address(text)
+        if address is not None:
+            prefix = ipaddress.ip_network(f"{address}/{24 if address.version == 4 else 64}", strict=False)
+            networks.setdefault(str(prefix), []).extend([address] * events)
+    counts = prefix_counts(parse_ips(values))
+    assert {row.Prefix: (row.Events, row.Addresses) for row in counts.itertuples()} == {
+        prefix: (len(addresses), len(set(addresses))) for prefix, addresses in networks.items()
+    }
+    assert counts['Events'].is_monotonic_decreasing
+
+def _range_table_file(tmp_path, activity_table):
+    """A TSV in the iptoasn layout whose ranges cover some of the sample's addresses."""
+    addresses = sorted({_address(text) for text in _ips(activity_table)} - {None}, key=lambda a: (a.version, a))
+    rows = []
+    for i, address in enumerate(addresses[::7]):
+        network = ipaddress.ip_network(f"{address}/{24 if address.version == 4 else 64}", strict=False)
+        last = ipaddress.ip_address(rows[-1][1]) if rows else None
+        if last is not None and last.version == network.version and last >= network[0]:
+            continue
+        rows.append((str(network[0]), str(network[-1]), str(64500 + i % 3), 'US', f'NET-{i % 3}'))
+    path = tmp_path / 'ip2asn-combined.tsv'
+    path.write_text(''.join('\t'.join(row) + '\n' for row in rows), encoding='utf-8')
+    return path, rows
+
+def test_lookup_matches_linear_search(activity_table, tmp_path):
+    path, rows = _range_table_file(tmp_path, activity_table)
+    table = load_range_table(str(path))
+    values = _ips(activity_table).drop_duplicates()
+    found = lookup_networks(parse_ips(values), table)
+    for text, row in zip(values, found):
+        address = _address(text)
+        expected = [
+            i for i, (start, end, *_) in enumerate(rows)
+            if address is not None and ipaddress.ip_address(start).version == address.version
+            and ipaddress.ip_address(start) <= address <= ipaddress.ip_address(end)
+        ]
+        assert row == (expected[0] if expected else -1)
+
+def test_network_counts_fold_ranges_by_asn(activity_table, tmp_path):
+    path, rows = _range_table_file(tmp_path, activity_table)
+    table = load_range_table(str(path))
+    values = _ips(activity_table)
+    ips = parse_ips(values)
+    found = lookup_networks(ips, table)
+    expected = {}
+    for text, row in zip(values, found):
+        if row >= 0:
+            events, addresses = expected.setdefault(rows[row][2], (0, set()))
+            expected[rows[row][2]] = (events + 1, addresses | {_address(text)})
+    counts = network_counts(ips, table)
+    assert {str(row.ASN): (row.Events, row.Addresses) for row in counts.itertuples()} == {
+        asn: (events, len(addresses)) for asn, (events, addresses) in expected.items()
+    }
+
+def test_range_csv_with_header_row(tmp_path):
+    path = tmp_path / 'ranges.csv'
+    path.write_text('start,end,asn,country,name\n1.0.0.0,1.0.0.255,13335,US,CLOUDFLARENET\n'
+                    '2606:4700::,2606:4700:ffff:ffff:ffff:ffff:ffff:ffff,13335,US,CLOUDFLARENET\n',
+                    encoding='utf-8')
+    table = load_range_table(str(path))
+    assert lookup_networks(parse_ips(['1.0.0.1', '1.0.1.1', '2606:4700::6810:84e5', '2606:4701::1']),
+                           table).tolist() == [0, -1, 1, -1]
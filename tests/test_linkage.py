@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+from analysis.linkage import build_sessions, device_columns, link_devices
+
+GAP = pd.Timedelta('30min')
+WINDOW = pd.Timedelta('10min')
+
+@pytest.fixture(scope='module')
+def sample(activity_table):
+    """The sample table with each row's device label (as link_devices writes it) in 'Device'."""
+    df = activity_table[0]
+    parts = [df[column].astype(str) for column in device_columns(df)]
+    devices = parts[0]
+    for part in parts[1:]:
+        devices = devices + ' / ' + part
+    return df.assign(Device=devices)
+
+def reference_sessions(df):
+    """Sessions by walking each (IP, device)'s events in time order."""
+    sessions = []
+    for (ip, device), events in df.groupby(['IP Address', 'Device'], observed=True, sort=False):
+        times = events['Timestamp'].sort_values().tolist()
+        start = previous = times[0]
+        count = 0
+        for time in times:
+            if time - previous > GAP:
+                sessions.append((str(ip), device, start, previous, count))
+                start, count = time, 0
+            previous = time
+            count += 1
+        sessions.append((str(ip), device, start, previous, count))
+    return sessions
+
+def test_sessions_match_reference(sample):
+    df = sample
+    sessions = build_sessions(df)
+    assert sorted(sessions.itertuples(index=False, name=None)) == sorted(reference_sessions(df))
+
+def test_links_match_pairwise_reference(sample):
+    df = sample
+    edges = {}
+    by_ip = {}
+    for ip, device, start, end, _ in reference_sessions(df):
+        by_ip.setdefault(ip, []).append((start, end, device))
+    for ip, sessions in by_ip.items():
+        sessions.sort(key=lambda session: session[0])
+        for i, (start, end, device) in enumerate(sessions):
+            for other_start, other_end, other in sessions[i + 1:]:
+                if other_start > end + WINDOW:
+                    break
+                if other == device:
+                    continue
+                key = tuple(sorted((device, other)))
+                seen_last = max(other_start, min(end, other_end))
+                weight, ips, first, last = edges.get(key, (0, set(), other_start, seen_last))
+                edges[key] = (weight + 1, ips | {ip}, min(first, other_start), max(last, seen_last))
+
+    links = link_devices(df)
+    assert {
+        tuple(sorted((row[0], row[1]))): (row[2], row[3], row[4], row[5]) for row in links.itertuples(index=False)
+    } == {key: (weight, len(ips), first, last) for key, (weight, ips, first, last) in edges.items()}
+    assert list(links['Weight']) == sorted(links['Weight'], reverse=True)
+
+def test_small_blocks_give_the_same_links(sample):
+    df = sample
+    pd.testing.assert_frame_equal(link_devices(df, max_pairs=50), link_devices(df))
@@ -0,0 +1,60 @@
+import pytest
+import pandas as pd
+import parsers.parallel
+from parsers.activity_parser import parse_activity_csv
+from parsers.parallel import parse_activity_csv_parallel
+from parsers.progress import ParseCancelled
+
+def _failing_range(*args):
+    raise OSError('disk gone')
+
+def test_parallel_with_ua_fields_on_small_ranges(activities_csv):
+    # Detail columns are blank in some ranges and filled in others
+    df, breakdown = parse_activity_csv(activities_csv, include_ua_fields=True)
+    parallel, parallel_breakdown = parse_activity_csv_parallel(
+        activities_csv, include_ua_fields=True, workers=2, min_bytes=0, range_bytes=2 * 2**20
+    )
+    pd.testing.assert_frame_equal(parallel, df)
+    assert parallel_breakdown == breakdown
+
+def test_parallel_matches_serial_row_for_row(activities_csv):
+    df, breakdown = parse_activity_csv(activities_csv)
+    parallel, parallel_breakdown = parse_activity_csv_parallel(
+        activities_csv, workers=3, min_bytes=0, range_bytes=2**20
+    )
+    # Categories too: their order must not depend on where the ranges were cut
+    pd.testing.assert_frame_equal(parallel, df)
+    assert parallel_breakdown == breakdown
+
+@pytest.mark.parametrize('include_ua_fields', [False, True])
+def test_parallel_without_rows_has_the_serial_columns(activities_csv, tmp_path, include_ua_fields):
+    with open(activities_csv, encoding='utf-8') as f:
+        header = f.readline()
+    lines = [header, '95787835645,not a time,1.2.3.4,,No,,,,App : CHROME. Device Type : PC.,Gmail,Other,,\n']
+    for name, content in (('header.csv', lines[:1]), ('no_timestamps.csv', lines)):
+        path = tmp_path / name
+        path.write_text(''.join(content), encoding='utf-8')
+        df, breakdown = parse_activity_csv(path, include_ua_fields)
+        parallel, parallel_breakdown = parse_activity_csv_parallel(path, include_ua_fields, workers=2, min_bytes=0)
+        pd.testing.assert_frame_equal(parallel, df)
+        assert parallel_breakdown == breakdown
+
+def test_cancel_does_not_wait_for_the_pool(activities_csv, monkeypatch):
+    shutdowns = []
+    class RecordingExecutor(parsers.parallel.ProcessPoolExecutor):
+        def shutdown(self, wait=True, cancel_futures=False):
+            shutdowns.append((wait, cancel_futures))
+            super().shutdown(wait, cancel_futures=cancel_futures)
+    monkeypatch.setattr(parsers.parallel, 'ProcessPoolExecutor', RecordingExecutor)
+
+    def progress(done, total):
+        raise ParseCancelled()
+    with pytest.raises(ParseCancelled):
+        parse_activity_csv_parallel(activities_csv, progress=progress, workers=2, min_bytes=0, range_bytes=2**20)
+    assert shutdowns[0] == (False, True)
+
+    # Other errors too, reported as the serial parser reports them
+    monkeypatch.setattr(parsers.parallel, '_parse_range', _failing_range)
+    with pytest.raises(ValueError, match='Error reading activity CSV'):
+        parse_activity_csv_parallel(activities_csv, workers=2, min_bytes=0, range_bytes=2**20)
+    assert shutdowns[-1] == (False, True)
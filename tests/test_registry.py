@@ -0,0 +1,73 @@
+import zipfile
+import pytest
+import parsers.registry
+from parsers.registry import PREVIEW_LINES, SNIFF_BYTES, detect_parser, match_parser, register_parser, sniff_source
+
+def _header(csv_path):
+    with open(csv_path, encoding='utf-8-sig') as f:
+        return f.readline()
+
+def test_detects_csv_exports(activities_csv, devices_csv):
+    spec, preview = detect_parser(activities_csv)
+    assert spec.name == 'activities' and spec.visualizations
+    assert preview.startswith(_header(activities_csv))
+    assert len(preview.splitlines()) == PREVIEW_LINES
+    assert detect_parser(devices_csv)[0].name == 'devices'
+
+def test_detects_zip_members(sample_zip, devices_csv):
+    # The zip holds both; the kind registered first wins
+    spec, preview = detect_parser(sample_zip)
+    assert spec.name == 'activities'
+    assert preview.startswith('Gaia ID,Activity Timestamp,')
+    header, _ = sniff_source(sample_zip, 'devices')
+    assert header == [column.strip() for column in _header(devices_csv).strip().split(',')]
+    assert detect_parser([sample_zip])[0].name == 'activities'
+
+def test_only_whole_lines_within_the_sniff_limit(activities_csv, tmp_path):
+    header = _header(activities_csv)
+    path = tmp_path / 'long.csv'
+    # The first record runs past SNIFF_BYTES: the preview stops before it
+    path.write_text(header + 'x' * SNIFF_BYTES + ',1\n' + 'short,1\n', encoding='utf-8')
+    columns, preview = sniff_source(path)
+    assert preview == header
+    assert columns == [column.strip() for column in header.strip().split(',')]
+    # A limit that cuts the header loses columns, and with them the export type
+    assert detect_parser(path)[0].name == 'activities'
+    with pytest.raises(ValueError, match='Unrecognised CSV header'):
+        detect_parser(path, max_bytes=40)
+    # A file that fits is read whole, even without a final newline
+    path.write_text(header + 'a,b', encoding='utf-8')
+    assert sniff_source(path)[1] == header + 'a,b'
+
+def test_byte_order_mark(activities_csv, tmp_path):
+    path = tmp_path / 'bom.csv'
+    path.write_bytes(b'\xef\xbb\xbf' + open(activities_csv, 'rb').read())
+    spec, preview = detect_parser(path)
+    assert spec.name == 'activities'
+    columns, _ = sniff_source(path)
+    assert columns[0] == 'Gaia ID'
+    archive = tmp_path / 'bom.zip'
+    with zipfile.ZipFile(archive, 'w') as z:
+        z.write(path, 'Takeout/Access Log Activity/Activities - bom.csv')
+    assert sniff_source(archive, 'activities')[0] == columns
+
+def test_unknown_exports(tmp_path):
+    path = tmp_path / 'other.csv'
+    path.write_text('Name, Size\nx,1\n', encoding='utf-8')
+    with pytest.raises(ValueError, match='Unrecognised CSV header: Name, Size'):
+        detect_parser(path)
+    archive = tmp_path / 'other.zip'
+    with zipfile.ZipFile(archive, 'w') as z:
+        z.writestr('Takeout/Mail/Activities.csv', 'Name\n')
+    with pytest.raises(ValueError, match='No recognised Takeout CSV'):
+        detect_parser(archive)
+
+def test_most_specific_parser_wins(monkeypatch):
+    monkeypatch.setattr(parsers.registry, '_REGISTRY', list(parsers.registry._REGISTRY))
+    columns = ['Activity Timestamp', 'User Agent String', 'Product Name', 'Extra']
+    assert match_parser(columns).name == 'activities'
+    register_parser('extra', "Extra", None, ['activity timestamp', ' Extra'])
+    assert match_parser(columns).name == 'activities'
+    register_parser('extra', "Extra", None, columns)
+    assert match_parser([column.upper() for column in columns]).name == 'extra'
+    assert match_parser(['Activity Timestamp']) is None
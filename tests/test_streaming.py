@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+from baseline import (
+    day_label_dict, reference_counts, reference_daily_counts, reference_day_labels, reference_hour_of_week
+)
+from parsers.streaming import stream_activity_csv
+
+def test_stream_matches_parse(activities_csv, activity_table):
+    df, breakdown = activity_table
+    streamed, streamed_breakdown, _ = stream_activity_csv(
+        activities_csv, chunksize=20_000, keep_rows=True, include_ua_fields=True
+    )
+    pd.testing.assert_frame_equal(streamed, df)
+    assert streamed_breakdown == breakdown
+
+def test_stream_without_rows(activities_csv, activity_table):
+    df, breakdown, aggregator = stream_activity_csv(activities_csv, chunksize=30_000)
+    assert df is None
+    assert breakdown == activity_table[1]
+    assert aggregator.total_activities == len(activity_table[0])
+
+def test_aggregates_match_the_table(activities_csv, activity_table):
+    df = activity_table[0]
+    _, _, aggregator = stream_activity_csv(activities_csv, chunksize=25_000)
+    assert list(aggregator.app_counts_series().items()) == reference_counts(df['App Used'])
+    assert list(aggregator.device_counts_series().items()) == reference_counts(df['Device Type'])
+    daily = aggregator.daily_counts()
+    expected = reference_daily_counts(df)
+    assert daily.index.equals(expected.index)
+    assert daily.tolist() == expected.tolist()
+    np.testing.assert_array_equal(aggregator.hour_of_week_counts(), reference_hour_of_week(df))
+    for column in ('Device Type', 'App Used'):
+        assert day_label_dict(aggregator.day_label_counts(column)) == reference_day_labels(df, column)
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+from utils.timebins import (
+    activity_day_label_counts, activity_hour_of_week, day_label_counts, epoch_ns,
+    hour_of_week_counts, top_labels, value_codes
+)
+
+NAT = np.iinfo('int64').min
+
+def _ns(*times):
+    return np.array([pd.Timestamp(time, tz='UTC').value for time in times], dtype='int64')
+
+def _cells(counts):
+    """{(weekday, hour): count} of the non-zero cells of a 7x24 grid."""
+    return {(int(day), int(hour)): int(counts[day, hour]) for day, hour in zip(*np.nonzero(counts))}
+
+def test_epoch_ns():
+    naive = pd.Series(pd.to_datetime(['2025-03-01 12:00:00', None]))
+    aware = naive.dt.tz_localize('UTC').dt.tz_convert('Asia/Tokyo')
+    # Naive times are UTC; aware ones are converted, whatever their unit
+    expected = [pd.Timestamp('2025-03-01 12:00:00', tz='UTC').value, NAT]
+    assert epoch_ns(naive).tolist() == expected
+    assert epoch_ns(aware).tolist() == expected
+    assert epoch_ns(aware.dt.as_unit('s')).tolist() == expected
+
+def test_hour_of_week_bin_edges():
+    counts = hour_of_week_counts(_ns(
+        '2025-03-03 00:00:00',           # Monday, first bucket
+        '2025-03-02 23:59:59.999999',    # Sunday, last bucket
+        '2025-03-04 12:59:59',           # Tuesday 12h
+        '2025-03-04 13:00:00',           # Tuesday 13h
+        '1970-01-01 00:00:00',           # The epoch was a Thursday
+        '1969-12-31 23:00:00',           # Before the epoch floors the same way
+    ))
+    assert _cells(counts) == {(0, 0): 1, (6, 23): 1, (1, 12): 1, (1, 13): 1, (3, 0): 1, (2, 23): 1}
+    assert counts.shape == (7, 24) and counts.dtype == np.int64
+
+def test_hour_of_week_skips_missing_and_weights():
+    times = np.append(_ns('2025-03-03 05:30:00', '2025-03-10 05:10:00'), NAT)
+    assert _cells(hour_of_week_counts(times)) == {(0, 5): 2}
+    weighted = hour_of_week_counts(times, weights=[3, 4, 100])
+    assert _cells(weighted) == {(0, 5): 7}
+    assert weighted.dtype == np.int64
+    assert not hour_of_week_counts(np.array([], dtype='int64')).any()
+
+def test_hour_of_week_is_in_utc():
+    # 01:00 in Tokyo on a Monday is 16:00 UTC on Sunday
+    df = pd.DataFrame({'Timestamp': pd.to_datetime(['2025-03-03 01:00:00']).tz_localize('Asia/Tokyo')})
+    assert _cells(activity_hour_of_week(df)) == {(6, 16): 1}
+
+def test_day_label_bin_edges():
+    times = _ns('2025-03-01 00:00:00', '2025-03-01 23:59:59', '2025-03-02 00:00:00', '2025-03-04 08:00:00')
+    counts = day_label_counts(times, [0, 1, 0, 0], ['Gmail', 'Drive'])
+    # Only days with activity get a row
+    assert counts.index.tolist() == list(pd.to_datetime(['2025-03-01', '2025-03-02', '2025-03-04'], utc=True))
+    assert counts.to_dict('list') == {'Gmail': [1, 1, 1], 'Drive': [1, 0, 0]}
+
+def test_day_label_missing_values_and_weights():
+    times = np.append(_ns('2025-03-01 10:00:00', '2025-03-01 11:00:00', '2025-03-02 10:00:00'), NAT)
+    # Code len(labels) is a missing value; it joins an existing 'N/A' label
+    counts = day_label_counts(times, [0, 2, 1, 0], ['Gmail', 'N/A'], weights=[2, 3, 4, 5])
+    assert counts.to_dict('list') == {'Gmail': [2, 0], 'N/A': [3, 4]}
+    counts = day_label_counts(times[:2], [0, 1], ['Gmail'])
+    assert counts.to_dict('list') == {'Gmail': [1], 'N/A': [1]}
+    empty = day_label_counts(np.array([NAT]), [0], ['Gmail'])
+    assert empty.shape == (0, 1) and str(empty.index.tz) == 'UTC'
+
+def test_day_labels_are_utc_days_in_the_frame_timezone():
+    times = pd.to_datetime(['2025-03-01 23:30:00', '2025-03-02 00:30:00'], utc=True)
+    df = pd.DataFrame({
+        'Timestamp': times.tz_convert('America/New_York'),
+        'App Used': pd.Categorical(['Gmail', 'Gmail']),
+    })
+    counts = activity_day_label_counts(df, 'App Used')
+    # Two UTC days, labelled with their start in New York time
+    assert counts['Gmail'].tolist() == [1, 1]
+    assert counts.index.tolist() == [pd.Timestamp('2025-02-28 19:00:00', tz='America/New_York'),
+                                     pd.Timestamp('2025-03-01 19:00:00', tz='America/New_York')]
+    naive = activity_day_label_counts(df.assign(Timestamp=times.tz_localize(None)), 'App Used')
+    assert naive.index.tz is None
+    assert naive.index.tolist() == [pd.Timestamp('2025-03-01'), pd.Timestamp('2025-03-02')]
+
+def test_value_codes():
+    codes, labels = value_codes(pd.Series(pd.Categorical(['b', None, 'a'], categories=['b', 'a', 'c'])))
+    assert (codes.tolist(), labels) == ([0, 3, 1], ['b', 'a', 'c'])
+    codes, labels = value_codes(pd.Series(['x', None, 'y', 'x'], dtype=object))
+    assert (codes.tolist(), labels) == ([0, 2, 1, 0], ['x', 'y'])
+
+def test_top_labels():
+    counts = pd.DataFrame({'a': [1, 0], 'b': [5, 5], 'Other': [2, 0], 'c': [0, 1], 'd': [0, 0]})
+    assert top_labels(counts, top=2).to_dict('list') == {'b': [5, 5], 'Other': [3, 1]}
+    # Empty columns are dropped, and a frame that fits keeps its columns, most active first
+    assert list(top_labels(counts, top=5).columns) == ['b', 'Other', 'a', 'c']
@@ -0,0 +1,31 @@
+import pandas as pd
+from gui.virtual_table import sort_order
+
+def _sorted(series, descending=False):
+    return series.iloc[sort_order(series, descending)]
+
+def test_missing_values_sort_last_both_ways():
+    for series in (pd.Series([2.0, None, 1.0, 3.0, None]),
+                   pd.Series(['b', None, 'a', 'c', None], dtype=object),
+                   pd.Series(pd.Categorical(['b', None, 'a', 'c', None], categories=['c', 'b', 'a']))):
+        assert _sorted(series).index.tolist() == [2, 0, 3, 1, 4]
+        assert _sorted(series, descending=True).index.tolist() == [3, 0, 2, 1, 4]
+
+def test_ties_keep_row_order_both_ways():
+    series = pd.Series(['x', 'y', 'x', 'y', 'x'])
+    assert _sorted(series).index.tolist() == [0, 2, 4, 1, 3]
+    assert _sorted(series, descending=True).index.tolist() == [1, 3, 0, 2, 4]
+
+def test_categories_sort_by_value():
+    # Category codes are in appearance order, not lexical
+    series = pd.Series(pd.Categorical(['Maps', 'Gmail', 'Drive', 'Gmail']))
+    series = series.cat.reorder_categories(['Maps', 'Gmail', 'Drive'])
+    assert _sorted(series).tolist() == ['Drive', 'Gmail', 'Gmail', 'Maps']
+    assert _sorted(series, descending=True).index.tolist() == [0, 1, 3, 2]
+
+def test_timestamps_and_empty_series():
+    times = pd.Series(pd.to_datetime(['2025-03-02', None, '2025-03-01'], utc=True))
+    assert sort_order(times).tolist() == [2, 0, 1]
+    assert sort_order(times, descending=True).tolist() == [0, 2, 1]
+    assert len(sort_order(pd.Series([], dtype=float), descending=True)) == 0
+    assert sort_order(pd.Series([None, None], dtype=object), descending=True).tolist() == [0, 1]
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from utils.visualizations import MARKER_POINTS, DownsampledLine, downsample_min_max
+
+def _buckets(x, buckets):
+    """Bucket of each x, by the same equal-width cut as downsample_min_max."""
+    edges = np.linspace(x[0], x[-1], buckets + 1)
+    return np.clip(np.searchsorted(edges, x, side='right') - 1, 0, buckets - 1)
+
+def test_short_inputs_are_kept_whole():
+    assert downsample_min_max(np.arange(40.0), np.ones(40), 10).tolist() == list(range(40))
+    assert downsample_min_max(np.arange(3.0), np.ones(3), 1).tolist() == [0, 1, 2]
+    assert len(downsample_min_max(np.array([]), np.array([]), 10)) == 0
+
+def test_keeps_the_extrema_and_ends_of_every_bucket():
+    rng = np.random.default_rng(0)
+    # Uneven spacing, so buckets hold different numbers of points (and some none)
+    x = np.sort(rng.choice(100_000, 5_000, replace=False)).astype(float)
+    y = rng.normal(size=len(x))
+    y[1234], y[4321] = 50, -50
+    keep = downsample_min_max(x, y, 100)
+    assert len(keep) <= 400
+    assert np.all(np.diff(keep) > 0)
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert 1234 in keep and 4321 in keep
+    bins, kept_bins = _buckets(x, 100), _buckets(x, 100)[keep]
+    for bucket in np.unique(bins):
+        rows = np.flatnonzero(bins == bucket)
+        kept = keep[kept_bins == bucket]
+        assert kept[0] == rows[0] and kept[-1] == rows[-1]
+        assert y[kept].min() == y[rows].min() and y[kept].max() == y[rows].max()
+
+def test_constant_and_tied_values():
+    x = np.arange(1_000.0)
+    keep = downsample_min_max(x, np.zeros(len(x)), 10)
+    # The first and last point of each bucket at most
+    assert len(keep) <= 20 and keep[0] == 0 and keep[-1] == 999
+
+def _line(days, width=2.0):
+    counts = pd.Series(np.arange(days) % 7, index=pd.date_range('2020-01-01', periods=days, tz='UTC'))
+    fig = Figure(figsize=(width, 2), dpi=100)
+    ax = fig.add_subplot()
+    line, = ax.plot([], [])
+    return counts, ax, line, DownsampledLine(line, counts)
+
+def test_downsampled_line_follows_the_axes():
+    counts, ax, line, downsampled = _line(5_000)
+    buckets = int(ax.bbox.width)
+    x, y = line.get_data()
+    assert len(x) <= 4 * buckets and line.get_marker() in ('', 'None')
+    assert (x[0], x[-1]) == (downsampled.x[0], downsampled.x[-1])
+    assert y.min() == 0 and y.max() == 6
+
+    # Zooming in on a few weeks draws every point in view, one beyond each edge, with markers
+    ax.set_xlim(downsampled.x[100], downsampled.x[130])
+    x, _ = line.get_data()
+    assert x.tolist() == downsampled.x[99:132].tolist()
+    assert len(x) <= MARKER_POINTS and line.get_marker() == 'o'
+
+def test_downsampled_line_new_counts():
+    counts, ax, line, downsampled = _line(10)
+    assert len(line.get_data()[0]) == 10
+    downsampled.set_counts(counts.iloc[:3])
+    assert line.get_data()[1].tolist() == [0, 1, 2]
@@ -1 +1,23 @@
-from .visualizations import create_bar_chart, create_pie_chart, create_line_chart
\ No newline at end of file
+from .lazy import lazy_exports
+
+# Charts and export pull in matplotlib and pandas; they load on first use
+__getattr__, __dir__, __all__ = lazy_exports(__name__, globals(), {
+    '.visualizations': [
+        'BAR_TOP', 'LINE_CHART_SIZE', 'TIMEFRAMES', 'DownsampledLine', 'compute_time_series', 'create_bar_chart',
+        'create_heatmap_chart', 'create_pie_chart', 'create_line_chart', 'create_stacked_chart',
+        'daily_activity_counts', 'downsample_min_max', 'resample_daily_counts', 'update_line_chart_figure',
+        'update_stacked_chart_figure',
+    ],
+    '.timebins': [
+        'STACK_COLUMNS', 'WEEKDAYS', 'activity_day_label_counts', 'activity_hour_of_week', 'day_label_counts',
+        'hour_of_week_counts', 'top_labels',
+    ],
+    '.export': [
+        'EXPORT_FORMATS', 'export_analysis', 'export_csv', 'export_html_report', 'export_jsonl',
+        'export_parquet', 'iter_export_chunks',
+    ],
+    '.instrumentation': [
+        'INSTRUMENTATION', 'Instrumentation', 'diagnostics_path', 'frame_memory_bytes', 'instrumented',
+        'peak_rss_bytes', 'span',
+    ],
+})
\ No newline at end of file
@@ -0,0 +1,151 @@
+import base64
+import html
+import io
+import os
+from datetime import datetime
+import pandas as pd
+from .instrumentation import instrumented
+
+EXPORT_CHUNKSIZE = 100_000
+
+# File extension -> export format
+EXPORT_FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.jsonl': 'jsonl',
+    '.html': 'html',
+}
+
+def _time_bound(value, timestamps):
+    """Coerce a range bound to a Timestamp comparable with the Timestamp column."""
+    if value is None or value == '':
+        return None
+    bound = pd.Timestamp(value)
+    tz = getattr(timestamps.dtype, 'tz', None)
+    if tz is not None and bound.tzinfo is None:
+        bound = bound.tz_localize(tz)
+    elif tz is None and bound.tzinfo is not None:
+        bound = bound.tz_convert(None)
+    return bound
+
+def iter_export_chunks(df, chunksize=EXPORT_CHUNKSIZE, start=None, end=None):
+    """Yield (rows_scanned, chunk) over df, keeping rows with start <= Timestamp < end.
+
+    Chunks are views of at most chunksize rows, so memory stays bounded no
+    matter how large df is.
+    """
+    start = _time_bound(start, df['Timestamp'])
+    end = _time_bound(end, df['Timestamp'])
+    for offset in range(0, len(df), chunksize):
+        chunk = df.iloc[offset:offset + chunksize]
+        if start is not None or end is not None:
+            keep = pd.Series(True, index=chunk.index)
+            if start is not None:
+                keep &= chunk['Timestamp'] >= start
+            if end is not None:
+                keep &= chunk['Timestamp'] < end
+            chunk = chunk[keep]
+        yield offset + chunksize, chunk
+
+def _report(progress, scanned, total):
+    if progress is not None:
+        progress(min(scanned, total), total)
+
+def export_csv(df, path, start=None, end=None, chunksize=EXPORT_CHUNKSIZE, progress=None):
+    """Stream df to CSV chunk by chunk; returns the number of rows written."""
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        for scanned, chunk in iter_export_chunks(df, chunksize, start, end):
+            chunk.to_csv(f, index=False, header=(written == 0 and scanned <= chunksize))
+            written += len(chunk)
+            _report(progress, scanned, len(df))
+        if len(df) == 0:
+            df.to_csv(f, index=False)
+    return written
+
+def export_jsonl(df, path, start=None, end=None, chunksize=EXPORT_CHUNKSIZE, progress=None):
+    """Stream df to JSON Lines (one record per row); returns the number of rows written."""
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for scanned, chunk in iter_export_chunks(df, chunksize, start, end):
+            if len(chunk):
+                lines = chunk.to_json(orient='records', lines=True, date_format='iso')
+                f.write(lines if lines.endswith('\n') else lines + '\n')
+            written += len(chunk)
+            _report(progress, scanned, len(df))
+    return written
+
+def export_parquet(df, path, start=None, end=None, chunksize=EXPORT_CHUNKSIZE, progress=None):
+    """Stream df to Parquet one row group per chunk; needs the optional pyarrow package."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+    # One schema for every row group; all-null object columns (and categoricals
+    # without categories) are typed as strings
+    def stable_type(dtype):
+        if pa.types.is_null(dtype):
+            return pa.string()
+        if pa.types.is_dictionary(dtype) and pa.types.is_null(dtype.value_type):
+            return pa.dictionary(dtype.index_type, pa.string())
+        return dtype
+
+    schema = pa.Schema.from_pandas(df.head(chunksize), preserve_index=False)
+    schema = pa.schema([field.with_type(stable_type(field.type)) for field in schema])
+    written = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for scanned, chunk in iter_export_chunks(df, chunksize, start, end):
+            if len(chunk):
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            written += len(chunk)
+            _report(progress, scanned, len(df))
+    return written
+
+def figure_to_base64_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+def export_html_report(path, summary, figures=None, title="Google Cross Device Tracking Analysis"):
+    """Write a self-contained HTML report: the summary text plus embedded PNG charts."""
+    sections = [f"<pre>{html.escape(summary)}</pre>"]
+    for name, fig in (figures or {}).items():
+        sections.append(
+            f'<figure><img alt="{html.escape(name)}" '
+            f'src="data:image/png;base64,{figure_to_base64_png(fig)}"></figure>'
+        )
+    document = (
+        "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>{html.escape(title)}</title>\n"
+        "<style>body{font-family:'Segoe UI',sans-serif;color:#2C3E50;background:#F5F7FA;"
+        "margin:2em}pre{background:#FFFFFF;padding:1em;border:1px solid #ddd}"
+        "img{max-width:100%;background:#FFFFFF}</style>\n"
+        f"</head>\n<body>\n<h1>{html.escape(title)}</h1>\n"
+        f"<p>Generated {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>\n"
+        + "\n".join(sections)
+        + "\n</body>\n</html>\n"
+    )
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(document)
+
+_ROW_EXPORTERS = {'csv': export_csv, 'jsonl': export_jsonl, 'parquet': export_parquet}
+
+@instrumented('export_analysis')
+def export_analysis(path, df=None, summary="", figures=None, start=None, end=None,
+                    chunksize=EXPORT_CHUNKSIZE, progress=None):
+    """Export to the format implied by path's extension.
+
+    .html writes the report; .csv, .jsonl and .parquet stream the rows of df,
+    optionally limited to start <= Timestamp < end. Returns the number of rows
+    written (0 for the report).
+    """
+    fmt = EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Unsupported export format: {os.path.basename(path)}")
+    if fmt == 'html':
+        export_html_report(path, summary, figures)
+        return 0
+    if df is None:
+        raise ValueError("No table rows to export (rows are not kept in low-memory mode)")
+    return _ROW_EXPORTERS[fmt](df, path, start, end, chunksize, progress)
@@ -0,0 +1,175 @@
+import json
+import os
+import sys
+import threading
+import time
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None where it can't be read."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == 'darwin' else peak * 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, 'peak_wset', info.rss)
+
+def frame_memory_bytes(df):
+    """Bytes held by a DataFrame, counting the strings behind object and categorical columns."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+class _NullSpan:
+    """What span() yields while instrumentation is off; setting rows or frame on it is ignored."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def rows(self):
+        return None
+
+    @rows.setter
+    def rows(self, value):
+        pass
+
+    @property
+    def frame(self):
+        return None
+
+    @frame.setter
+    def frame(self, value):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('recorder', 'name', 'rows', 'frame', 'depth', 'start', 'rss_start')
+
+    def __init__(self, recorder, name, rows):
+        self.recorder = recorder
+        self.name = name
+        self.rows = rows
+        self.frame = None
+
+    def __enter__(self):
+        self.depth = self.recorder._enter()
+        self.rss_start = peak_rss_bytes()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        rss = peak_rss_bytes()
+        self.recorder._exit(self, elapsed, rss, exc_type)
+        return False
+
+class Instrumentation:
+    """Records wall time, rows/sec and peak RSS of named pipeline stages.
+
+    Stages are timed with `with recorder.span("name", rows=n) as s:`; rows can
+    also be set on s inside the block once known, and setting s.frame to the
+    stage's DataFrame records its memory footprint. While disabled, span()
+    returns a shared no-op object, so instrumented code pays one attribute
+    check per stage.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._records = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def span(self, name, rows=None):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, rows)
+
+    def _enter(self):
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        return depth
+
+    def _exit(self, span, elapsed, rss, exc_type):
+        self._local.depth = span.depth
+        frame_bytes = frame_memory_bytes(span.frame) if span.frame is not None else None
+        record = {
+            'stage': span.name,
+            'depth': span.depth,
+            'thread': threading.current_thread().name,
+            'seconds': round(elapsed, 6),
+            'rows': span.rows,
+            'rows_per_sec': round(span.rows / elapsed) if span.rows and elapsed > 0 else None,
+            'peak_rss_mb': round(rss / 2**20, 1) if rss is not None else None,
+            # How much this stage raised the process peak
+            'peak_rss_growth_mb': round((rss - span.rss_start) / 2**20, 1)
+                                  if rss is not None and span.rss_start is not None else None,
+            'frame_mb': round(frame_bytes / 2**20, 1) if frame_bytes is not None else None,
+            'error': exc_type.__name__ if exc_type is not None else None,
+        }
+        with self._lock:
+            self._records.append(record)
+
+    def records(self):
+        """Finished stages in completion order (nested stages finish before their parents)."""
+        with self._lock:
+            return list(self._records)
+
+    def reset(self):
+        with self._lock:
+            self._records = []
+
+    def report(self):
+        """Plain-text table of the recorded stages, one per line, indented by nesting."""
+        records = self.records()
+        if not records:
+            return "No stages recorded." if self.enabled else "Diagnostics are off."
+        lines = [f"{'Stage':<36}{'Time (s)':>10}{'Rows':>12}{'Rows/s':>12}{'Peak RSS (MB)':>15}"
+                 f"{'Frame (MB)':>12}"]
+        for record in records:
+            name = '  ' * record['depth'] + record['stage']
+            rows = f"{record['rows']:,}" if record['rows'] else ''
+            rate = f"{record['rows_per_sec']:,}" if record['rows_per_sec'] else ''
+            rss = f"{record['peak_rss_mb']:,.1f}" if record['peak_rss_mb'] is not None else ''
+            frame = f"{record['frame_mb']:,.1f}" if record.get('frame_mb') is not None else ''
+            lines.append(f"{name[:35]:<36}{record['seconds']:>10.3f}{rows:>12}{rate:>12}{rss:>15}{frame:>12}")
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'pid': os.getpid(), 'stages': self.records()}, f, indent=2)
+
+# Process-wide recorder the parsers, charts and app report to
+INSTRUMENTATION = Instrumentation(enabled=os.environ.get('TRACKING_ANALYZER_DIAGNOSTICS') == '1')
+
+def span(name, rows=None):
+    """Time a stage on the process-wide recorder (a no-op while it is disabled)."""
+    return INSTRUMENTATION.span(name, rows)
+
+def instrumented(name):
+    """Decorator form of span() for whole functions."""
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not INSTRUMENTATION.enabled:
+                return func(*args, **kwargs)
+            with INSTRUMENTATION.span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def diagnostics_path(export_path):
+    """Where the diagnostics JSON for an export goes: alongside it, same base name."""
+    return os.path.splitext(export_path)[0] + '.diagnostics.json'
@@ -0,0 +1,25 @@
+import importlib
+
+def lazy_exports(package, namespace, exports):
+    """PEP 562 hooks for a package whose public names live in its submodules.
+
+    exports maps each submodule ('.name') to the names it provides. A
+    submodule, and the pandas/matplotlib it may pull in, is only imported the
+    first time one of its names is looked up on the package; the value is then
+    stored in namespace so later lookups are plain attribute reads.
+    Returns (__getattr__, __dir__, __all__).
+    """
+    sources = {name: module for module, names in exports.items() for name in names}
+
+    def __getattr__(name):
+        module = sources.get(name)
+        if module is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module, package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(namespace) | set(sources))
+
+    return __getattr__, __dir__, list(sources)
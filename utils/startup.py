@@ -0,0 +1,34 @@
+import importlib
+from .instrumentation import span
+
+# What the first parse, filter, chart and export need; imported in the background once
+# the window is up so none of them stalls the Tk main thread
+WARM_UP_MODULES = (
+    'pandas',
+    'matplotlib.figure',
+    'matplotlib.backends.backend_tkagg',
+    'parsers.registry',
+    'parsers.cache',
+    'parsers.streaming',
+    'parsers.parallel',
+    'parsers.history',
+    'parsers.cube',
+    'analysis.filtering',
+    'analysis.ip',
+    'analysis.linkage',
+    'analysis.anomaly',
+    'analysis.device_join',
+    'utils.visualizations',
+    'utils.export',
+)
+
+# Packages that must not load while the window is being built
+HEAVY_MODULES = ('numpy', 'pandas', 'matplotlib')
+
+def warm_up_imports(modules=WARM_UP_MODULES):
+    """Import modules one by one, each timed as an 'import <name>' span; safe off the Tk thread."""
+    with span('warm-up imports'):
+        for name in modules:
+            with span(f'import {name}'):
+                importlib.import_module(name)
+    return len(modules)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+NS_PER_HOUR = 3_600 * 10**9
+NS_PER_DAY = 24 * NS_PER_HOUR
+HOURS_PER_WEEK = 7 * 24
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+# 1970-01-01 was a Thursday, so epoch hour 0 is hour 72 of its Monday-based week
+EPOCH_HOUR_OF_WEEK = 3 * 24
+# Columns drawn as stacked timelines, and how many of their values get their own band
+STACK_COLUMNS = ('Device Type', 'App Used')
+STACK_TOP = 6
+OTHER_LABEL = 'Other'
+
+def epoch_ns(timestamps):
+    """Epoch nanoseconds (UTC) of a datetime Series; NaT is iNaT."""
+    if getattr(timestamps.dtype, 'tz', None) is not None:
+        timestamps = timestamps.dt.tz_convert('UTC').dt.tz_localize(None)
+    return np.asarray(timestamps, dtype='datetime64[ns]').view('int64')
+
+def bound_ns(value, tz):
+    """Epoch ns of a time range bound; naive bounds are taken to be in tz (UTC when tz is None)."""
+    bound = pd.Timestamp(value)
+    if bound.tzinfo is None and tz is not None:
+        bound = bound.tz_localize(tz)
+    return bound.value
+
+def value_codes(values):
+    """(codes, labels) of a column for bincount; missing values get the extra code len(labels)."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, labels = values.cat.codes.to_numpy(), list(values.cat.categories)
+    else:
+        codes, uniques = pd.factorize(values)
+        labels = list(uniques)
+    return np.where(codes >= 0, codes, len(labels)), labels
+
+def day_index(days, tz='UTC'):
+    """DatetimeIndex of epoch day numbers, in tz (None keeps it naive)."""
+    index = pd.to_datetime(np.asarray(days, dtype='int64') * NS_PER_DAY, utc=True)
+    if tz is None:
+        return index.tz_localize(None)
+    return index if str(tz) == 'UTC' else index.tz_convert(tz)
+
+def _weighted_bincount(buckets, weights, minlength):
+    if weights is None:
+        return np.bincount(buckets, minlength=minlength)
+    return np.bincount(buckets, weights=weights, minlength=minlength).astype('int64')
+
+def hour_of_week_counts(times, weights=None):
+    """Activities per (weekday, UTC hour) of epoch-ns times, as a 7x24 array (Monday first).
+
+    Every time maps to one integer bucket code, so the whole grid is a single
+    bincount; iNaT times are skipped. weights counts each time that many
+    times (pre-aggregated counts).
+    """
+    times = np.asarray(times, dtype='int64')
+    valid = times != np.iinfo('int64').min
+    buckets = (times[valid] // NS_PER_HOUR + EPOCH_HOUR_OF_WEEK) % HOURS_PER_WEEK
+    weights = None if weights is None else np.asarray(weights)[valid]
+    return _weighted_bincount(buckets, weights, HOURS_PER_WEEK).reshape(7, 24)
+
+def day_label_counts(times, codes, labels, tz='UTC', weights=None):
+    """Activities per UTC day and label, as a days x labels frame of the days with activity.
+
+    codes index labels (len(labels) is a missing value, counted as 'N/A').
+    Days are renumbered to the days present and combined with the label code
+    into one bucket code per row, so the table is a single bincount. weights
+    as for hour_of_week_counts.
+    """
+    times = np.asarray(times, dtype='int64')
+    codes = np.asarray(codes)
+    valid = times != np.iinfo('int64').min
+    times, codes = times[valid], codes[valid].astype('int64')
+    weights = None if weights is None else np.asarray(weights)[valid]
+    width = len(labels) + 1
+    if not len(times):
+        return pd.DataFrame(np.zeros((0, len(labels)), dtype='int64'), index=day_index([], tz), columns=labels)
+    days = times // NS_PER_DAY
+    day0 = days.min()
+    present = np.bincount(days - day0) > 0
+    rows = np.cumsum(present)[days - day0] - 1
+    counts = _weighted_bincount(rows * width + codes, weights, int(present.sum()) * width).reshape(-1, width)
+    frame = pd.DataFrame(counts[:, :len(labels)], index=day_index(np.flatnonzero(present) + day0, tz),
+                         columns=pd.Index(labels, dtype=object))
+    if counts[:, -1].any():
+        frame['N/A'] = frame.get('N/A', 0) + counts[:, -1]
+    return frame
+
+def top_labels(counts, top=STACK_TOP):
+    """Keep the top labels (by total) as columns, most active first; the rest sum into 'Other'."""
+    totals = counts.sum().sort_values(ascending=False, kind='stable')
+    totals = totals[totals > 0]
+    kept = list(totals.index[:top])
+    result = counts[kept].copy()
+    if len(totals) > top:
+        # Takeout has a product called 'Other' too; the rest then joins its band
+        rest = counts[list(totals.index[top:])].sum(axis=1)
+        result[OTHER_LABEL] = result[OTHER_LABEL] + rest if OTHER_LABEL in kept else rest
+    return result
+
+def activity_hour_of_week(df):
+    """hour_of_week_counts of a table frame's Timestamp column."""
+    return hour_of_week_counts(epoch_ns(df['Timestamp']))
+
+def activity_day_label_counts(df, column):
+    """day_label_counts of a table frame's column, with days in the Timestamp column's timezone."""
+    codes, labels = value_codes(df[column])
+    return day_label_counts(epoch_ns(df['Timestamp']), codes, labels, getattr(df['Timestamp'].dtype, 'tz', None))
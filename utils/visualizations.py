@@ -1,9 +1,11 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
 import matplotlib.dates as mdates
 from matplotlib.ticker import FuncFormatter
 import warnings
+from .instrumentation import instrumented
+from .timebins import STACK_TOP, WEEKDAYS, activity_day_label_counts, activity_hour_of_week, top_labels
 
 # Suppress timezone conversion warnings
 warnings.filterwarnings(
@@ -12,23 +14,35 @@ warnings.filterwarnings(
     message="Converting to PeriodArray/Index representation will drop timezone information."
 )
 
-def create_bar_chart(df):
-    """Create a bar chart of activities per app with count labels."""
+# Values with their own bar; IP addresses or cities can run to hundreds
+BAR_TOP = 25
+
+@instrumented('create_bar_chart')
+def create_bar_chart(df=None, app_counts=None, column='App Used'):
+    """Create a bar chart of activities per app (or per value of column) with count labels.
+
+    Only the BAR_TOP most active values get a bar.
+    """
     fig = Figure(figsize=(6, 6))  # Increased height for better visualization
     ax = fig.add_subplot(111)
-    app_counts = df['App Used'].value_counts()
-    bars = ax.bar(app_counts.index, app_counts.values)
-    ax.set_title("Activities Tracked by App")
-    ax.set_xlabel("App Used")
+    if app_counts is None:
+        app_counts = df[column].value_counts()
+    app_counts = app_counts.head(BAR_TOP)
+    bars = ax.bar([str(label) for label in app_counts.index], app_counts.values)
+    ax.set_title("Activities Tracked by App" if column == 'App Used' else f"Activities Tracked by {column}")
+    ax.set_xlabel(column)
     ax.set_ylabel("Number of Activities")
     ax.tick_params(axis='x', rotation=45)
 
     # Format the y-axis to add commas
     ax.yaxis.set_major_formatter(FuncFormatter(lambda x, pos: f'{int(x):,}'))
 
-    # Set the y-axis limit to 100,000, with ticks every 10,000
-    ax.set_ylim(0, 90000)
-    ax.yaxis.set_ticks(range(0, 90001, 10000))  # 10,000 intervals
+    # Set the y-axis limit to 100,000, with ticks every 10,000 (other columns and larger counts autoscale)
+    if column == 'App Used' and (not len(app_counts) or app_counts.max() <= 90000):
+        ax.set_ylim(0, 90000)
+        ax.yaxis.set_ticks(range(0, 90001, 10000))  # 10,000 intervals
+    elif len(app_counts):
+        ax.set_ylim(0, app_counts.max() * 1.15)  # Room for the labels above the bars
 
     # Add labels above bars
     for bar in bars:
@@ -38,31 +52,165 @@ def create_bar_chart(df):
     fig.tight_layout()
     return fig
 
-def create_pie_chart(df):
+@instrumented('create_pie_chart')
+def create_pie_chart(df=None, device_counts=None):
     """Create a pie chart of activities by device type."""
     fig = Figure(figsize=(6, 4))
     ax = fig.add_subplot(111)
-    device_counts = df['Device Type'].value_counts()
+    if device_counts is None:
+        device_counts = df['Device Type'].value_counts()
     ax.pie(device_counts.values, labels=device_counts.index, autopct='%1.1f%%')
     ax.set_title("Activities by Device Type")
     fig.tight_layout()
     return fig
 
-def create_line_chart(df, timeframe="Daily"):
-    """Create a line chart of activities over time with specified timeframe."""
-    df = df.copy()
-    df['Date'] = df['Timestamp'].dt.floor('D')
-    
+TIMEFRAMES = ("Daily", "Weekly", "Monthly")
+
+@instrumented('daily_activity_counts')
+def daily_activity_counts(df):
+    """Count activities per day of the Timestamp column."""
+    return df['Timestamp'].dt.floor('D').value_counts().sort_index()
+
+def resample_daily_counts(daily_counts, timeframe="Daily"):
+    """Roll per-day counts up to the Daily, Weekly or Monthly timeframe."""
     if timeframe == "Weekly":
-        df['Date'] = df['Timestamp'].dt.to_period('W').dt.start_time
+        buckets = daily_counts.index.to_period('W').start_time
     elif timeframe == "Monthly":
-        df['Date'] = df['Timestamp'].dt.to_period('M').dt.start_time
-    
-    counts = df.groupby('Date').size()
+        buckets = daily_counts.index.to_period('M').start_time
+    else:
+        return daily_counts
+    return daily_counts.groupby(buckets).sum()
+
+@instrumented('compute_time_series')
+def compute_time_series(daily_counts):
+    """Roll per-day counts up to every timeframe once, so switching timeframe is a lookup."""
+    return {timeframe: resample_daily_counts(daily_counts, timeframe) for timeframe in TIMEFRAMES}
+
+# The line chart keeps one size however many days it covers; navigate with pan/zoom
+LINE_CHART_SIZE = (10, 6)
+# Points are only marked once a zoomed-in view shows at most this many
+MARKER_POINTS = 120
+
+def downsample_min_max(x, y, buckets):
+    """Positions of the points of (x, y) worth drawing in buckets pixel columns.
+
+    x must be sorted. The x range is cut into equal-width buckets, and the
+    first, last, lowest and highest point of each is kept, so every spike and
+    dip survives and at most 4 * buckets points are drawn.
+    """
+    n = len(x)
+    if n <= 4 * buckets:
+        return np.arange(n)
+    edges = np.linspace(x[0], x[-1], buckets + 1)
+    bins = np.clip(np.searchsorted(edges, x, side='right') - 1, 0, buckets - 1)
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    # Sorted by bin then value, each bin's run starts at its minimum and ends at its maximum
+    order = np.lexsort((y, bins))
+    return np.unique(np.concatenate([starts, ends, order[starts], order[ends]]))
+
+class DownsampledLine:
+    """A line that keeps its full series but only draws what the visible x range can show.
+
+    Whenever the x limits change (pan, zoom, the toolbar's home button) the
+    visible points are re-picked with downsample_min_max at one bucket per
+    pixel column of the axes, so drawing cost follows the axes width rather
+    than the number of days.
+    """
+
+    def __init__(self, line, counts):
+        self.line = line
+        self.axes = line.axes
+        self.set_counts(counts)
+        self.axes.callbacks.connect('xlim_changed', self.resolve)
+
+    def set_counts(self, counts):
+        index = counts.index
+        if getattr(index, 'tz', None) is not None:
+            index = index.tz_convert(None)
+        self.x = mdates.date2num(index)
+        self.y = np.asarray(counts.values, dtype=float)
+        self.resolve()
+
+    def resolve(self, axes=None):
+        """Redraw from the points in the current x limits (all of them when axes is None)."""
+        lo, hi = 0, len(self.x)
+        if axes is not None:
+            left, right = sorted(self.axes.get_xlim())
+            # One point beyond each edge keeps the line running to the border
+            lo = max(np.searchsorted(self.x, left, side='left') - 1, 0)
+            hi = min(np.searchsorted(self.x, right, side='right') + 1, len(self.x))
+        buckets = max(int(self.axes.bbox.width), 1)
+        keep = lo + downsample_min_max(self.x[lo:hi], self.y[lo:hi], buckets)
+        self.line.set_data(self.x[keep], self.y[keep])
+        self.line.set_marker('o' if len(keep) <= MARKER_POINTS else '')
+
+# Marker and colour of each alert kind (see analysis.detect_anomalies) on the line chart
+ALERT_MARKERS = {
+    'New IP': ('o', 'tab:orange'),
+    'New prefix': ('s', 'tab:purple'),
+    'New country': ('^', 'tab:green'),
+    'Burst': ('v', 'tab:red'),
+    'Impossible travel': ('X', 'black'),
+}
+
+def _draw_alert_markers(fig, counts):
+    """Mark each alert on the line at the point of the bucket its time falls in.
+
+    Buckets are found by searchsorted on the series' dates, so the same alerts
+    follow any timeframe; one marker per kind and bucket.
+    """
+    for line in getattr(fig, 'alert_lines', []):
+        line.remove()
+    fig.alert_lines = []
+    if fig.axes[0].get_legend() is not None:
+        fig.axes[0].get_legend().remove()
+    alerts = getattr(fig, 'alerts', None)
+    if alerts is None or not len(alerts) or len(counts) == 0:
+        return
+    ax = fig.axes[0]
+    index = counts.index
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_convert(None)
+    x = mdates.date2num(index)
+    times = pd.DatetimeIndex(alerts['Time'])
+    if times.tz is not None:
+        times = times.tz_convert(None)
+    alert_x = mdates.date2num(times)
+    step = x[-1] - x[-2] if len(x) > 1 else 1.0
+    buckets = np.searchsorted(x, alert_x, side='right') - 1
+    inside = (buckets >= 0) & (alert_x < x[-1] + step)
+    kinds = alerts['Kind'].to_numpy()
+    for kind, (marker, color) in ALERT_MARKERS.items():
+        selected = np.unique(buckets[inside & (kinds == kind)])
+        if len(selected):
+            line, = ax.plot(x[selected], np.asarray(counts.values, dtype=float)[selected], linestyle='none',
+                            marker=marker, markersize=10, markerfacecolor='none', markeredgewidth=1.5,
+                            color=color, label=kind, zorder=3)
+            fig.alert_lines.append(line)
+    if fig.alert_lines:
+        ax.legend(handles=fig.alert_lines, loc='upper left', fontsize='small')
+
+@instrumented('create_line_chart')
+def create_line_chart(df=None, timeframe="Daily", daily_counts=None, counts=None, alerts=None):
+    """Create a line chart of activities over time with specified timeframe.
+
+    alerts (a detect_anomalies frame) are drawn as markers on the line.
+    """
+    if counts is None:
+        if daily_counts is None:
+            daily_counts = daily_activity_counts(df)
+        counts = resample_daily_counts(daily_counts, timeframe)
     
-    fig = Figure(figsize=(max(8, len(counts)/2), 6))  # Increased height for better visualization
+    fig = Figure(figsize=LINE_CHART_SIZE)
     ax = fig.add_subplot(111)
-    ax.plot(counts.index, counts.values, marker='o')
+    line, = ax.plot([], [])
+    ax.xaxis_date()
+    fig.downsampled_line = DownsampledLine(line, counts)
+    fig.alerts = alerts
+    _draw_alert_markers(fig, counts)
+    ax.relim()
+    ax.autoscale_view()
     ax.set_title("Activities Tracked Over Time")
     ax.set_xlabel("Date")
     ax.set_ylabel("Number of Activities")
@@ -74,4 +222,77 @@ def create_line_chart(df, timeframe="Daily"):
 
     fig.tight_layout()
     
-    return fig
\ No newline at end of file
+    return fig
+
+@instrumented('update_line_chart_figure')
+def update_line_chart_figure(fig, counts):
+    """Swap the counts shown by a create_line_chart figure in place."""
+    ax = fig.axes[0]
+    fig.downsampled_line.set_counts(counts)
+    _draw_alert_markers(fig, counts)
+    ax.relim()
+    ax.autoscale(True)  # A new series starts fully zoomed out
+    ax.autoscale_view()
+    fig.tight_layout()
+    return fig
+
+HEATMAP_SIZE = (10, 4)
+
+@instrumented('create_heatmap_chart')
+def create_heatmap_chart(df=None, counts=None):
+    """Create a weekday x hour heatmap of activities (UTC), from hour_of_week_counts."""
+    if counts is None:
+        counts = activity_hour_of_week(df)
+    fig = Figure(figsize=HEATMAP_SIZE)
+    ax = fig.add_subplot(111)
+    image = ax.imshow(counts, aspect='auto', cmap='Blues')
+    ax.set_title("Activities by Hour of Week (UTC)")
+    ax.set_xlabel("Hour (UTC)")
+    ax.set_yticks(range(len(WEEKDAYS)), labels=WEEKDAYS)
+    ax.set_xticks(range(0, 24, 2), labels=[f'{hour:02d}:00' for hour in range(0, 24, 2)])
+    fig.colorbar(image, ax=ax, format=FuncFormatter(lambda x, pos: f'{int(x):,}'))
+    fig.tight_layout()
+    return fig
+
+STACKED_TITLES = {
+    'Device Type': "Activities by Device Type Over Time",
+    'App Used': "Activities by App Over Time",
+    'Device': "Activities by Physical Device Over Time",
+}
+
+@instrumented('create_stacked_chart')
+def create_stacked_chart(df=None, column='Device Type', timeframe="Daily", day_counts=None, top=STACK_TOP):
+    """Create a stacked area chart of activities over time, one band per value of column.
+
+    day_counts is a day_label_counts frame; the top values get their own band
+    and the rest are summed into 'Other'. Every timeframe is rolled up once
+    and kept on the figure for update_stacked_chart_figure.
+    """
+    if day_counts is None:
+        day_counts = activity_day_label_counts(df, column)
+    fig = Figure(figsize=LINE_CHART_SIZE)
+    fig.add_subplot(111)
+    fig.stacked_title = STACKED_TITLES.get(column, f"Activities by {column} Over Time")
+    fig.stacked_series = compute_time_series(top_labels(day_counts, top))
+    return update_stacked_chart_figure(fig, timeframe)
+
+def update_stacked_chart_figure(fig, timeframe):
+    """Redraw a create_stacked_chart figure at another timeframe."""
+    ax = fig.axes[0]
+    ax.clear()
+    counts = fig.stacked_series[timeframe]
+    if len(counts.columns) and len(counts):
+        index = counts.index
+        if getattr(index, 'tz', None) is not None:
+            index = index.tz_convert(None)
+        ax.stackplot(index, counts.to_numpy().T, labels=[str(label) for label in counts.columns])
+        ax.legend(loc='upper left', fontsize='small')
+    ax.set_title(fig.stacked_title)
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Number of Activities")
+    ax.xaxis_date()
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    ax.tick_params(axis='x', rotation=45)
+    ax.yaxis.set_major_formatter(FuncFormatter(lambda x, pos: f'{int(x):,}'))
+    fig.tight_layout()
+    return fig